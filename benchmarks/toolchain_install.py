@@ -0,0 +1,410 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Benchmarks of the toolchain download and install paths of `mdev.env`, against a local HTTP server.
+
+The server serves synthetic archives from memory. It answers Range requests, and can limit the rate of each
+response or close it after a number of bytes, standing in for a slow or flaky link. Each benchmark also checks the
+behaviour it measures, e.g. the SHA-256 of a resumed download, and fails with an AssertionError otherwise.
+
+Usage, from the root of the repository with mdev installed:
+
+    python benchmarks/toolchain_install.py [--scale SCALE] [--output bench_output.txt] [BENCHMARK ...]
+
+mdev is imported with HOME set to a temporary directory, the toolchains of the user are left alone.
+"""
+import io
+import os
+import re
+import sys
+import time
+import shutil
+import tarfile
+import hashlib
+import zipfile
+import argparse
+import tempfile
+import threading
+import http.server
+
+from typing import Callable, Dict, List, Tuple
+
+HOME = tempfile.mkdtemp(prefix="mdev-bench-")
+os.environ["HOME"] = os.environ["USERPROFILE"] = HOME
+
+from mdev import env  # noqa: E402, the toolchain directories are computed from HOME on import.
+from rich.console import Console  # noqa: E402
+from rich.progress import Progress  # noqa: E402
+
+MB = 1024 * 1024
+# The server is local, waiting before a retry would only slow the benchmarks down.
+env.DOWNLOAD_BACKOFF = 0.0
+
+Results = List[Tuple[str, str]]
+
+
+class Server(http.server.ThreadingHTTPServer):
+    """HTTP server of in-memory files on a free local port, used as a context manager.
+
+    Attributes:
+        files: Content of the files served, by name.
+        rate: Bytes per second sent by each response, unlimited if 0.
+        drop_after: Number of bytes after which each response is cut, never if 0.
+        requests: Number of GET requests answered.
+        sent: Number of bytes of file data sent.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, files: Dict[str, bytes], rate: float = 0, drop_after: int = 0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.files = files
+        self.rate = rate
+        self.drop_after = drop_after
+        self.requests = 0
+        self.sent = 0
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/"
+
+    def __enter__(self) -> "Server":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        server = self.server  # type: Server
+        data = server.files.get(self.path.lstrip("/"))
+        if data is None:
+            self._send_empty(404)
+            return
+        start = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            if start >= len(data):
+                self._send_empty(416, {"Content-Range": f"bytes */{len(data)}"})
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        with server.lock:
+            server.requests += 1
+        end = min(len(data), start + server.drop_after) if server.drop_after else len(data)
+        began = time.monotonic()
+        view = memoryview(data)
+        for offset in range(start, end, 64 * 1024):
+            chunk = view[offset:min(offset + 64 * 1024, end)]
+            self.wfile.write(chunk)
+            with server.lock:
+                server.sent += len(chunk)
+            if server.rate:
+                delay = began + (offset + len(chunk) - start) / server.rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        if end < len(data):
+            self.close_connection = True
+            self.wfile.flush()
+            self.connection.shutdown(2)
+
+    def _send_empty(self, status: int, headers: Dict[str, str] = None) -> None:
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def make_zip(members: Dict[str, bytes]) -> bytes:
+    """Return a deflated zip archive of `members`, with Unix permissions so that executables stay executable."""
+    path = os.path.join(HOME, "archive.zip")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for name, data in members.items():
+            info = zipfile.ZipInfo(name, (2026, 10, 17, 0, 0, 0))
+            info.create_system = 3
+            info.external_attr = 0o100755 << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, data)
+    with open(path, "rb") as file:
+        data = file.read()
+    os.remove(path)
+    return data
+
+
+def make_tar(members: Dict[str, bytes]) -> bytes:
+    """Return a gzip compressed tar archive of `members`."""
+    path = os.path.join(HOME, "archive.tar.gz")
+    with tarfile.open(path, "w:gz", compresslevel=1) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o755
+            archive.addfile(info, io.BytesIO(data))
+    with open(path, "rb") as file:
+        data = file.read()
+    os.remove(path)
+    return data
+
+
+def payload(size: int) -> bytes:
+    """Return `size` bytes compressing about 2:1, like binaries do."""
+    return b"".join(os.urandom(2048) + bytes(2048) for _ in range(size // 4096)) + bytes(size % 4096)
+
+
+def toolchain_archive(name: str, size: int) -> bytes:
+    """Return a zip archive laid out like a toolchain archive of this platform, of `size` bytes uncompressed."""
+    executable = env.toolchain_executables[name].replace(os.path.sep, "/")
+    members = {executable: b"#!/bin/sh\n"}
+    for index in range(size // MB):
+        members[f"{os.path.dirname(executable) or name}-data/{index}.bin"] = payload(MB)
+    return make_zip(members)
+
+
+def quiet_progress() -> Progress:
+    """Return a progress display rendered to a terminal in memory, so that its cost is still measured."""
+    return Progress(console=Console(file=open(os.devnull, "w"), force_terminal=True))
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def timed(function: Callable[[], object]) -> float:
+    began = time.perf_counter()
+    function()
+    return time.perf_counter() - began
+
+
+def reset_store() -> None:
+    shutil.rmtree(env.toolchain_root, ignore_errors=True)
+    os.makedirs(env.store_root)
+
+
+def bench_concurrent(scale: float) -> Results:
+    """Install CMake and Ninja one after the other, then concurrently, over links of limited rate."""
+    rate = 8 * MB
+    files = {
+        env.archive_name("cmake", env.DEFAULT_VERSION): toolchain_archive("cmake", int(32 * MB * scale)),
+        env.archive_name("ninja", env.DEFAULT_VERSION): toolchain_archive("ninja", int(16 * MB * scale)),
+    }
+    with Server(files, rate=rate) as server:
+        os.environ[env.MIRRORS_ENV] = server.url
+        reset_store()
+        with quiet_progress() as progress:
+            serial = timed(lambda: [env.install_toolchain(name, env.DEFAULT_VERSION, progress=progress)
+                                    for name in ("cmake", "ninja")])
+        reset_store()
+        concurrent = timed(lambda: env.install_toolchains([(name, env.DEFAULT_VERSION, None)
+                                                           for name in ("cmake", "ninja")]))
+        del os.environ[env.MIRRORS_ENV]
+    for name, archive in (("cmake", "cmake"), ("ninja", "ninja")):
+        path = env.toolchain_path(name)
+        expected = sha256(files[env.archive_name(archive, env.DEFAULT_VERSION)])
+        assert path is not None and expected in path, f"{name} wasn't installed from its archive"
+        assert os.access(path, os.X_OK), f"{path} isn't executable"
+    return [
+        ("link rate per connection", f"{rate / MB:.0f} MB/s"),
+        ("serial install", f"{serial:.2f} s"),
+        ("concurrent install", f"{concurrent:.2f} s"),
+        ("speedup", f"{serial / concurrent:.2f}x"),
+    ]
+
+
+def bench_resume(scale: float) -> Results:
+    """Download and install an archive over a link cut every 2 MB, more times than DOWNLOAD_RETRIES."""
+    name = "flaky.zip"
+    members = {f"flaky/{index}.bin": payload(MB) for index in range(int(32 * scale) or 1)}
+    data = make_zip(members)
+    drop_after = 2 * MB
+    results = []
+    with Server({name: data}, drop_after=drop_after) as server:
+        destination = os.path.join(HOME, name)
+        with quiet_progress() as progress:
+            elapsed = timed(lambda: env.download(server.url + name, destination, progress))
+        with open(destination, "rb") as file:
+            assert file.read() == data, "the resumed download is corrupt"
+        os.remove(destination)
+        results += [
+            ("archive size", f"{len(data) / MB:.1f} MB"),
+            ("download, requests", str(server.requests)),
+            ("download, bytes sent / size", f"{server.sent / len(data):.3f}"),
+            ("download, time", f"{elapsed:.2f} s"),
+        ]
+
+        # Each install fails at the first cut, the next one resumes from the data kept by the previous ones.
+        server.requests = server.sent = 0
+        destination = os.path.join(HOME, "flaky")
+        attempts = 0
+        with quiet_progress() as progress:
+            while True:
+                attempts += 1
+                try:
+                    digest = env.install(server.url + name, destination, progress, sha256(data), retries=0)
+                    break
+                except env.requests.RequestException:
+                    assert attempts * drop_after < 2 * len(data), "the install doesn't resume"
+        assert digest == sha256(data) and len(os.listdir(os.path.join(destination, "flaky"))) == len(members)
+        assert not os.path.exists(os.path.join(HOME, name + env.PARTIAL_SUFFIX)), "the partial archive was kept"
+        shutil.rmtree(destination)
+        results += [
+            ("install across runs, attempts", str(attempts)),
+            ("install across runs, bytes sent / size", f"{server.sent / len(data):.3f}"),
+        ]
+    return results
+
+
+def bench_extract(scale: float) -> Results:
+    """Extract an archive of many members with zipfile's extractall, then with extract_zip and its thread pool."""
+    # A CMake distribution has thousands of members, mostly small, and a few large executables.
+    members = {f"tree/{index % 50}/{index}.txt": payload(4096 + index % 7 * 4096) for index in range(int(3000 * scale))}
+    members.update({f"tree/bin/{index}": payload(8 * MB) for index in range(max(1, int(4 * scale)))})
+    path = os.path.join(HOME, "tree.zip")
+    with open(path, "wb") as file:
+        file.write(make_zip(members))
+    serial_destination = os.path.join(HOME, "serial")
+    parallel_destination = os.path.join(HOME, "parallel")
+
+    def extractall() -> None:
+        with zipfile.ZipFile(path) as archive:
+            archive.extractall(serial_destination)
+
+    serial = timed(extractall)
+    parallel = timed(lambda: env.extract_zip(path, parallel_destination))
+    for name, data in members.items():
+        extracted = os.path.join(parallel_destination, *name.split("/"))
+        with open(extracted, "rb") as file:
+            assert file.read() == data, f"{name} is corrupt"
+        assert os.access(extracted, os.X_OK), f"the permissions of {name} were lost"
+    results = [
+        ("members", str(len(members))),
+        ("uncompressed size", f"{sum(map(len, members.values())) / MB:.0f} MB"),
+        ("workers", str(env.EXTRACT_WORKERS)),
+        ("extractall", f"{serial:.2f} s"),
+        ("extract_zip", f"{parallel:.2f} s"),
+        ("speedup", f"{serial / parallel:.2f}x"),
+    ]
+    os.remove(path)
+    for directory in (serial_destination, parallel_destination):
+        shutil.rmtree(directory)
+    return results
+
+
+def download_per_kib(url: str, destination: str, progress: Progress) -> None:
+    """The download loop of mdev 0.2: 1 KiB blocks, and a progress update per block."""
+    with env.requests.get(url, stream=True) as response:
+        with open(destination, "wb") as file:
+            task = progress.add_task("", total=int(response.headers.get("content-length", 0)))
+            for data in response.iter_content(1024):
+                progress.update(task, advance=1024)
+                file.write(data)
+
+
+def bench_download(scale: float) -> Results:
+    """Download an archive over an unlimited local link with the 1 KiB loop of mdev 0.2, then with download()."""
+    name = "fast.zip"
+    data = payload(int(128 * MB * scale))
+    destination = os.path.join(HOME, name)
+    with Server({name: data}) as server:
+        with quiet_progress() as progress:
+            baseline = timed(lambda: download_per_kib(server.url + name, destination, progress))
+        os.remove(destination)
+        with quiet_progress() as progress:
+            elapsed = timed(lambda: env.download(server.url + name, destination, progress))
+    with open(destination, "rb") as file:
+        assert file.read() == data, "the download is corrupt"
+    os.remove(destination)
+    return [
+        ("size", f"{len(data) / MB:.0f} MB"),
+        ("1 KiB blocks, update per block", f"{len(data) / MB / baseline:.0f} MB/s"),
+        ("download()", f"{len(data) / MB / elapsed:.0f} MB/s"),
+        ("speedup", f"{baseline / elapsed:.2f}x"),
+    ]
+
+
+def bench_stream(scale: float) -> Results:
+    """Install a tar.gz archive by downloading then extracting it, then with install() extracting while downloading."""
+    name = "stream.tar.gz"
+    members = {f"stream/{index}.bin": payload(MB) for index in range(int(64 * scale) or 1)}
+    data = make_tar(members)
+    rate = 32 * MB
+    with Server({name: data}, rate=rate) as server:
+        archive = os.path.join(HOME, name)
+        destination = os.path.join(HOME, "stream")
+
+        def download_then_extract() -> None:
+            with quiet_progress() as progress:
+                env.download(server.url + name, archive, progress)
+            with tarfile.open(archive, "r:gz") as tar:
+                tar.extractall(destination)
+
+        serial = timed(download_then_extract)
+        os.remove(archive)
+        shutil.rmtree(destination)
+        with quiet_progress() as progress:
+            streamed = timed(lambda: env.install(server.url + name, destination, progress, sha256(data)))
+    for member, content in members.items():
+        with open(os.path.join(destination, *member.split("/")), "rb") as file:
+            assert file.read() == content, f"{member} is corrupt"
+    assert not os.path.exists(archive + env.PARTIAL_SUFFIX), "the archive was kept"
+    shutil.rmtree(destination)
+    return [
+        ("archive size", f"{len(data) / MB:.1f} MB"),
+        ("link rate", f"{rate / MB:.0f} MB/s"),
+        ("download, then extract", f"{serial:.2f} s"),
+        ("install(), streamed", f"{streamed:.2f} s"),
+        ("speedup", f"{serial / streamed:.2f}x"),
+    ]
+
+
+BENCHMARKS = {
+    "concurrent": bench_concurrent,
+    "resume": bench_resume,
+    "extract": bench_extract,
+    "download": bench_download,
+    "stream": bench_stream,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help=f"benchmarks to run, all by default: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier of the archive sizes")
+    parser.add_argument("--output", help="file the results are also written to")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark {', '.join(sorted(unknown))}")
+
+    lines = []
+    try:
+        for name in args.benchmarks or BENCHMARKS:
+            for label, value in BENCHMARKS[name](args.scale):
+                line = f"{name:<12} {label:<42} {value}"
+                print(line)
+                lines.append(line)
+    finally:
+        shutil.rmtree(HOME, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
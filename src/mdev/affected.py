@@ -0,0 +1,85 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+import json
+from pathlib import Path
+from typing import IO, Optional
+
+import click
+
+from rich.console import Console
+from rich.table import Table
+from rich.text import Text
+from rich import box
+
+from mdev.builder import load_matrix
+from mdev.builder.affected import changed_files, build_tree_targets, find_affected
+from mdev.project.exceptions import VersionControlError
+
+
+@click.command()
+@click.option(
+    "--since",
+    required=True,
+    help="Revision of the program to compare the working tree with, e.g. origin/master.",
+)
+@click.option(
+    "--matrix",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON file listing the candidate targets [default: the targets of the existing build trees]",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.File("w"),
+    help="Write the affected targets as a build matrix to this file, '-' for stdout.",
+)
+def affected(since: str, matrix: Optional[str], output: Optional[IO[str]]) -> None:
+    """
+    List the build targets affected by the changes since a revision.
+
+    The files each target depends on are read from the dependency data ninja
+    recorded in its build tree, the changes of components are read from their
+    own repositories. Targets without a build tree are always affected.
+
+    Example:
+
+        $ mdev affected --since origin/master
+
+        $ mdev affected --since HEAD~1 --matrix ci-matrix.json -o affected.json
+
+        $ mdev build --matrix affected.json
+    """
+    if matrix:
+        try:
+            targets = load_matrix(Path(matrix))
+        except (ValueError, KeyError) as err:
+            raise click.BadParameter(str(err), param_hint="--matrix")
+    else:
+        targets = build_tree_targets()
+        if not targets:
+            raise click.UsageError("No build tree found, build the targets once or pass a --matrix file.")
+
+    try:
+        changes = changed_files(since)
+    except VersionControlError as err:
+        raise click.ClickException(str(err))
+    result = find_affected(targets, changes)
+
+    if output:
+        json.dump([{"project": t.project, "module": t.module} for t in result], output, indent=2)
+        output.write("\n")
+        if output.name == "<stdout>":
+            return
+
+    table = Table(title="Affected Targets", box=box.ROUNDED, style='blue')
+    table.add_column("Project", style="cyan")
+    table.add_column("Module", style="cyan")
+    table.add_column("Reason", style="green")
+    for target, reason in result.items():
+        table.add_row(target.project, target.module, Text(reason))
+    console = Console()
+    if result:
+        console.print(table, justify="left")
+    console.print(f"{len(result)} of {len(targets)} targets affected by {len(changes.files)} changed files"
+                  + (f" and {len(changes.directories)} replaced components." if changes.directories else "."))
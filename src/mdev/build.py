@@ -2,19 +2,45 @@
 # Date  : 2022/03/21
 
 import sys
+import time
 import subprocess
 import shutil
 import random
 import click
+import kconfiglib
+from dataclasses import replace
 from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
 
-from mdev.env import get_env, get_cmake, get_ninja
+from mdev.env import get_env
+from mdev.builder import BuildTarget, build_matrix, expand_targets, load_matrix
+from mdev.builder.target import BUILD_DIR
+from mdev.builder.matrix import BUILD_LOG_FILE_NAME
+from mdev.builder.runner import BuildOutput, run_build
+from mdev.builder.watch import watch as watch_tree, needs_configure
+from mdev.builder.timings import NinjaLogMark, analyze, mark_ninja_log, write_report
+from mdev.builder.artifacts import ArtifactCache, input_hash
+from mdev.builder.gc import build_lock, auto_collect
+from mdev.builder.footprint import analyze_footprint, write_size_report, load_baseline, save_baseline, find_regressions, SIZE_BASELINE_FILE
+from mdev.builder.kconfig import run_menu
+from mdev.builder.tune import BuildProfile, apply_profile, pinned_variables, load_profile, save_profile, tune as tune_target, best_result
+from mdev.builder.fingerprint import compute_fingerprint, is_configured, save_fingerprint, clear_fingerprint
+from mdev.compiler_cache import CompilerCache
+from mdev.cache import parse_size, format_size
+from mdev.project._internal.libraries import LibraryReferences
 from mdev import log
 
 from rich import print
+from rich import box
 from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+from rich.markup import escape
 
 
+# Number of distinct warnings and errors listed after a build, the log file holds all of them.
+MAX_DIAGNOSTICS = 50
+
 mxos_logo = '''
 ███╗   ███╗██╗  ██╗ ██████╗ ███████╗
 ████╗ ████║╚██╗██╔╝██╔═══██╗██╔════╝
@@ -75,8 +101,8 @@ fortune_txt = (
 
 
 @click.command()
-@click.argument("project", type=click.Path())
-@click.argument("module")
+@click.argument("project", required=False)
+@click.argument("module", required=False)
 @click.option(
     "--flash",
     "-f",
@@ -93,7 +119,7 @@ fortune_txt = (
     "--kconfig",
     "-k",
     is_flag=True,
-    help="Open config menu",
+    help="Open the terminal config menu before building.",
 )
 @click.option(
     "--define",
@@ -101,53 +127,563 @@ fortune_txt = (
     multiple=True,
     help="Define an cmake variable, this option can be provided multiple times",
 )
-def build(project: str, module: str, flash: str, clean: bool, kconfig: str, define: str) -> None:
+@click.option(
+    "--reconfigure",
+    "-r",
+    is_flag=True,
+    help="Run the cmake configure step even if the configuration didn't change.",
+)
+@click.option(
+    "--compiler-cache/--no-compiler-cache",
+    default=True,
+    show_default=True,
+    help="Reuse objects compiled by previous builds from the mdev compiler cache.",
+)
+@click.option(
+    "--pch/--no-pch",
+    default=None,
+    help="Precompile the common mxos headers [default: from the tuned profile, else off]",
+)
+@click.option(
+    "--timings",
+    "-t",
+    is_flag=True,
+    help="Report the slowest build steps and the build time of each component.",
+)
+@click.option(
+    "--watch",
+    "-w",
+    is_flag=True,
+    help="Keep running and rebuild each time a source file of the project or its components changes.",
+)
+@click.option(
+    "--artifact-cache",
+    "-a",
+    is_flag=True,
+    help="Restore the images of a previous build with the same inputs instead of building.",
+)
+@click.option(
+    "--size",
+    "-s",
+    is_flag=True,
+    help="Report the ROM and RAM footprint of each component and compare it with the saved baseline.",
+)
+@click.option(
+    "--size-budget",
+    callback=lambda ctx, param, value: _parse_size_budget(value),
+    help="Fail the build if ROM or RAM grew more than this over the baseline, e.g. 0, 2K or 1%. Implies --size.",
+)
+@click.option(
+    "--save-size-baseline",
+    is_flag=True,
+    help="Save the footprint of this build as the new baseline. Implies --size.",
+)
+@click.option(
+    "--tune",
+    is_flag=True,
+    help="Benchmark jobs and unity build settings for the module and use the fastest ones for its later builds.",
+)
+@click.option(
+    "--matrix",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON file listing the projects and modules to build.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    help="Total number of parallel jobs shared by all targets [default: CPU count]",
+)
+@click.option(
+    "--parallel",
+    "-p",
+    type=click.IntRange(min=1),
+    help="Number of targets built at the same time [default: jobs / 2]",
+)
+def build(
+    project: str,
+    module: str,
+    flash: str,
+    clean: bool,
+    kconfig: str,
+    define: str,
+    reconfigure: bool,
+    compiler_cache: bool,
+    pch: Optional[bool],
+    timings: bool,
+    watch: bool,
+    artifact_cache: bool,
+    size: bool,
+    size_budget: Optional[Tuple[int, Optional[float]]],
+    save_size_baseline: bool,
+    tune: bool,
+    matrix: str,
+    jobs: int,
+    parallel: int,
+) -> None:
     """
     Build a MXOS project.
 
     Arguments:
 
-        PROJECT : Path to the MXOS project
+        PROJECT : Path to the MXOS project, separate several projects with commas
+
+        MODULE  : Module name, separate several modules with commas
+
+    Every project is built for every module. When more than one target is
+    given, targets are built concurrently and a summary is printed at the end.
+
+    With --size, the footprint of the image is compared with the baseline
+    saved for the target in mdev-size-baseline.json, which is created by the
+    first size report and updated with --save-size-baseline.
 
-        MODULE  : Module name
+    The settings found by --tune are saved in ~/.mdev/build-profiles.json and
+    applied to every later build of the module, -j, --pch/--no-pch and
+    -D CMAKE_UNITY_BUILD take precedence over them.
 
     Example:
 
         $ mdev build demos/helloworld emc3080
+
+        $ mdev build demos/helloworld,demos/tcp_server emc3080,emc3166 -j 16
+
+        $ mdev build --matrix ci-matrix.json
+
+        $ mdev build demos/helloworld emc3080 --watch
+
+        $ mdev build demos/helloworld emc3080 --tune
+
+        $ mdev build demos/helloworld emc3080 --size-budget 1%
     """
 
+    targets = _get_targets(project, module, flash, define, matrix)
+    targets = [replace(target, compiler_cache=compiler_cache) for target in targets]
+    flashing = flash and flash.lower() != "none"
+    if len(targets) > 1 and (kconfig or watch or flashing or tune):
+        raise click.UsageError("--kconfig, --watch, --flash and --tune can only be used with a single target.")
+    # Flashing and the config menu are side effects of the build, they can't be restored from the cache.
+    if artifact_cache and (kconfig or watch or flashing or tune):
+        raise click.UsageError("--artifact-cache can't be used with --kconfig, --watch, --flash or --tune.")
+
+    size = size or size_budget is not None or save_size_baseline
     env_path = get_env()
-    project = str(Path(project)).replace('\\', '/')
-    build_diretory = f'build/{project}-{module}'
 
     print(Panel.fit(f"[cyan]{mxos_logo}",
           title="Thanks for using MXOS!", style='cyan'))
 
     if clean:
-        log.dbg(f'Removing {build_diretory} ...')
-        shutil.rmtree(build_diretory, ignore_errors=True)
+        for target in targets:
+            log.dbg(f'Removing {target.build_directory} ...')
+            shutil.rmtree(target.build_directory, ignore_errors=True)
 
-    print(Panel(f"[magenta]Configuring ...", style='magenta'))
-    command = f'{get_cmake()} -B {build_diretory} -GNinja -DAPP={project} -DMODULE={module} -DFLASH={flash} -DMXOS_ENV={env_path} -DCMAKE_MAKE_PROGRAM={get_ninja()}'
-    if define:
-        command += ' -D' + ' -D'.join(define)
-    log.dbg(command)
-    ret = subprocess.run(command, shell=True)
-    if ret.returncode != 0:
-        exit(ret.returncode)
+    if tune:
+        with build_lock(targets[0]):
+            _tune(targets[0], env_path)
+
+    profiles = {module: load_profile(module) for module in {target.module for target in targets}}
+    targets = [apply_profile(t, profiles[t.module]) if profiles[t.module] else t for t in targets]
+    if pch is not None:
+        targets = [replace(target, pch=pch) for target in targets]
+
+    if len(targets) > 1:
+        _build_targets(
+            targets, env_path, jobs, parallel, reconfigure, timings, artifact_cache,
+            size, size_budget, save_size_baseline,
+        )
+        return
+
+    target = targets[0]
+    if not jobs and profiles[target.module]:
+        jobs = profiles[target.module].jobs
+        log.dbg(f'Using {jobs} jobs from the tuned profile of {target.module}.')
+    with build_lock(target):
+        cache_key = None
+        restored = False
+        if artifact_cache and kconfig:
+            # The menu may change the options after the inputs are hashed.
+            log.wrn('The artifact cache is not used with --kconfig.')
+        elif artifact_cache:
+            cache_key = input_hash(target)
+            if cache_key is None:
+                ArtifactCache().record("uncacheable")
+                log.wrn('Some components have local changes, the artifact cache is not used.')
+            elif ArtifactCache().restore(cache_key, target):
+                print(Panel(f"[green]Restored the images of {target.name} from the artifact cache.", style='green'))
+                restored = True
+
+        if restored:
+            returncode = 0
+        else:
+            returncode = _build_single(target, env_path, jobs, reconfigure, kconfig, timings)
+            if returncode == 0 and cache_key:
+                # Saved under the key looked up, the .config file written by the configure step isn't hashed again.
+                _save_artifacts(target, cache_key)
+        if returncode == 0 and size:
+            returncode = _report_size(target, size_budget, save_size_baseline)
+        _collect_build_trees(targets)
+        if watch:
+            _watch(target, env_path, jobs, timings)
+            return
+    if returncode != 0:
+        exit(returncode)
+    print(Panel.fit(f"[green]{success}",
+          title="Congratulation!", style='green'))
+
+    _print_fortune()
+
+
+def _build_single(
+    target: BuildTarget, env_path: str, jobs: int, reconfigure: bool, kconfig: bool, timings: bool
+) -> int:
+    """Configure the target if needed and build it, return the exit code of the failed command or 0."""
+    fingerprint = compute_fingerprint(target, env_path)
+    if reconfigure or not is_configured(target, fingerprint):
+        print(Panel(f"[magenta]Configuring ...", style='magenta'))
+        clear_fingerprint(target)
+        command = target.configure_command(env_path)
+        log.dbg(command)
+        ret = subprocess.run(command, shell=True)
+        if ret.returncode != 0:
+            return ret.returncode
+        save_fingerprint(target, fingerprint)
+    else:
+        log.dbg(f'Configuration of {target.build_directory} is up to date, skip configuring.')
 
-    print(Panel(f"[green]Building ...", style='green'))
-    command = f'{get_cmake()} --build {build_diretory}'
     if kconfig:
-        command += f' --target guiconfig'
+        try:
+            run_menu(target)
+        except ImportError:
+            log.wrn('The terminal menu needs curses, install it with `pip install windows-curses`.')
+            return 1
+        except (ValueError, kconfiglib.KconfigError) as err:
+            log.err(str(err))
+            return 1
+
+    print(Panel(f"[green]Building ...", style='green'))
+    mark = mark_ninja_log(target)
+    returncode = _run_build_step(target, target.build_command(jobs))
+    if target.compiler_cache:
+        CompilerCache().evict()
+    if timings:
+        _report_timings(target, mark)
+    if returncode != 0:
+        print(Panel.fit(f"[red]{failed}", title="Sorry ...", style='red'))
+    return returncode
+
+
+def _run_build_step(target: BuildTarget, command: str) -> int:
+    """Run the build command with a progress bar, then print the warnings and errors it reported."""
     log.dbg(command)
-    ret = subprocess.run(command, shell=True)
-    if ret.returncode != 0:
+    log_path = Path(target.build_directory, BUILD_LOG_FILE_NAME)
+    output = BuildOutput()
+    with log_path.open('w') as log_file:
+        returncode = run_build(command, output, log_file)
+
+    if output.diagnostics:
+        table = Table(title="Build Diagnostics", box=box.ROUNDED, style='blue')
+        table.add_column("Severity")
+        table.add_column("Location", style="cyan")
+        table.add_column("Message")
+        table.add_column("Count", justify="right")
+        for diagnostic in (output.errors + output.warnings)[:MAX_DIAGNOSTICS]:
+            table.add_row(
+                "[red]error" if diagnostic.severity == "error" else "[yellow]warning",
+                Text(diagnostic.location),
+                Text(diagnostic.message),
+                str(output.diagnostics[diagnostic]),
+            )
+        print(table)
+    for edge in output.failed:
+        print(f"[red]FAILED:[/red] {escape(edge)}")
+    if output.diagnostics or output.failed:
+        print(f"{len(output.errors)} errors, {len(output.warnings)} warnings, full log in {log_path}")
+    return returncode
+
+
+def _parse_size_budget(value: Optional[str]) -> Optional[Tuple[int, Optional[float]]]:
+    """Convert a --size-budget value to an allowed growth in bytes or in percent."""
+    if value is None:
+        return None
+    if value.strip().endswith('%'):
+        try:
+            return 0, float(value.strip()[:-1])
+        except ValueError:
+            raise click.BadParameter(f"Invalid percentage '{value}'.", param_hint="--size-budget")
+    return parse_size(value), None
+
+
+def _check_size(
+    target: BuildTarget, report: Dict, budget: Optional[Tuple[int, Optional[float]]], save: bool
+) -> Tuple[Optional[Dict], List[str]]:
+    """Save the footprint report of a target and compare it with its baseline.
+
+    Returns:
+        The baseline the report was compared with, None if the report became the baseline, and the regressions
+        beyond the budget.
+    """
+    write_size_report(target, report)
+    baseline = load_baseline(target)
+    if save or baseline is None:
+        save_baseline(target, report)
+        return None, []
+    return baseline, find_regressions(report, baseline, *budget) if budget else []
+
+
+def _report_size(target: BuildTarget, budget: Optional[Tuple[int, Optional[float]]], save: bool) -> int:
+    """Print the footprint of the image of a target, return 1 if it exceeds the size budget."""
+    report = analyze_footprint(target)
+    if not report:
+        log.wrn(f'No ELF image found in {target.build_directory}, skip the size report.')
+        return 0
+    baseline, regressions = _check_size(target, report, budget, save)
+
+    def delta(new: int, old: int) -> str:
+        if new == old:
+            return ""
+        return f"[red]+{new - old}" if new > old else f"[green]{new - old}"
+
+    table = Table(title=f"Firmware Footprint of {target.name}", box=box.ROUNDED, style='blue')
+    table.add_column("Component", style="cyan")
+    table.add_column("ROM", justify="right")
+    table.add_column("RAM", justify="right")
+    if baseline:
+        table.add_column("ROM Delta", justify="right")
+        table.add_column("RAM Delta", justify="right")
+    rows = [(name, usage, baseline["components"].get(name) if baseline else None)
+            for name, usage in report["components"].items()]
+    rows.append(("Total", report, baseline))
+    for i, (name, usage, old) in enumerate(rows):
+        row = [Text(name), format_size(usage["rom"]), format_size(usage["ram"])]
+        if baseline:
+            old = old or {"rom": 0, "ram": 0}
+            row += [delta(usage["rom"], old["rom"]), delta(usage["ram"], old["ram"])]
+        table.add_row(*row, end_section=i == len(rows) - 2)
+    print(table)
+
+    if baseline is None:
+        print(f"Saved as the size baseline of {target.name} in {SIZE_BASELINE_FILE}.")
+    for regression in regressions:
+        print(f"[red]Size budget exceeded:[/red] {regression}")
+    if regressions:
         print(Panel.fit(f"[red]{failed}", title="Sorry ...", style='red'))
-        exit(ret.returncode)
+        return 1
+    return 0
+
+
+def _watch(target: BuildTarget, env_path: str, jobs: int, timings: bool) -> None:
+    """Rebuild the target each time its sources change, until interrupted."""
+    roots = [Path(target.project)]
+    for lib in LibraryReferences(Path('.'), ignore_paths=[BUILD_DIR]).iter_resolved():
+        roots.append(lib.source_code_path)
+    # Components checked out in another component are already watched with it.
+    roots = [r for r in roots if not any(o != r and o in r.parents for o in roots)]
+
+    def on_change(changes: Set[Path]) -> None:
+        start = time.monotonic()
+        log.dbg('Changed: ' + ', '.join(str(p) for p in sorted(changes)))
+        if needs_configure(changes):
+            print(Panel(f"[magenta]Configuring ...", style='magenta'))
+            ret = subprocess.run(target.configure_command(env_path), shell=True)
+            if ret.returncode != 0:
+                print(f"[red]Configuring {target.name} failed, waiting for changes ...")
+                return
+            save_fingerprint(target, compute_fingerprint(target, env_path))
+        mark = mark_ninja_log(target)
+        returncode = _run_build_step(target, target.build_command(jobs))
+        if target.compiler_cache:
+            CompilerCache().evict()
+        if timings:
+            _report_timings(target, mark)
+        elapsed = time.monotonic() - start
+        if returncode != 0:
+            print(f"[red]Building {target.name} failed after {elapsed:.1f}s, waiting for changes ...")
+        else:
+            print(f"[green]Built {target.name} in {elapsed:.1f}s, waiting for changes ...")
+
+    print(Panel(f"[cyan]Watching {', '.join(str(r) for r in roots)}, press Ctrl+C to stop.", style='cyan'))
+    try:
+        watch_tree(roots, on_change)
+    except KeyboardInterrupt:
+        print("[cyan]Stopped watching.")
+
+
+def _tune(target: BuildTarget, env_path: str) -> None:
+    """Benchmark build profiles for the module of a target and save the fastest one."""
+    print(Panel(f"[magenta]Tuning {target.name}, each profile runs a clean build ...", style='magenta'))
+    pinned = pinned_variables(target)
+    if pinned:
+        log.wrn(f"{', '.join(pinned)} ignored while tuning, the defines still override the tuned profile.")
+
+    def on_result(profile: BuildProfile, elapsed: Optional[float]) -> None:
+        print(f"  {profile}: " + (f"{elapsed:.1f}s" if elapsed is not None else "[red]failed"))
+
+    try:
+        results = tune_target(target, env_path, on_result)
+    except RuntimeError as err:
+        raise click.ClickException(str(err))
+    best, elapsed = best_result(results)
+    save_profile(target, best, elapsed)
+
+    table = Table(title=f"Build Profiles of {target.module}", box=box.ROUNDED, style='blue')
+    table.add_column("Jobs", justify="right")
+    table.add_column("Unity Build")
+    table.add_column("Batch Size", justify="right")
+    table.add_column("PCH")
+    table.add_column("Time", justify="right")
+    for profile, time_s in sorted(results, key=lambda r: float("inf") if r[1] is None else r[1]):
+        table.add_row(
+            str(profile.jobs),
+            "on" if profile.unity else "off",
+            str(profile.unity_batch_size) if profile.unity else "-",
+            "on" if profile.pch else "off",
+            "[red]failed" if time_s is None else (f"[green]{time_s:.1f}s" if profile == best else f"{time_s:.1f}s"),
+        )
+    print(table)
+    print(f"Saved {best} as the build profile of {target.module}.")
+
+
+def _get_targets(project: str, module: str, flash: str, define: Tuple[str, ...], matrix: str) -> List[BuildTarget]:
+    """Collect the build targets from the command line arguments and the matrix file."""
+    targets = []
+    if matrix:
+        try:
+            targets += load_matrix(Path(matrix), flash, define)
+        except (ValueError, KeyError) as err:
+            raise click.BadParameter(str(err), param_hint="--matrix")
+    if project or module:
+        if not (project and module):
+            raise click.UsageError("PROJECT and MODULE must be given together.")
+        targets += [t for t in expand_targets(project.split(','), module.split(','), flash, define) if t not in targets]
+    if not targets:
+        raise click.UsageError("Missing PROJECT and MODULE arguments, or a --matrix file.")
+    return targets
+
+
+def _save_artifacts(target: BuildTarget, cache_key: str) -> None:
+    """Store the images of a successful build in the artifact cache."""
+    artifact_cache = ArtifactCache()
+    artifacts = artifact_cache.save(cache_key, target)
+    log.dbg(f'Stored {", ".join(artifacts)} in the artifact cache.')
+    artifact_cache.evict()
+
+
+def _collect_build_trees(targets: List[BuildTarget]) -> None:
+    """Apply the automatic garbage collection policy set with `mdev gc --auto`, keeping the trees just built."""
+    collected = auto_collect(keep=targets)
+    if collected:
+        log.inf(f'Collected {len(collected)} build trees to stay within the disk budget: '
+                + ', '.join(str(tree.path) for tree in collected))
+
+
+def _build_targets(
+    targets: List[BuildTarget],
+    env_path: str,
+    jobs: int,
+    parallel: int,
+    reconfigure: bool,
+    timings: bool,
+    artifact_cache: bool,
+    size: bool,
+    size_budget: Optional[Tuple[int, Optional[float]]],
+    save_size_baseline: bool,
+) -> None:
+    """Build several targets concurrently and print a summary of the results."""
+    print(Panel(f"[green]Building {len(targets)} targets ...", style='green'))
+    marks = {target: mark_ninja_log(target) for target in targets}
+    results = build_matrix(targets, env_path, jobs, parallel, reconfigure, artifact_cache)
+    _collect_build_trees(targets)
+    if any(target.compiler_cache for target in targets):
+        CompilerCache().evict()
+    if artifact_cache:
+        ArtifactCache().evict()
+    if timings:
+        for target in targets:
+            report = analyze(target, mark=marks[target])
+            if report:
+                write_report(target, report)
+    reports = {}  # type: Dict[BuildTarget, Dict]
+    regressions = {}  # type: Dict[BuildTarget, List[str]]
+    if size:
+        for result in results:
+            report = analyze_footprint(result.target) if result.ok else {}
+            if report:
+                reports[result.target] = report
+                _, regressions[result.target] = _check_size(result.target, report, size_budget, save_size_baseline)
+
+    table = Table(title="Build Summary", box=box.ROUNDED, style='blue')
+    table.add_column("Project", style="cyan")
+    table.add_column("Module", style="cyan")
+    table.add_column("Result")
+    table.add_column("Time", justify="right")
+    table.add_column("Warnings", justify="right", style="yellow")
+    if size:
+        table.add_column("ROM", justify="right")
+        table.add_column("RAM", justify="right")
+    table.add_column("Log", style="green")
+    for result in results:
+        if not result.ok:
+            status = f"[red]{result.step} failed ({result.returncode})"
+        elif regressions.get(result.target):
+            status = "[red]size budget exceeded"
+        else:
+            status = "[green]cached" if result.step == "cache" else "[green]success"
+        row = [result.target.project, result.target.module, status, f"{result.elapsed:.1f}s",
+               str(len(result.output.warnings))]
+        if size:
+            report = reports.get(result.target)
+            row += [format_size(report["rom"]), format_size(report["ram"])] if report else ["-", "-"]
+        table.add_row(*row, str(result.log_file).replace('\\', '/'))
+    print(table)
+    for target, messages in regressions.items():
+        for message in messages:
+            print(f"[red]Size budget of {target.name} exceeded:[/red] {message}")
+
+    failures = [result for result in results if not result.ok or regressions.get(result.target)]
+    if failures:
+        print(Panel.fit(f"[red]{failed}", title=f"{len(failures)}/{len(results)} targets failed", style='red'))
+        exit(1)
     print(Panel.fit(f"[green]{success}",
           title="Congratulation!", style='green'))
 
+    _print_fortune()
+
+
+def _report_timings(target: BuildTarget, mark: NinjaLogMark) -> None:
+    """Print the timing report of the build run since `mark` was taken and save it as JSON."""
+    report = analyze(target, mark=mark)
+    if not report:
+        log.wrn(f'No build steps recorded in {target.build_directory}, nothing to report.')
+        return
+
+    table = Table(title="Slowest Build Steps", box=box.ROUNDED, style='blue')
+    table.add_column("Time", justify="right")
+    table.add_column("Kind", style="magenta")
+    table.add_column("Component", style="cyan")
+    table.add_column("Output", style="green")
+    for step in sorted(report["slowest_compile"] + report["slowest_link"], key=lambda s: s["end"] - s["start"],
+                       reverse=True):
+        table.add_row(f'{(step["end"] - step["start"]) / 1000:.2f}s', step["kind"], step["group"], step["output"])
+    print(table)
+
+    table = Table(title="Build Time per Component", box=box.ROUNDED, style='blue')
+    table.add_column("Component", style="cyan")
+    table.add_column("Steps", justify="right")
+    table.add_column("CPU Time", justify="right")
+    table.add_column("Share", justify="right")
+    for group, total in report["groups"].items():
+        table.add_row(
+            group, str(total["steps"]), f'{total["cpu_ms"] / 1000:.2f}s',
+            f'{100 * total["cpu_ms"] / max(report["cpu_ms"], 1):.1f}%'
+        )
+    print(table)
+
+    path = write_report(target, report)
+    parallelism = report["cpu_ms"] / max(report["wall_ms"], 1)
+    print(f'{report["steps"]} steps, wall time {report["wall_ms"] / 1000:.2f}s, '
+          f'CPU time {report["cpu_ms"] / 1000:.2f}s (x{parallelism:.1f}), report saved to {path}')
+
+
+def _print_fortune() -> None:
     txt = fortune_txt[random.randint(0, len(fortune_txt)-1)]
     txt = txt.decode('UTF-8').encode('GBK') if sys.platform == 'win32' else txt
     print(Panel(txt, style='cyan'))
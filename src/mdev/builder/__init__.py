@@ -0,0 +1,19 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Configuration and building of MXOS projects.
+
+* Description of a single project/module build target.
+* Concurrent building of a project/module build matrix.
+* Skipping of the configure step when its inputs did not change.
+* Build step timings.
+* Streaming of the build output with progress and diagnostics.
+* Garbage collection of build trees within a disk budget.
+* Per module build profiles tuned by benchmarking.
+* ROM and RAM footprint per component, compared with a baseline.
+* In process Kconfig engine with a cached parsed tree.
+* Selection of the targets affected by a change set.
+"""
+
+from mdev.builder.target import BuildTarget
+from mdev.builder.matrix import BuildResult, build_matrix, expand_targets, load_matrix, split_jobs
@@ -0,0 +1,181 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Targets affected by a change set.
+
+The files read by a build are known from the existing build trees: ninja records the headers found by the compiler
+in .ninja_deps, the build graph lists the sources and the regeneration rule of build.ninja lists the CMake files.
+A target is affected when one of these files changed, or when a file below its project directory changed.
+
+Components are separate repositories. When the pin of a .component file tracked by the program changed, the
+component is diffed between the old pin and its working tree, otherwise only its local changes are considered.
+"""
+import re
+import os
+import subprocess
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+import git
+
+from mdev.builder.target import BuildTarget, BUILD_DIR, read_cmake_cache
+from mdev.env import get_ninja
+from mdev.project._internal import git_utils
+from mdev.project._internal.libraries import LibraryReferences, MxosLibReference
+from mdev.project.exceptions import VersionControlError
+
+
+@dataclass
+class ChangeSet:
+    """Files changed since a revision, relative to the program root.
+
+    Attributes:
+        files: Changed, added and deleted files.
+        directories: Directories whose whole content must be considered changed.
+    """
+
+    files: Set[str] = field(default_factory=set)
+    directories: Set[str] = field(default_factory=set)
+
+    def first_match(self, paths: Iterable[str]) -> Optional[str]:
+        """Return the first of the given files which changed."""
+        prefixes = tuple(d + "/" for d in self.directories)
+        for path in paths:
+            if path in self.files or prefixes and path.startswith(prefixes):
+                return path
+        return None
+
+
+def changed_files(since: str, root: Path = Path(".")) -> ChangeSet:
+    """Collect the files of the program and its components changed since a revision of the program.
+
+    Args:
+        since: A revision of the program repository.
+        root: Root of the MXOS program.
+
+    Raises:
+        VersionControlError: The program is not a git repository or the revision doesn't exist.
+    """
+    repo = git_utils.get_repo(root)
+    try:
+        changes = ChangeSet(_diff(repo, since))
+    except git.exc.GitCommandError as err:
+        raise VersionControlError(f"Failed to diff against '{since}'. Error from VCS: {err}")
+
+    # Parents first, so that the pins of nested components are known to have changed.
+    libs = LibraryReferences(root, ignore_paths=[BUILD_DIR]).iter_all()
+    for lib in sorted(libs, key=lambda lib: len(lib.reference_file.parts)):
+        reference = _relpath(lib.reference_file, root)
+        directory = _relpath(lib.source_code_path, root)
+        if reference not in changes.files:
+            base = "HEAD"
+        else:
+            base = _old_pin(repo, since, lib)
+        if base is None or not lib.is_resolved():
+            changes.directories.add(directory)
+            continue
+        try:
+            changes.files.update(f"{directory}/{f}" for f in _diff(git_utils.get_repo(lib.source_code_path), base))
+        except (git.exc.GitCommandError, VersionControlError):
+            changes.directories.add(directory)
+
+    # Components removed since the revision.
+    for reference in [f for f in changes.files if f.endswith(".component")]:
+        if not (root / reference).exists():
+            changes.directories.add(reference[:-len(".component")])
+    return changes
+
+
+def build_tree_targets(build_root: Path = Path(BUILD_DIR)) -> List[BuildTarget]:
+    """Return the targets of the configured build trees, read from their CMake cache."""
+    targets = []
+    for cache in sorted(build_root.glob("**/CMakeCache.txt")):
+        values = read_cmake_cache(cache.parent)
+        if "APP" in values and "MODULE" in values:
+            target = BuildTarget(values["APP"], values["MODULE"])
+            if Path(target.build_directory).resolve() == cache.parent.resolve() and target not in targets:
+                targets.append(target)
+    return targets
+
+
+def target_inputs(target: BuildTarget, root: Path = Path(".")) -> Optional[Set[str]]:
+    """Return the files of the program read by the last build of a target, None if it has no build tree."""
+    build_dir = Path(target.build_directory)
+    build_ninja = build_dir / "build.ninja"
+    if not build_ninja.is_file():
+        return None
+
+    paths = []  # type: List[str]
+    for tool in ("deps", "inputs"):
+        # `-t inputs` needs ninja 1.11, older versions still report the headers and the CMake files.
+        result = subprocess.run(
+            [get_ninja(), "-C", str(build_dir), "-t", tool], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, errors="replace",
+        )
+        if result.returncode != 0:
+            continue
+        lines = result.stdout.splitlines()
+        # Dependencies are listed indented below each object.
+        paths += [line.strip() for line in lines if line.startswith(" ")] if tool == "deps" else lines
+
+    text = build_ninja.read_text(errors="replace").replace("$\n", "")
+    for line in text.splitlines():
+        if line.startswith("build build.ninja") and "|" in line:
+            paths += re.split(r"(?<!\$) ", line.split("|", 1)[1].strip())
+
+    root = root.resolve()
+    inputs = set()
+    for path in paths:
+        path = path.replace("$ ", " ").replace("$:", ":")
+        if not path:
+            continue
+        absolute = Path(os.path.normpath(os.path.join(str(build_dir.resolve()), path)))
+        try:
+            inputs.add(absolute.relative_to(root).as_posix())
+        except ValueError:
+            continue
+    return {path for path in inputs if not path.startswith(BUILD_DIR + "/")}
+
+
+def find_affected(targets: List[BuildTarget], changes: ChangeSet, root: Path = Path(".")) -> Dict[BuildTarget, str]:
+    """Select the targets affected by a change set.
+
+    Returns:
+        The reason each affected target must be built, by target, in the order of `targets`.
+    """
+    affected = {}
+    for target in targets:
+        inputs = target_inputs(target, root)
+        if inputs is None:
+            affected[target] = "no build tree"
+            continue
+        changed = changes.first_match(sorted(inputs))
+        if changed is None:
+            changed = changes.first_match(f for f in sorted(changes.files) if f.startswith(target.project + "/"))
+        if changed is not None:
+            affected[target] = changed
+    return affected
+
+
+def _diff(repo: git.Repo, base: str) -> Set[str]:
+    """List the files of a repository changed between a revision and the working tree, untracked files included."""
+    files = set(repo.git.diff("--name-only", "--no-renames", base, "--").splitlines())
+    files.update(repo.git.ls_files("--others", "--exclude-standard").splitlines())
+    return files
+
+
+def _old_pin(repo: git.Repo, since: str, lib: MxosLibReference) -> Optional[str]:
+    """Return the revision a component was pinned to at a revision of the program, None if unknown."""
+    try:
+        relpath = lib.reference_file.resolve().relative_to(Path(repo.working_tree_dir).resolve()).as_posix()
+        content = repo.git.show(f"{since}:{relpath}")
+    except (ValueError, git.exc.GitCommandError):
+        return None
+    ref = content.strip().partition("#")[2]
+    return ref or None
+
+
+def _relpath(path: Path, root: Path) -> str:
+    return path.resolve().relative_to(root.resolve()).as_posix()
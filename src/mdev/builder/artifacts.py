@@ -0,0 +1,173 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Cache of final firmware images keyed by the build inputs.
+
+A target built again from the same app sources, component revisions, defines, module and toolchain versions produces
+the same images, they are restored from the cache instead of running cmake.
+"""
+import os
+import json
+import hashlib
+
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from mdev.builder.target import BuildTarget, BUILD_DIR
+from mdev.builder.fingerprint import tool_version
+from mdev.builder.kconfig import find_setup
+from mdev.compiler_cache import ContentStore
+from mdev.env import env_root, get_cmake, get_ninja
+from mdev.project._internal import git_utils
+from mdev.project._internal.libraries import LibraryReferences
+from mdev.project.exceptions import VersionControlError
+
+# Bump when the content of the input hash changes.
+ARTIFACT_CACHE_VERSION = "3"
+
+# Build outputs restored on a cache hit.
+ARTIFACT_SUFFIXES = (".bin", ".elf", ".hex", ".map", ".ota", ".img")
+
+MANIFEST_FILE_NAME = "manifest.json"
+
+_IGNORED_DIR_NAMES = (".git", BUILD_DIR)
+
+
+class ArtifactCache(ContentStore):
+    """Store of the final images of previous builds."""
+
+    STATS = ("hit", "miss", "uncacheable")
+    DEFAULT_MAX_SIZE = 2 * 1024 ** 3
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        """Use the per user artifact cache by default."""
+        super().__init__(root or artifact_cache_root())
+
+    def restore(self, key: str, target: BuildTarget) -> Optional[List[str]]:
+        """Copy the artifacts of a previous build into the build tree of a target.
+
+        Returns:
+            The restored files relative to the build tree, None on a cache miss.
+        """
+        entry = self.lookup(key)
+        if entry is None:
+            self.record("miss")
+            return None
+        try:
+            manifest = json.loads((entry / MANIFEST_FILE_NAME).read_text())
+            for name, relpath in manifest["files"].items():
+                destination = Path(target.build_directory, relpath)
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                destination.write_bytes((entry / name).read_bytes())
+        except (OSError, ValueError, KeyError):
+            # Entry evicted while reading it.
+            self.record("miss")
+            return None
+        self.record("hit")
+        return list(manifest["files"].values())
+
+    def save(self, key: str, target: BuildTarget) -> List[str]:
+        """Store the artifacts found in the build tree of a target.
+
+        Returns:
+            The stored files relative to the build tree.
+        """
+        build_dir = Path(target.build_directory)
+        artifacts = collect_artifacts(build_dir)
+        if not artifacts:
+            return []
+        files = {str(i): path for i, path in enumerate(artifacts)}  # type: Dict[str, Union[bytes, Path]]
+        relpaths = {str(i): str(path.relative_to(build_dir)).replace("\\", "/") for i, path in enumerate(artifacts)}
+        files[MANIFEST_FILE_NAME] = json.dumps({"target": target.name, "files": relpaths}).encode()
+        self.store(key, files)
+        return list(relpaths.values())
+
+
+def artifact_cache_root() -> Path:
+    """Directory of the per user artifact cache, MDEV_ARTIFACT_CACHE_DIR if set.
+
+    Read on each call, the environment of a command served by the mdev daemon is only set after it started.
+    """
+    return Path(os.environ.get("MDEV_ARTIFACT_CACHE_DIR", os.path.join(env_root, "artifacts")))
+
+
+def collect_artifacts(build_dir: Path) -> List[Path]:
+    """List the final images and map files of a build tree."""
+    artifacts = []
+    for dirpath, dirnames, filenames in os.walk(str(build_dir)):
+        dirnames[:] = [d for d in dirnames if d != "CMakeFiles"]
+        artifacts += [Path(dirpath, f) for f in filenames if f.endswith(ARTIFACT_SUFFIXES)]
+    return sorted(artifacts)
+
+
+def input_hash(target: BuildTarget, root: Path = Path(".")) -> Optional[str]:
+    """Hash every input of a target build.
+
+    Args:
+        target: The target to hash.
+        root: Root of the MXOS program.
+
+    Returns:
+        Hex digest of the inputs, None if they can't be identified because a component has local changes.
+    """
+    digest = hashlib.sha256()
+
+    def update(*parts: str) -> None:
+        for part in parts:
+            digest.update(part.encode())
+            digest.update(b"\0")
+
+    update(ARTIFACT_CACHE_VERSION, target.module, str(target.flash), *target.defines)
+    update(tool_version(get_cmake()), tool_version(get_ninja()))
+
+    # Options changed with `mdev config` or the menu live in the .config file of the build tree. Before the first
+    # configure it doesn't exist yet, the one configure generates depends on the sources hashed below. The hash is
+    # computed once before the build and used for the lookup and the save, hashing the generated file after the build
+    # would store the images of a fresh build tree under a key it never looks up.
+    try:
+        config = find_setup(target).config
+    except ValueError:
+        config = Path(target.build_directory, ".config")
+    update(config.read_text(errors="replace") if config.is_file() else "")
+
+    components = sorted(LibraryReferences(root, ignore_paths=[BUILD_DIR]).iter_resolved())
+    component_dirs = {lib.source_code_path.resolve() for lib in components}
+
+    # The revision of the program is compiled in as MXOS_APP_VERSION. Its local changes may be anywhere in the
+    # program, not only below the project, they are hashed as a diff and the content of the untracked files.
+    try:
+        repo = git_utils.get_repo(root)
+        update(repo.head.object.hexsha, repo.git.diff("HEAD", "--binary"))
+        untracked = repo.git.ls_files("--others", "--exclude-standard", "-z", "--", ".", f":!{BUILD_DIR}")
+        for name in sorted(filter(None, untracked.split("\0"))):
+            path = Path(repo.working_tree_dir, name)
+            # Nested repositories are listed as directories, the components are hashed below.
+            if path.is_file() and not any(d == path.resolve() or d in path.resolve().parents for d in component_dirs):
+                update(name)
+                digest.update(path.read_bytes())
+    except (VersionControlError, ValueError):
+        update("")
+
+    for lib in components:
+        try:
+            repo = git_utils.get_repo(lib.source_code_path)
+            if repo.is_dirty(untracked_files=True):
+                return None
+            revision = repo.head.object.hexsha
+        except (VersionControlError, ValueError):
+            return None
+        update(str(lib.reference_file.relative_to(root)).replace("\\", "/"), revision)
+
+    cmakelists = root / "CMakeLists.txt"
+    sources = [cmakelists] if cmakelists.is_file() else []
+    for dirpath, dirnames, filenames in os.walk(str(root / target.project)):
+        dirnames[:] = sorted(
+            d for d in dirnames if d not in _IGNORED_DIR_NAMES and Path(dirpath, d).resolve() not in component_dirs
+        )
+        sources += [Path(dirpath, f) for f in sorted(filenames)]
+    for source in sources:
+        data = source.read_bytes()
+        update(str(source.relative_to(root)).replace("\\", "/"), str(len(data)))
+        digest.update(data)
+
+    return digest.hexdigest()
@@ -0,0 +1,34 @@
+# Copyright (c) 2022 MXCHIP Inc. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+# Author: Snow Yang (snowyang.iot@outlook.com)
+# date  : 2026/10/17
+
+# Precompiled mxos headers for programs whose root CMakeLists.txt predates the
+# MXOS_PCH option. Loaded through CMAKE_PROJECT_INCLUDE by `mdev build --pch`.
+
+include_guard(GLOBAL)
+
+# Deferred calls need CMake 3.19. Programs handling MXOS_PCH themselves still get it with older versions.
+if(CMAKE_VERSION VERSION_LESS 3.19)
+  message(WARNING "mdev build --pch needs CMake 3.19 or newer for programs without the MXOS_PCH option, "
+                  "CMake ${CMAKE_VERSION} is used. Headers are precompiled only if the program supports MXOS_PCH.")
+  return()
+endif()
+
+set(MXOS_PCH_HEADERS "<mxos.h>" CACHE STRING "Headers precompiled when MXOS_PCH is ON")
+
+function(mxos_pch_apply)
+  get_property(applied GLOBAL PROPERTY MXOS_PCH_APPLIED)
+  if(NOT MXOS_PCH OR applied)
+    return()
+  endif()
+  if(NOT TARGET mxos_interface)
+    message(WARNING "MXOS_PCH is ON but there is no mxos_interface target, headers are not precompiled.")
+    return()
+  endif()
+  target_precompile_headers(mxos_interface INTERFACE ${MXOS_PCH_HEADERS})
+  set_property(GLOBAL PROPERTY MXOS_PCH_APPLIED TRUE)
+endfunction()
+
+# Every mxos target exists once the root directory is processed.
+cmake_language(DEFER DIRECTORY ${CMAKE_SOURCE_DIR} CALL mxos_pch_apply)
@@ -0,0 +1,82 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Fingerprint of the inputs of the CMake configure step.
+
+The configure step only needs to run again when one of its inputs changed. Changes to CMakeLists.txt files are
+already picked up by the regeneration rule cmake writes into build.ninja, the fingerprint covers everything else.
+"""
+import json
+import hashlib
+import subprocess
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from mdev.builder.target import BuildTarget
+from mdev.env import get_cmake, get_ninja
+from mdev.project._internal.libraries import LibraryReferences
+
+FINGERPRINT_FILE_NAME = "mdev-fingerprint.json"
+
+
+def compute_fingerprint(target: BuildTarget, env_path: str, root: Path = Path(".")) -> str:
+    """Hash all inputs of the configure step of a target.
+
+    Args:
+        target: The target to configure.
+        env_path: The mdev environment directory returned by `get_env()`.
+        root: Root of the MXOS program holding the .component files.
+
+    Returns:
+        Hex digest of the configure inputs.
+    """
+    components = LibraryReferences(root, ignore_paths=[target.build_directory.split("/")[0]])
+    data = {
+        "command": target.configure_command(env_path),
+        "cmake": tool_version(get_cmake()),
+        "ninja": tool_version(get_ninja()),
+        "components": sorted(
+            (str(lib.reference_file.relative_to(root)).replace("\\", "/"), lib.reference_file.read_text().strip())
+            for lib in components.iter_all()
+        ),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def is_configured(target: BuildTarget, fingerprint: str) -> bool:
+    """Check that the build tree of a target was generated from the given fingerprint."""
+    build_dir = Path(target.build_directory)
+    if not (build_dir / "build.ninja").is_file() or not (build_dir / "CMakeCache.txt").is_file():
+        return False
+    return read_fingerprint(target) == fingerprint
+
+
+def read_fingerprint(target: BuildTarget) -> Optional[str]:
+    """Return the fingerprint stored in the build tree of a target, if any."""
+    try:
+        return json.loads(Path(target.build_directory, FINGERPRINT_FILE_NAME).read_text())["fingerprint"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_fingerprint(target: BuildTarget, fingerprint: str) -> None:
+    """Store the fingerprint of a successful configure step in the build tree of a target."""
+    Path(target.build_directory, FINGERPRINT_FILE_NAME).write_text(json.dumps({"fingerprint": fingerprint}))
+
+
+def clear_fingerprint(target: BuildTarget) -> None:
+    """Remove the stored fingerprint, so that a failed configure step is retried next time."""
+    path = Path(target.build_directory, FINGERPRINT_FILE_NAME)
+    if path.exists():
+        path.unlink()
+
+
+@lru_cache(maxsize=None)
+def tool_version(exe: str) -> str:
+    """Return the --version output of a tool, empty if it can't be run."""
+    try:
+        return subprocess.run([exe, "--version"], stdout=subprocess.PIPE, universal_newlines=True).stdout.strip()
+    except OSError:
+        return ""
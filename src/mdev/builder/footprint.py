@@ -0,0 +1,237 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""ROM and RAM footprint of a firmware image.
+
+Totals come from the section headers of the ELF image: allocated sections with content take ROM, writable allocated
+sections take RAM, so initialised data counts for both. The input sections listed in the linker map file attribute
+the usage to mxos core, each component and the app.
+"""
+import re
+import json
+import struct
+
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from mdev.builder.target import BuildTarget
+from mdev.builder.artifacts import collect_artifacts
+from mdev.builder.timings import component_groups, group_of, OTHER
+
+SIZE_REPORT_FILE_NAME = "mdev-size.json"
+SIZE_BASELINE_FILE = Path("mdev-size-baseline.json")
+TOOLCHAIN = "toolchain"
+
+_SHT_NOBITS = 8
+_SHF_WRITE = 0x1
+_SHF_ALLOC = 0x2
+
+_OUTPUT_SECTION_RE = re.compile(r"^(\.\S+)(?:\s+0x([0-9a-fA-F]+)\s+0x([0-9a-fA-F]+))?\s*$")
+_INPUT_SECTION_RE = re.compile(r"^ (\S+)(?:\s+0x([0-9a-fA-F]+)\s+0x([0-9a-fA-F]+)(?:\s+(.+?))?)?\s*$")
+_CONTINUATION_RE = re.compile(r"^\s+0x([0-9a-fA-F]+)\s+0x([0-9a-fA-F]+)\s+(.+?)\s*$")
+
+
+@dataclass
+class Section:
+    """An allocated section of an ELF image.
+
+    Attributes:
+        name: Section name.
+        size: Size in bytes.
+        rom: The section content is stored in flash.
+        ram: The section is located in RAM.
+    """
+
+    name: str
+    size: int
+    rom: bool
+    ram: bool
+
+
+def read_sections(path: Path) -> List[Section]:
+    """Read the allocated sections of a 32 or 64 bit ELF file.
+
+    Raises:
+        ValueError: The file is not an ELF file.
+    """
+    data = path.read_bytes()
+    if data[:4] != b"\x7fELF":
+        raise ValueError(f"{path} is not an ELF file.")
+    endian = "<" if data[5] == 1 else ">"
+    if data[4] == 2:
+        shoff, = struct.unpack_from(endian + "Q", data, 0x28)
+        shentsize, shnum, shstrndx = struct.unpack_from(endian + "HHH", data, 0x3A)
+        header = endian + "IIQQQQ"
+    else:
+        shoff, = struct.unpack_from(endian + "I", data, 0x20)
+        shentsize, shnum, shstrndx = struct.unpack_from(endian + "HHH", data, 0x2E)
+        header = endian + "IIIIII"
+
+    headers = [struct.unpack_from(header, data, shoff + i * shentsize) for i in range(shnum)]
+    strtab = headers[shstrndx][4] if shstrndx < len(headers) else 0
+
+    sections = []
+    for name, sh_type, flags, _, _, size in headers:
+        if not flags & _SHF_ALLOC or not size:
+            continue
+        name = data[strtab + name:data.index(b"\0", strtab + name)].decode(errors="replace")
+        sections.append(Section(name, size, sh_type != _SHT_NOBITS, bool(flags & _SHF_WRITE)))
+    return sections
+
+
+def parse_map(path: Path) -> List[Tuple[str, str, int]]:
+    """Parse the input sections of a GNU ld map file.
+
+    Returns:
+        The output section, the input file and the size of each input section, fill bytes are attributed to the
+        output section with an empty input file.
+    """
+    entries = []
+    output = None  # type: Optional[str]
+    pending = None  # type: Optional[str]
+    in_memory_map = False
+    for line in path.read_text(errors="replace").splitlines():
+        if not in_memory_map:
+            in_memory_map = line.startswith("Linker script and memory map")
+            continue
+        if pending is not None:
+            match = _CONTINUATION_RE.match(line)
+            pending = None
+            if match and output:
+                entries.append((output, match.group(3), int(match.group(2), 16)))
+                continue
+        match = _OUTPUT_SECTION_RE.match(line)
+        if match:
+            output = match.group(1)
+            continue
+        if line.startswith("/DISCARD/"):
+            output = None
+            continue
+        if not line.startswith(" ") or line.startswith("  ") or output is None:
+            continue
+        match = _INPUT_SECTION_RE.match(line)
+        if not match or match.group(1).startswith("*") and match.group(1) != "*fill*":
+            continue
+        if match.group(2) is None:
+            # Long section names push the address and size to the next line.
+            pending = match.group(1)
+            continue
+        source = "" if match.group(1) == "*fill*" else match.group(4) or ""
+        entries.append((output, source, int(match.group(3), 16)))
+    return entries
+
+
+def find_image(target: BuildTarget) -> Tuple[Optional[Path], Optional[Path]]:
+    """Return the ELF image of a target and its map file, if found in its build tree."""
+    artifacts = collect_artifacts(Path(target.build_directory))
+    stem = Path(target.project).name
+
+    def pick(suffix: str) -> Optional[Path]:
+        files = [path for path in artifacts if path.suffix == suffix]
+        named = [path for path in files if path.name.split(".")[0] == stem]
+        return (named or files or [None])[0]
+
+    return pick(".elf"), pick(".map")
+
+
+def analyze_footprint(target: BuildTarget, root: Path = Path(".")) -> Dict:
+    """Compute the ROM and RAM footprint of the image of a target.
+
+    Returns:
+        The footprint report, empty if the build tree holds no ELF image.
+    """
+    elf, map_file = find_image(target)
+    if elf is None:
+        return {}
+    sections = read_sections(elf)
+    report = {
+        "target": target.name,
+        "image": str(elf).replace("\\", "/"),
+        "rom": sum(s.size for s in sections if s.rom),
+        "ram": sum(s.size for s in sections if s.ram),
+        "sections": {s.name: {"size": s.size, "rom": s.rom, "ram": s.ram} for s in sections},
+        "components": {},
+    }
+    if map_file is None:
+        return report
+
+    groups = component_groups(target, root)
+    prefixes = sorted(groups, key=len, reverse=True)
+    build_dir = Path(target.build_directory).resolve()
+    kinds = {s.name: s for s in sections}
+    totals = defaultdict(lambda: {"rom": 0, "ram": 0})  # type: Dict[str, Dict[str, int]]
+    for output, source, size in parse_map(map_file):
+        section = kinds.get(output)
+        if section is None:
+            continue
+        group = _source_group(source, build_dir, groups, prefixes)
+        if section.rom:
+            totals[group]["rom"] += size
+        if section.ram:
+            totals[group]["ram"] += size
+    report["components"] = dict(sorted(totals.items(), key=lambda item: item[1]["rom"], reverse=True))
+    return report
+
+
+def write_size_report(target: BuildTarget, report: Dict) -> Path:
+    """Write a footprint report to the build tree of a target."""
+    path = Path(target.build_directory, SIZE_REPORT_FILE_NAME)
+    path.write_text(json.dumps(report, indent=2))
+    return path
+
+
+def load_baseline(target: BuildTarget, path: Path = SIZE_BASELINE_FILE) -> Optional[Dict]:
+    """Return the baseline footprint of a target, if one was saved."""
+    try:
+        return json.loads(path.read_text())[target.name]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_baseline(target: BuildTarget, report: Dict, path: Path = SIZE_BASELINE_FILE) -> None:
+    """Save a footprint report as the baseline of a target."""
+    try:
+        baselines = json.loads(path.read_text())
+    except (OSError, ValueError):
+        baselines = {}
+    baselines[target.name] = {key: report[key] for key in ("rom", "ram", "components")}
+    path.write_text(json.dumps(baselines, indent=2, sort_keys=True))
+
+
+def find_regressions(
+    report: Dict, baseline: Dict, budget: int = 0, budget_percent: Optional[float] = None
+) -> List[str]:
+    """Compare the ROM and RAM totals of a footprint report with a baseline.
+
+    Args:
+        report: The current footprint.
+        baseline: The baseline footprint.
+        budget: Growth allowed in bytes.
+        budget_percent: Growth allowed in percent of the baseline, used instead of `budget` if given.
+
+    Returns:
+        A message for each total which grew beyond the budget.
+    """
+    regressions = []
+    for memory in ("rom", "ram"):
+        old, new = baseline[memory], report[memory]
+        allowed = old * budget_percent / 100 if budget_percent is not None else budget
+        if new - old > allowed:
+            regressions.append(f"{memory.upper()} grew by {new - old} bytes ({old} -> {new}), budget {allowed:.0f} bytes")
+    return regressions
+
+
+def _source_group(source: str, build_dir: Path, groups: Dict[str, str], prefixes: List[str]) -> str:
+    """Return the component an input file of the linker belongs to."""
+    if not source:
+        return OTHER
+    # Archive members are listed as `path/libfoo.a(foo.c.obj)`.
+    path = Path(source.split("(")[0])
+    if path.is_absolute():
+        try:
+            path = path.resolve().relative_to(build_dir)
+        except ValueError:
+            return TOOLCHAIN
+    return group_of(str(path).replace("\\", "/"), groups, prefixes)
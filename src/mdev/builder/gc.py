@@ -0,0 +1,255 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Garbage collection of build trees.
+
+Every build records when its build tree was last used and holds a shared lock on it while it runs. The collector
+removes the least recently used trees, or strips them down to their final images, until the build directory fits in a
+disk budget. It holds an exclusive lock on each tree it collects, so that trees being built are skipped and builds
+starting meanwhile wait for it.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from mdev.builder.target import BuildTarget, BUILD_DIR
+from mdev.builder.artifacts import collect_artifacts
+from mdev.env import env_root
+
+LAST_USED_FILE_NAME = "mdev-last-used"
+LOCK_FILE_NAME = "mdev-build.lock"
+GC_CONFIG_FILE = Path(env_root, "gc.json")
+
+if sys.platform == "win32":
+    import msvcrt
+
+    # There are no shared locks, builds of the same tree run one after the other.
+    def _lock_shared(fd: int) -> None:
+        while True:
+            try:
+                # Gives up after 10 seconds.
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _try_lock(fd: int) -> bool:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd: int) -> None:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_shared(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+
+    def _try_lock(fd: int) -> bool:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@dataclass
+class BuildTree:
+    """A build tree found in the build directory.
+
+    Attributes:
+        path: Path of the build tree.
+        size: Disk usage in bytes.
+        last_used: Time of the last build, in seconds since the epoch.
+    """
+
+    path: Path
+    size: int
+    last_used: float
+
+
+@contextmanager
+def build_lock(target: BuildTarget) -> Iterator[None]:
+    """Mark the build tree of a target as used and protect it from the collector while the block runs.
+
+    Waits for the collector if it is collecting the tree.
+    """
+    build_dir = Path(target.build_directory)
+    lock_file = build_dir / LOCK_FILE_NAME
+    while True:
+        build_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(lock_file), os.O_RDWR | os.O_CREAT, 0o644)
+        _lock_shared(fd)
+        try:
+            if os.path.samestat(os.fstat(fd), os.stat(str(lock_file))):
+                break
+        except OSError:
+            pass
+        # The collector removed the tree while this build waited for it.
+        _unlock(fd)
+        os.close(fd)
+    try:
+        (build_dir / LAST_USED_FILE_NAME).write_text(str(time.time()))
+        yield
+    finally:
+        _unlock(fd)
+        os.close(fd)
+
+
+def is_locked(path: Path) -> bool:
+    """Check if a build is running in a build tree."""
+    lock_file = path / LOCK_FILE_NAME
+    if not lock_file.exists():
+        return False
+    fd = os.open(str(lock_file), os.O_RDWR)
+    try:
+        if _try_lock(fd):
+            _unlock(fd)
+            return False
+        return True
+    finally:
+        os.close(fd)
+
+
+def find_build_trees(build_root: Path = Path(BUILD_DIR)) -> List[BuildTree]:
+    """List the build trees below the build directory, least recently used first."""
+    trees = []
+    for dirpath, dirnames, filenames in os.walk(str(build_root)):
+        if LAST_USED_FILE_NAME not in filenames and "CMakeCache.txt" not in filenames:
+            continue
+        dirnames[:] = []
+        path = Path(dirpath)
+        try:
+            last_used = float((path / LAST_USED_FILE_NAME).read_text())
+        except (OSError, ValueError):
+            last_used = path.stat().st_mtime
+        trees.append(BuildTree(path, _disk_usage(path), last_used))
+    return sorted(trees, key=lambda tree: tree.last_used)
+
+
+def collect(
+    budget: int, strip: bool = False, dry_run: bool = False, build_root: Path = Path(BUILD_DIR),
+    keep: Optional[List[Path]] = None,
+) -> List[BuildTree]:
+    """Free build trees until the build directory fits in a disk budget.
+
+    Args:
+        budget: Disk budget in bytes.
+        strip: Keep the final images and map files of the collected trees.
+        dry_run: Only report what would be collected.
+        build_root: The build directory.
+        keep: Build trees which must not be collected.
+
+    Returns:
+        The collected trees.
+    """
+    keep = [k.resolve() for k in keep or []]
+    trees = find_build_trees(build_root)
+    total = sum(tree.size for tree in trees)
+    collected = []
+    for tree in trees:
+        if total <= budget:
+            break
+        if tree.path.resolve() in keep:
+            continue
+        if dry_run:
+            if is_locked(tree.path):
+                continue
+        else:
+            with _collector_lock(tree.path) as locked:
+                if not locked:
+                    continue
+                if strip:
+                    _strip(tree.path)
+                else:
+                    shutil.rmtree(str(tree.path), ignore_errors=True)
+        freed = tree.size - (_disk_usage(tree.path) if strip and not dry_run else 0)
+        total -= freed
+        collected.append(tree)
+    return collected
+
+
+def load_policy() -> Optional[dict]:
+    """Return the automatic collection policy, None if automatic collection is disabled."""
+    try:
+        return json.loads(GC_CONFIG_FILE.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def save_policy(budget: Optional[int], strip: bool = False) -> None:
+    """Enable automatic collection after each build, or disable it if no budget is given."""
+    if budget is None:
+        if GC_CONFIG_FILE.exists():
+            GC_CONFIG_FILE.unlink()
+        return
+    GC_CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    GC_CONFIG_FILE.write_text(json.dumps({"budget": budget, "strip": strip}))
+
+
+def auto_collect(keep: List[BuildTarget]) -> List[BuildTree]:
+    """Apply the automatic collection policy, if enabled, keeping the given targets."""
+    policy = load_policy()
+    if not policy:
+        return []
+    return collect(policy["budget"], policy.get("strip", False), keep=[Path(t.build_directory) for t in keep])
+
+
+@contextmanager
+def _collector_lock(path: Path) -> Iterator[bool]:
+    """Lock a build tree for the time it is collected, yields False if a build holds the lock."""
+    try:
+        fd = os.open(str(path / LOCK_FILE_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError:
+        yield False
+        return
+    try:
+        locked = _try_lock(fd)
+        try:
+            yield locked
+        finally:
+            if locked:
+                _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def _strip(path: Path) -> None:
+    """Remove everything from a build tree but its final images, the last use time and the lock."""
+    keep = set(collect_artifacts(path)) | {path / LAST_USED_FILE_NAME, path / LOCK_FILE_NAME}
+    for dirpath, dirnames, filenames in os.walk(str(path), topdown=False):
+        for name in filenames:
+            file = Path(dirpath, name)
+            if file not in keep:
+                file.unlink()
+        for name in dirnames:
+            try:
+                Path(dirpath, name).rmdir()
+            except OSError:
+                # Still holds artifacts.
+                pass
+
+
+def _disk_usage(path: Path) -> int:
+    size = 0
+    for dirpath, _, filenames in os.walk(str(path)):
+        for name in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                continue
+    return size
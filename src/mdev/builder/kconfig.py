@@ -0,0 +1,273 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""In process Kconfig engine.
+
+The Kconfig tree of a build tree is loaded with kconfiglib using the environment the build system passes to its
+guiconfig target, read from build.ninja, so that the result is the same as running guiconfig. The parsed tree is
+pickled in the build tree and reused until one of the Kconfig files or the environment variables it references
+changes.
+"""
+import os
+import re
+import sys
+import shlex
+import pickle
+import threading
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import kconfiglib
+
+from mdev.builder.target import BuildTarget
+from mdev import log
+
+KCONFIG_CACHE_FILE_NAME = "mdev-kconfig.pickle"
+
+# Targets generated by the build system to run the Kconfig tools, the first one found is used.
+KCONFIG_TARGETS = ("guiconfig", "menuconfig")
+
+# Menu trees are linked lists which pickle recursively.
+_PICKLE_RECURSION_LIMIT = 100000
+_PICKLE_STACK_SIZE = 256 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class KconfigSetup:
+    """How the build system runs the Kconfig tools of a build tree.
+
+    Attributes:
+        kconfig: The root Kconfig file.
+        config: The .config file of the build tree.
+        env: Environment variables set for the Kconfig tools.
+        cwd: Working directory of the Kconfig tools.
+    """
+
+    kconfig: Path
+    config: Path
+    env: Tuple[Tuple[str, str], ...]
+    cwd: Path
+
+
+def find_setup(target: BuildTarget) -> KconfigSetup:
+    """Read how the Kconfig tools are run from the build.ninja file of a target.
+
+    Raises:
+        ValueError: The build tree is not configured or has no Kconfig target.
+    """
+    build_ninja = Path(target.build_directory, "build.ninja")
+    if not build_ninja.is_file():
+        raise ValueError(f"{target.name} is not configured, run `mdev build {target.project} {target.module}` first.")
+
+    commands = {}  # type: Dict[str, str]
+    edge = None  # type: Optional[str]
+    for line in build_ninja.read_text(errors="replace").splitlines():
+        if line.startswith("build "):
+            outputs = line[len("build "):].split(":")[0]
+            edge = next((t for t in KCONFIG_TARGETS if f"CMakeFiles/{t}" in outputs), None)
+        elif edge and line.strip().startswith("COMMAND = "):
+            commands.setdefault(edge, line.strip()[len("COMMAND = "):])
+    command = next((commands[t] for t in KCONFIG_TARGETS if t in commands), None)
+    if command is None:
+        raise ValueError(f"No {' or '.join(KCONFIG_TARGETS)} target in {build_ninja}.")
+
+    cwd = Path(target.build_directory).resolve()
+    if command.startswith("cd "):
+        directory, _, command = command[len("cd "):].partition(" && ")
+        cwd = Path(shlex.split(directory)[0])
+    args = shlex.split(command)
+    env = []
+    if len(args) > 2 and args[1:3] == ["-E", "env"]:
+        args = args[3:]
+        while args and "=" in args[0] and not args[0].startswith("-"):
+            name, _, value = args.pop(0).partition("=")
+            env.append((name, value))
+    # The remaining arguments are the interpreter, the Kconfig tool and the root Kconfig file.
+    if len(args) < 3:
+        raise ValueError(f"Unexpected Kconfig command in {build_ninja}: {command}")
+    kconfig = cwd / args[-1]
+    config = cwd / dict(env).get("KCONFIG_CONFIG", ".config")
+    return KconfigSetup(kconfig, config, tuple(env), cwd)
+
+
+@contextmanager
+def open_kconfig(target: BuildTarget) -> Iterator[Tuple[kconfiglib.Kconfig, KconfigSetup]]:
+    """Load the Kconfig tree and the .config file of a target.
+
+    The environment and the working directory of the Kconfig tools are applied until the block exits, so that
+    kconfiglib helpers relying on them behave as in the build system.
+
+    Raises:
+        ValueError: The Kconfig setup of the build tree can't be found.
+        kconfiglib.KconfigError: The Kconfig tree is invalid.
+    """
+    setup = find_setup(target)
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    cache_file = Path(target.build_directory, KCONFIG_CACHE_FILE_NAME).resolve()
+    os.environ.update(setup.env)
+    os.chdir(str(setup.cwd))
+    try:
+        kconf = _load_cached(cache_file, setup)
+        if kconf is None:
+            kconf = kconfiglib.Kconfig(str(setup.kconfig))
+            _save_cached(cache_file, setup, kconf)
+        if setup.config.is_file():
+            kconf.load_config(str(setup.config))
+        yield kconf, setup
+    finally:
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+
+def set_values(kconf: kconfiglib.Kconfig, assignments: Dict[str, str]) -> List[str]:
+    """Assign values to symbols.
+
+    Args:
+        kconf: The Kconfig tree.
+        assignments: Values by symbol name, with or without the CONFIG_ prefix.
+
+    Returns:
+        An error message for each assignment which didn't take effect.
+    """
+    errors = []
+    for name, value in assignments.items():
+        sym = kconf.syms.get(_strip_prefix(kconf, name))
+        if sym is None or not sym.nodes:
+            errors.append(f"Undefined symbol {name}")
+            continue
+        if sym.orig_type == kconfiglib.STRING and len(value) > 1 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        if not sym.set_value(value):
+            errors.append(f"Invalid value '{value}' for {sym.name} ({kconfiglib.TYPE_TO_STR[sym.orig_type]})")
+    return errors + unapplied(kconf, [_strip_prefix(kconf, name) for name in assignments])
+
+
+def unapplied(kconf: kconfiglib.Kconfig, names: Optional[List[str]] = None) -> List[str]:
+    """Describe the user values which were overridden by dependencies, ranges or selects.
+
+    Args:
+        kconf: The Kconfig tree.
+        names: Symbols to check, all symbols with a user value by default.
+    """
+    messages = []
+    syms = [kconf.syms[name] for name in names if name in kconf.syms] if names else kconf.unique_defined_syms
+    for sym in syms:
+        if sym.user_value is None or sym.choice:
+            continue
+        wanted = sym.user_value
+        if sym.orig_type in (kconfiglib.BOOL, kconfiglib.TRISTATE):
+            wanted = kconfiglib.TRI_TO_STR[wanted]
+        if wanted != sym.str_value:
+            dependency = kconfiglib.expr_str(sym.direct_dep)
+            messages.append(
+                f"{sym.name} was set to '{wanted}' but got '{sym.str_value}', it depends on {dependency}"
+                if not sym.visibility else f"{sym.name} was set to '{wanted}' but got '{sym.str_value}'"
+            )
+    return messages
+
+
+def fragment_symbols(kconf: kconfiglib.Kconfig, path: Path) -> List[str]:
+    """Return the names of the symbols assigned by a configuration fragment."""
+    prefix = re.escape(kconf.config_prefix)
+    pattern = re.compile(rf"^(?:{prefix}(\w+)=|# {prefix}(\w+) is not set)")
+    names = []
+    for line in path.read_text(errors="replace").splitlines():
+        match = pattern.match(line)
+        if match:
+            names.append(match.group(1) or match.group(2))
+    return names
+
+
+def run_menu(target: BuildTarget) -> None:
+    """Open the terminal configuration menu of a target, changes are saved to its .config file.
+
+    Raises:
+        ValueError: The Kconfig setup of the build tree can't be found.
+        ImportError: curses is not available, it's provided by the windows-curses package on Windows.
+    """
+    import menuconfig
+
+    with open_kconfig(target) as (kconf, setup):
+        os.environ["KCONFIG_CONFIG"] = str(setup.config)
+        menuconfig.menuconfig(kconf)
+
+
+def _strip_prefix(kconf: kconfiglib.Kconfig, name: str) -> str:
+    return name[len(kconf.config_prefix):] if name.startswith(kconf.config_prefix) else name
+
+
+def _cache_key(setup: KconfigSetup, kconfig_files: List[str], env_vars: List[str]) -> Dict[str, Any]:
+    """Identify a parsed tree by its inputs, the Kconfig files and the environment variables it references."""
+    srctree = os.environ.get("srctree", "")
+    files = {}
+    for name in kconfig_files:
+        try:
+            stat = os.stat(os.path.join(srctree, name))
+            files[name] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            files[name] = None
+    return {
+        "version": [kconfiglib.VERSION, sys.version_info[:2]],
+        "kconfig": str(setup.kconfig),
+        "env": {var: os.environ.get(var) for var in sorted(env_vars)},
+        "files": files,
+    }
+
+
+def _load_cached(cache_file: Path, setup: KconfigSetup) -> Optional[kconfiglib.Kconfig]:
+    try:
+        with cache_file.open("rb") as f:
+            key = pickle.load(f)
+            if key != _cache_key(setup, list(key["files"]), list(key["env"])):
+                log.dbg("Kconfig files changed, parsing the Kconfig tree.")
+                return None
+            return _with_deep_recursion(lambda: pickle.load(f))
+    except Exception:
+        return None
+
+
+def _save_cached(cache_file: Path, setup: KconfigSetup, kconf: kconfiglib.Kconfig) -> None:
+    key = _cache_key(setup, kconf.kconfig_filenames, list(kconf.env_vars))
+    # Bound to the Kconfig file being parsed, which is closed now.
+    kconf._readline = None
+    temp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}")
+    try:
+        with temp.open("wb") as f:
+            pickle.dump(key, f)
+            _with_deep_recursion(lambda: pickle.dump(kconf, f, pickle.HIGHEST_PROTOCOL))
+        os.replace(str(temp), str(cache_file))
+    except Exception as err:
+        log.dbg(f"Can't cache the Kconfig tree: {err!r}")
+        if temp.exists():
+            temp.unlink()
+
+
+def _with_deep_recursion(function: Callable[[], Any]) -> Any:
+    """Run a function in a thread with a stack large enough to pickle deep object graphs."""
+    result = {}  # type: Dict[str, Any]
+
+    def run() -> None:
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, _PICKLE_RECURSION_LIMIT))
+        try:
+            result["value"] = function()
+        except BaseException as err:
+            result["error"] = err
+        finally:
+            sys.setrecursionlimit(limit)
+
+    stack_size = threading.stack_size(_PICKLE_STACK_SIZE)
+    try:
+        thread = threading.Thread(target=run)
+        thread.start()
+    finally:
+        threading.stack_size(stack_size)
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
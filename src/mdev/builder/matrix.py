@@ -0,0 +1,209 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Concurrent building of a project/module build matrix."""
+import os
+import json
+import queue
+import time
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from mdev.builder.target import BuildTarget
+from mdev.builder.runner import BuildOutput, run_build
+from mdev.builder.artifacts import ArtifactCache, input_hash
+from mdev.builder.fingerprint import compute_fingerprint, is_configured, save_fingerprint, clear_fingerprint
+from mdev.builder.gc import build_lock
+from mdev import log
+
+BUILD_LOG_FILE_NAME = "mdev-build.log"
+
+
+@dataclass
+class BuildResult:
+    """Outcome of building one target.
+
+    Attributes:
+        target: The target which was built.
+        returncode: Exit code of the last command run for the target.
+        step: The step the target stopped at, `cache`, `configure` or `build`.
+        elapsed: Wall time spent on the target, in seconds.
+        log_file: File containing the output of all commands run for the target.
+        output: Parsed output of the build step.
+    """
+
+    target: BuildTarget
+    returncode: int
+    step: str
+    elapsed: float
+    log_file: Path
+    output: BuildOutput
+
+    @property
+    def ok(self) -> bool:
+        """True if the target was built successfully."""
+        return self.returncode == 0
+
+
+def expand_targets(
+    projects: Iterable[str], modules: Iterable[str], flash: Optional[str] = None, defines: Tuple[str, ...] = ()
+) -> List[BuildTarget]:
+    """Create one target for every project/module pair.
+
+    Duplicated pairs are only built once, the order of the arguments is kept.
+    """
+    targets = []
+    for project, module in product(projects, modules):
+        target = BuildTarget(project, module, flash, defines)
+        if target not in targets:
+            targets.append(target)
+    return targets
+
+
+def load_matrix(path: Path, flash: Optional[str] = None, defines: Tuple[str, ...] = ()) -> List[BuildTarget]:
+    """Load build targets from a JSON matrix file.
+
+    The file contains either an object listing the projects and modules to combine:
+
+        {"projects": ["demos/helloworld", "demos/tcp_server"], "modules": ["emc3080", "emc3166"]}
+
+    or a list of explicit pairs, each one being an object or a two element list:
+
+        [{"project": "demos/helloworld", "module": "emc3080"}, ["demos/tcp_server", "emc3166"]]
+
+    Pairs given as objects may carry their own `defines` list, added to the defines of the command line.
+
+    Raises:
+        ValueError: The file content doesn't describe a build matrix.
+    """
+    data = json.loads(path.read_text())
+    if isinstance(data, dict):
+        try:
+            return expand_targets(data["projects"], data["modules"], flash, defines)
+        except KeyError as err:
+            raise ValueError(f"Build matrix '{path}' is missing the {err} key.")
+
+    if not isinstance(data, list):
+        raise ValueError(f"Build matrix '{path}' must contain a JSON object or a JSON list.")
+
+    targets = []
+    for entry in data:
+        if isinstance(entry, dict):
+            target = BuildTarget(entry["project"], entry["module"], flash, defines + tuple(entry.get("defines", ())))
+        elif isinstance(entry, list) and len(entry) == 2:
+            target = BuildTarget(entry[0], entry[1], flash, defines)
+        else:
+            raise ValueError(f"Invalid build matrix entry {entry!r} in '{path}'.")
+        if target not in targets:
+            targets.append(target)
+    return targets
+
+
+def split_jobs(total: int, count: int) -> List[int]:
+    """Split a CPU budget between concurrent builds.
+
+    Every build gets at least one job, the remainder goes to the first builds.
+
+    Args:
+        total: Number of jobs available for all builds.
+        count: Number of concurrent builds.
+    """
+    share, remainder = divmod(max(total, count), count)
+    return [share + 1 if i < remainder else share for i in range(count)]
+
+
+def build_matrix(
+    targets: List[BuildTarget],
+    env_path: str,
+    jobs: Optional[int] = None,
+    parallel: Optional[int] = None,
+    reconfigure: bool = False,
+    artifact_cache: bool = False,
+) -> List[BuildResult]:
+    """Configure and build several targets concurrently.
+
+    At most `parallel` targets are built at the same time and the `jobs` budget is split between them, so that the
+    concurrent ninja processes keep every CPU busy without oversubscribing the machine. The output of each target is
+    written to a log file in its build directory.
+
+    Args:
+        targets: Targets to build.
+        env_path: The mdev environment directory returned by `get_env()`.
+        jobs: Total number of parallel jobs, defaults to the number of CPUs.
+        parallel: Number of targets built at the same time, defaults to one target per two jobs.
+        reconfigure: Run the configure step even if the build tree is up to date.
+        artifact_cache: Restore the images of targets built before with the same inputs instead of building them.
+
+    Returns:
+        One result per target, in the order of `targets`.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    parallel = max(1, min(parallel or jobs // 2 or 1, len(targets)))
+    shares = split_jobs(jobs, parallel)
+    log.dbg(f"Building {len(targets)} targets, {parallel} at a time, ninja jobs {shares}")
+
+    # Each running build borrows one share of the budget and hands it back when done.
+    budget: "queue.Queue[int]" = queue.Queue()
+    for share in shares:
+        budget.put(share)
+
+    def run(target: BuildTarget) -> BuildResult:
+        share = budget.get()
+        try:
+            with build_lock(target):
+                return _build_target(target, env_path, share, reconfigure, artifact_cache)
+        finally:
+            budget.put(share)
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        return list(executor.map(run, targets))
+
+
+def _build_target(
+    target: BuildTarget, env_path: str, jobs: int, reconfigure: bool, artifact_cache: bool
+) -> BuildResult:
+    start = time.monotonic()
+    log_file = Path(target.build_directory, BUILD_LOG_FILE_NAME)
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    output = BuildOutput()
+
+    cache_key = input_hash(target) if artifact_cache else None
+    if artifact_cache and cache_key is None:
+        ArtifactCache().record("uncacheable")
+    if cache_key:
+        restored = ArtifactCache().restore(cache_key, target)
+        if restored:
+            log_file.write_text("Restored from the artifact cache:\n" + "".join(f"{f}\n" for f in restored))
+            return BuildResult(target, 0, "cache", time.monotonic() - start, log_file, output)
+
+    fingerprint = compute_fingerprint(target, env_path)
+    steps = [("build", target.build_command(jobs))]
+    if reconfigure or not is_configured(target, fingerprint):
+        clear_fingerprint(target)
+        steps.insert(0, ("configure", target.configure_command(env_path)))
+    else:
+        log.dbg(f"[{target.name}] Configuration is up to date.")
+
+    with log_file.open("w") as log_output:
+        for step, command in steps:
+            log.dbg(f"[{target.name}] {command}")
+            log_output.write(f"$ {command}\n")
+            log_output.flush()
+            if step == "build":
+                returncode = run_build(command, output, log_output, show_progress=False)
+            else:
+                returncode = subprocess.run(command, shell=True, stdout=log_output, stderr=subprocess.STDOUT).returncode
+            if returncode != 0:
+                break
+            if step == "configure":
+                save_fingerprint(target, fingerprint)
+
+    if returncode == 0 and cache_key:
+        # Saved under the key looked up, the .config file written by the configure step isn't hashed again.
+        ArtifactCache().save(cache_key, target)
+    return BuildResult(target, returncode, step, time.monotonic() - start, log_file, output)
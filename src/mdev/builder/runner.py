@@ -0,0 +1,161 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Streaming build command runner.
+
+The output of ninja is read line by line while the build runs. Progress lines are turned into a progress bar,
+compiler and linker diagnostics are collected into a deduplicated summary and the raw output goes to a log file.
+"""
+import os
+import re
+import sys
+import subprocess
+
+from dataclasses import dataclass
+from typing import Dict, IO, List, Optional
+
+from rich.console import Console
+from rich.progress import Progress, BarColumn, TextColumn, TimeElapsedColumn, TimeRemainingColumn
+
+from mdev import log
+
+# Ninja status line, forced through NINJA_STATUS so that it doesn't depend on the user environment.
+NINJA_STATUS = "[%f/%t] "
+REFRESH_PER_SECOND = 4
+
+_STATUS_RE = re.compile(r"^\[(\d+)/(\d+)\] (.*)$")
+_DIAGNOSTIC_RE = re.compile(
+    r"^(?P<file>(?:[A-Za-z]:)?[^:\n]+):(?P<line>\d+):(?:(?P<column>\d+):)?\s*"
+    r"(?P<severity>warning|error|fatal error):\s*(?P<message>.*)$"
+)
+_LINKER_ERROR_RE = re.compile(r"^(?P<file>[^:\n]+):.*?(?P<message>(?:undefined reference to|multiple definition of).*)$")
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    """A compiler or linker message.
+
+    Attributes:
+        severity: `warning` or `error`.
+        file: File the message refers to.
+        line: Line number, 0 if unknown.
+        column: Column number, 0 if unknown.
+        message: Text of the message.
+    """
+
+    severity: str
+    file: str
+    line: int
+    column: int
+    message: str
+
+    @property
+    def location(self) -> str:
+        """Location formatted the way compilers do."""
+        location = self.file
+        if self.line:
+            location += f":{self.line}"
+            if self.column:
+                location += f":{self.column}"
+        return location
+
+
+class BuildOutput:
+    """Parser of the output of a ninja build."""
+
+    def __init__(self) -> None:
+        """Start with an empty state."""
+        self.finished = 0
+        self.total = 0
+        self.current = ""
+        self.diagnostics = {}  # type: Dict[Diagnostic, int]
+        self.failed = []  # type: List[str]
+
+    def feed(self, line: str) -> None:
+        """Parse one line of output."""
+        line = line.rstrip()
+        status = _STATUS_RE.match(line)
+        if status:
+            self.finished, self.total, self.current = int(status.group(1)), int(status.group(2)), status.group(3)
+            return
+        if line.startswith("FAILED: "):
+            self.failed.append(line[len("FAILED: "):])
+            return
+
+        match = _DIAGNOSTIC_RE.match(line)
+        if match:
+            severity = "warning" if match.group("severity") == "warning" else "error"
+            diagnostic = Diagnostic(
+                severity,
+                os.path.normpath(match.group("file")).replace("\\", "/"),
+                int(match.group("line")),
+                int(match.group("column") or 0),
+                match.group("message"),
+            )
+        else:
+            match = _LINKER_ERROR_RE.match(line)
+            if not match:
+                return
+            diagnostic = Diagnostic("error", match.group("file"), 0, 0, match.group("message"))
+        self.diagnostics[diagnostic] = self.diagnostics.get(diagnostic, 0) + 1
+
+    @property
+    def warnings(self) -> List[Diagnostic]:
+        """Distinct warnings, in the order they were first seen."""
+        return [d for d in self.diagnostics if d.severity == "warning"]
+
+    @property
+    def errors(self) -> List[Diagnostic]:
+        """Distinct errors, in the order they were first seen."""
+        return [d for d in self.diagnostics if d.severity == "error"]
+
+
+def run_build(
+    command: str, output: BuildOutput, log_file: Optional[IO[str]] = None, show_progress: bool = True
+) -> int:
+    """Run a build command, parsing its output as it is produced.
+
+    Args:
+        command: The shell command to run.
+        output: Parser receiving every line of output.
+        log_file: File receiving the raw output.
+        show_progress: Render a progress bar, the raw output is printed instead if verbose logging is enabled.
+
+    Returns:
+        Exit code of the command.
+    """
+    env = dict(os.environ, NINJA_STATUS=NINJA_STATUS)
+    process = subprocess.Popen(
+        command, shell=True, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        universal_newlines=True, errors="replace", bufsize=1,
+    )
+    assert process.stdout is not None
+
+    if not show_progress or log.VERBOSE >= log.VERBOSE_NORMAL:
+        for line in process.stdout:
+            output.feed(line)
+            if log_file:
+                log_file.write(line)
+            if show_progress:
+                sys.stdout.write(line)
+        return process.wait()
+
+    # Rich redraws from its own thread at a bounded rate, updating the task only stores the new values.
+    with Progress(
+        TextColumn("[progress.percentage]{task.completed}/{task.total}"),
+        BarColumn(bar_width=None),
+        TimeElapsedColumn(),
+        TimeRemainingColumn(),
+        TextColumn("{task.description}", style="cyan", markup=False),
+        console=Console(),
+        refresh_per_second=REFRESH_PER_SECOND,
+        transient=True,
+    ) as progress:
+        task = progress.add_task("", total=None)
+        for line in process.stdout:
+            output.feed(line)
+            if log_file:
+                log_file.write(line)
+            if output.total:
+                progress.update(task, completed=output.finished, total=output.total, description=output.current[-60:])
+    return process.wait()
@@ -0,0 +1,103 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Build target abstraction."""
+import re
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from mdev.env import get_cmake, get_ninja
+from mdev import compiler_cache
+
+BUILD_DIR = "build"
+PCH_SCRIPT = (Path(__file__).parent / "cmake" / "mxos_pch.cmake").as_posix()
+
+_CACHE_ENTRY_RE = re.compile(r"^([\w.+-]+):[A-Z]+=(.*)$")
+
+
+def read_cmake_cache(build_dir: Path) -> Dict[str, str]:
+    """Return the entries of the CMake cache of a build tree, by name. Empty if the tree isn't configured."""
+    try:
+        lines = (build_dir / "CMakeCache.txt").read_text(errors="replace").splitlines()
+    except OSError:
+        return {}
+    return dict(match.groups() for match in map(_CACHE_ENTRY_RE.match, lines) if match)
+
+
+@dataclass(frozen=True)
+class BuildTarget:
+    """A project built for one module.
+
+    Attributes:
+        project: Path to the MXOS project, relative to the program root.
+        module: Module name.
+        flash: Value of the FLASH cmake variable.
+        defines: Extra cmake variables, each one formatted as `NAME=VALUE`.
+        compiler_cache: Compile through the mdev compiler cache.
+        pch: Precompile the common mxos headers.
+    """
+
+    project: str
+    module: str
+    flash: Optional[str] = None
+    defines: Tuple[str, ...] = field(default_factory=tuple)
+    compiler_cache: bool = True
+    pch: bool = False
+
+    def __post_init__(self) -> None:
+        """Normalise the project path so that it can be used in cmake command lines."""
+        object.__setattr__(self, "project", str(Path(self.project)).replace("\\", "/"))
+
+    @property
+    def name(self) -> str:
+        """Human readable name of the target."""
+        return f"{self.project}@{self.module}"
+
+    @property
+    def build_directory(self) -> str:
+        """CMake build tree of the target."""
+        return f"{BUILD_DIR}/{self.project}-{self.module}"
+
+    def configure_command(self, env_path: str) -> str:
+        """Command line generating the build tree.
+
+        Args:
+            env_path: The mdev environment directory returned by `get_env()`.
+        """
+        command = (
+            f"{get_cmake()} -B {self.build_directory} -GNinja -DAPP={self.project} -DMODULE={self.module} "
+            f"-DFLASH={self.flash} -DMXOS_ENV={env_path} -DCMAKE_MAKE_PROGRAM={get_ninja()}"
+        )
+        if self.compiler_cache:
+            launcher = ";".join(compiler_cache.launcher())
+            command += f' -DCMAKE_C_COMPILER_LAUNCHER="{launcher}" -DCMAKE_CXX_COMPILER_LAUNCHER="{launcher}"'
+        else:
+            command += " -UCMAKE_C_COMPILER_LAUNCHER -UCMAKE_CXX_COMPILER_LAUNCHER"
+        if self.pch:
+            # Programs generated before the MXOS_PCH option get it from this script.
+            command += f" -DMXOS_PCH=ON -DCMAKE_PROJECT_INCLUDE={PCH_SCRIPT}"
+        else:
+            command += " -DMXOS_PCH=OFF"
+            # Only the script of a previous `--pch` build is dropped, the program may set its own.
+            project_include = read_cmake_cache(Path(self.build_directory)).get("CMAKE_PROJECT_INCLUDE")
+            if project_include and Path(project_include).name == Path(PCH_SCRIPT).name:
+                command += " -UCMAKE_PROJECT_INCLUDE"
+        if self.defines:
+            command += " -D" + " -D".join(self.defines)
+        return command
+
+    def build_command(self, jobs: Optional[int] = None, target: Optional[str] = None) -> str:
+        """Command line building the build tree.
+
+        Args:
+            jobs: Number of parallel ninja jobs, ninja picks a default if not given.
+            target: Build this cmake target instead of the default one.
+        """
+        command = f"{get_cmake()} --build {self.build_directory}"
+        if target:
+            command += f" --target {target}"
+        if jobs:
+            command += f" -j {jobs}"
+        return command
@@ -0,0 +1,183 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Build step timings parsed from .ninja_log."""
+import json
+
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from mdev.builder.target import BuildTarget
+from mdev.project._internal.libraries import LibraryReferences
+
+NINJA_LOG_FILE_NAME = ".ninja_log"
+TIMINGS_FILE_NAME = "mdev-timings.json"
+MXOS_CORE = "mxos core"
+OTHER = "other"
+
+
+@dataclass
+class NinjaStep:
+    """One build step recorded by ninja.
+
+    Attributes:
+        output: Output file of the step, relative to the build tree.
+        start: Start time in milliseconds since the beginning of the build.
+        end: End time in milliseconds since the beginning of the build.
+        kind: `compile`, `archive`, `link` or `other`.
+        group: Component the step belongs to, the app, mxos core or other.
+    """
+
+    output: str
+    start: int
+    end: int
+    kind: str = OTHER
+    group: str = OTHER
+
+    @property
+    def duration(self) -> int:
+        """Duration of the step in milliseconds."""
+        return self.end - self.start
+
+
+@dataclass(frozen=True)
+class NinjaLogMark:
+    """End of a .ninja_log file before a build, the steps of the build are appended after it.
+
+    Attributes:
+        inode: Inode of the log, None if there was no log. Ninja replaces the log when it recompacts it.
+        offset: Size of the log in bytes.
+    """
+
+    inode: Optional[int]
+    offset: int
+
+
+def mark_ninja_log(target: BuildTarget) -> NinjaLogMark:
+    """Record the end of the .ninja_log file of a target, before running ninja."""
+    try:
+        stat = Path(target.build_directory, NINJA_LOG_FILE_NAME).stat()
+    except OSError:
+        return NinjaLogMark(None, 0)
+    return NinjaLogMark(stat.st_ino, stat.st_size)
+
+
+def parse_ninja_log(path: Path, mark: Optional[NinjaLogMark] = None) -> List[NinjaStep]:
+    """Parse the steps of the last build recorded in a .ninja_log file.
+
+    Ninja appends to the log on every build. With the mark taken before the build, only the lines appended since are
+    parsed. Without one, or if ninja recompacted the log since, the builds are told apart by the clock ninja restarts
+    for each build: a new build starts where the end time goes backwards. That misses a build whose steps all end
+    later than the last step of the build before it.
+    """
+    offset = 0
+    if mark is not None:
+        stat = path.stat()
+        if mark.inode is None or (stat.st_ino == mark.inode and stat.st_size >= mark.offset):
+            offset = mark.offset
+    with path.open("rb") as file:
+        file.seek(offset)
+        text = file.read().decode(errors="replace")
+
+    steps = {}  # type: Dict[str, NinjaStep]
+    last_end = 0
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) < 4:
+            continue
+        start, end, output = int(fields[0]), int(fields[1]), fields[3]
+        if end < last_end:
+            steps = {}
+        last_end = end
+        steps[output] = NinjaStep(output, start, end)
+    return list(steps.values())
+
+
+def component_groups(target: BuildTarget, root: Path = Path(".")) -> Dict[str, str]:
+    """Map build tree subdirectories to the component they are built from.
+
+    CMake mirrors the source tree layout in the build tree, so objects of a component are found below the path of
+    the component relative to the program root.
+    """
+    groups = {"mxos": MXOS_CORE, target.project: f"app ({target.project})"}
+    for lib in LibraryReferences(root, ignore_paths=[target.build_directory.split("/")[0]]).iter_resolved():
+        relpath = str(lib.source_code_path.relative_to(root)).replace("\\", "/")
+        if relpath != "mxos":
+            groups[relpath] = lib.reference_file.stem
+    return groups
+
+
+def classify(steps: Iterable[NinjaStep], groups: Dict[str, str]) -> None:
+    """Set the kind and the group of each step."""
+    prefixes = sorted(groups, key=len, reverse=True)
+    for step in steps:
+        if step.output.endswith((".o", ".obj")):
+            step.kind = "compile"
+        elif step.output.endswith(".a"):
+            step.kind = "archive"
+        elif step.output.endswith((".elf", ".axf", ".out")):
+            step.kind = "link"
+
+        step.group = group_of(step.output, groups, prefixes)
+
+
+def group_of(output: str, groups: Dict[str, str], prefixes: Optional[List[str]] = None) -> str:
+    """Return the component a build tree file belongs to.
+
+    Args:
+        output: Path of the file, relative to the build tree.
+        groups: Map returned by `component_groups`.
+        prefixes: Keys of `groups`, longest first, to avoid sorting them for every file.
+    """
+    directory = output.split("/CMakeFiles/")[0]
+    for prefix in prefixes or sorted(groups, key=len, reverse=True):
+        if directory == prefix or directory.startswith(prefix + "/"):
+            return groups[prefix]
+    return OTHER
+
+
+def analyze(target: BuildTarget, top: int = 10, mark: Optional[NinjaLogMark] = None) -> Dict:
+    """Build a timing report for the last build of a target.
+
+    Args:
+        target: The target whose build tree holds the .ninja_log file.
+        top: Number of slowest steps to report.
+        mark: Mark of the log returned by `mark_ninja_log` before the build.
+
+    Returns:
+        The report, empty if ninja didn't record any step.
+    """
+    log_file = Path(target.build_directory, NINJA_LOG_FILE_NAME)
+    if not log_file.is_file():
+        return {}
+    steps = parse_ninja_log(log_file, mark)
+    if not steps:
+        return {}
+    classify(steps, component_groups(target))
+
+    totals = defaultdict(lambda: {"steps": 0, "cpu_ms": 0})  # type: Dict[str, Dict[str, int]]
+    for step in steps:
+        totals[step.group]["steps"] += 1
+        totals[step.group]["cpu_ms"] += step.duration
+
+    slowest = sorted(steps, key=lambda s: s.duration, reverse=True)
+    return {
+        "target": target.name,
+        "steps": len(steps),
+        "wall_ms": max(s.end for s in steps) - min(s.start for s in steps),
+        "cpu_ms": sum(s.duration for s in steps),
+        "slowest_compile": [asdict(s) for s in slowest if s.kind == "compile"][:top],
+        "slowest_link": [asdict(s) for s in slowest if s.kind in ("link", "archive")][:top],
+        "groups": dict(sorted(totals.items(), key=lambda item: item[1]["cpu_ms"], reverse=True)),
+    }
+
+
+def write_report(target: BuildTarget, report: Dict) -> Path:
+    """Write a timing report to the build tree of a target."""
+    path = Path(target.build_directory, TIMINGS_FILE_NAME)
+    path.write_text(json.dumps(report, indent=2))
+    return path
@@ -0,0 +1,165 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Per module build profiles tuned by benchmarking.
+
+The fastest number of ninja jobs, and whether CMake unity builds help with which batch size, depend on the module and
+on the host. The tuner times clean builds of a target with a few profiles and stores the fastest one per module, so
+that later builds of the module use it.
+"""
+import os
+import json
+import time
+import subprocess
+
+from dataclasses import dataclass, asdict, replace
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from mdev.builder.target import BuildTarget
+from mdev.builder.fingerprint import clear_fingerprint
+from mdev.env import env_root
+
+PROFILES_FILE = Path(env_root, "build-profiles.json")
+TUNE_LOG_FILE_NAME = "mdev-tune.log"
+
+UNITY_BATCH_SIZES = (8, 16, 32)
+
+# Cache variables set by a profile, a define given on the command line takes precedence.
+PROFILE_VARIABLES = ("CMAKE_UNITY_BUILD", "CMAKE_UNITY_BUILD_BATCH_SIZE")
+
+
+@dataclass(frozen=True)
+class BuildProfile:
+    """Build settings of a module.
+
+    Attributes:
+        jobs: Number of parallel ninja jobs.
+        unity: Build with CMake unity builds.
+        unity_batch_size: Number of sources merged into one unity source.
+        pch: Precompile the common mxos headers.
+    """
+
+    jobs: int
+    unity: bool = False
+    unity_batch_size: int = 0
+    pch: bool = False
+
+    @property
+    def defines(self) -> Tuple[str, ...]:
+        """CMake cache variables applying the profile."""
+        if not self.unity:
+            return ("CMAKE_UNITY_BUILD=OFF",)
+        return ("CMAKE_UNITY_BUILD=ON", f"CMAKE_UNITY_BUILD_BATCH_SIZE={self.unity_batch_size}")
+
+    def __str__(self) -> str:
+        unity = f"unity {self.unity_batch_size}" if self.unity else "no unity"
+        return f"-j {self.jobs}, {unity}" + (", pch" if self.pch else "")
+
+
+def apply_profile(target: BuildTarget, profile: BuildProfile) -> BuildTarget:
+    """Apply a profile to a target, its unity build variables only if the defines of the target don't set them."""
+    target = replace(target, pch=profile.pch)
+    if pinned_variables(target):
+        return target
+    return replace(target, defines=target.defines + profile.defines)
+
+
+def pinned_variables(target: BuildTarget) -> List[str]:
+    """Return the profile variables set by the defines of a target, they take precedence over a profile."""
+    return [name for name in (_define_name(define) for define in target.defines) if name in PROFILE_VARIABLES]
+
+
+def load_profile(module: str) -> Optional[BuildProfile]:
+    """Return the tuned profile of a module, if any."""
+    try:
+        data = json.loads(PROFILES_FILE.read_text())[module]
+        return BuildProfile(data["jobs"], data["unity"], data["unity_batch_size"], data.get("pch", False))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_profile(target: BuildTarget, profile: BuildProfile, elapsed: float) -> None:
+    """Store the tuned profile of the module of a target."""
+    try:
+        profiles = json.loads(PROFILES_FILE.read_text())
+    except (OSError, ValueError):
+        profiles = {}
+    profiles[target.module] = dict(asdict(profile), project=target.project, elapsed=round(elapsed, 2))
+    PROFILES_FILE.parent.mkdir(parents=True, exist_ok=True)
+    PROFILES_FILE.write_text(json.dumps(profiles, indent=2))
+
+
+def tune(
+    target: BuildTarget,
+    env_path: str,
+    on_result: Optional[Callable[[BuildProfile, Optional[float]], None]] = None,
+) -> List[Tuple[BuildProfile, Optional[float]]]:
+    """Time clean builds of a target with several profiles.
+
+    Unity builds are tuned first with one job per CPU, then precompiled headers are tried with the fastest unity
+    setting and finally the number of jobs is tuned. The compiler cache is disabled so that every build compiles
+    everything, and the unity build variables defined by the target are dropped so that each profile applies its own.
+
+    Args:
+        target: The target to benchmark, its build tree is reused.
+        env_path: The mdev environment directory returned by `get_env()`.
+        on_result: Called with each profile and its build time, None if the build failed.
+
+    Returns:
+        Every profile tried with its build time, None if the build failed.
+    """
+    defines = tuple(define for define in target.defines if _define_name(define) not in PROFILE_VARIABLES)
+    target = replace(target, compiler_cache=False, defines=defines)
+    # The build tree no longer matches the configuration of regular builds.
+    clear_fingerprint(target)
+    log_path = Path(target.build_directory, TUNE_LOG_FILE_NAME)
+    if log_path.exists():
+        log_path.unlink()
+    cpus = os.cpu_count() or 1
+    results = []  # type: List[Tuple[BuildProfile, Optional[float]]]
+
+    def run(profiles: List[BuildProfile]) -> BuildProfile:
+        for profile in profiles:
+            elapsed = _benchmark(apply_profile(target, profile), env_path, profile.jobs)
+            results.append((profile, elapsed))
+            if on_result:
+                on_result(profile, elapsed)
+        timed = [(elapsed, profile) for profile, elapsed in results if elapsed is not None]
+        if not timed:
+            raise RuntimeError(f"Building {target.name} failed with every profile, see {log_path}.")
+        return min(timed, key=lambda item: item[0])[1]
+
+    best = run([BuildProfile(cpus)] + [BuildProfile(cpus, True, size) for size in UNITY_BATCH_SIZES])
+    best = run([replace(best, pch=True)])
+    run([replace(best, jobs=jobs) for jobs in sorted({max(1, cpus // 2), cpus + 2, cpus * 2}) if jobs != cpus])
+    return results
+
+
+def best_result(results: List[Tuple[BuildProfile, Optional[float]]]) -> Tuple[BuildProfile, float]:
+    """Return the fastest profile of a tuning run and its build time."""
+    return min(((p, e) for p, e in results if e is not None), key=lambda item: item[1])
+
+
+def _define_name(define: str) -> str:
+    """Name of the cache variable of a NAME[:TYPE]=VALUE define."""
+    return define.split("=")[0].split(":")[0]
+
+
+def _benchmark(target: BuildTarget, env_path: str, jobs: int) -> Optional[float]:
+    """Configure the target, then time a clean build. Returns None if a step failed."""
+    log_path = Path(target.build_directory, TUNE_LOG_FILE_NAME)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with log_path.open("a") as log_file:
+        for command in (target.configure_command(env_path), target.build_command(target="clean")):
+            log_file.write(f"$ {command}\n")
+            log_file.flush()
+            if subprocess.run(command, shell=True, stdout=log_file, stderr=subprocess.STDOUT).returncode != 0:
+                return None
+        command = target.build_command(jobs)
+        log_file.write(f"$ {command}\n")
+        log_file.flush()
+        start = time.monotonic()
+        if subprocess.run(command, shell=True, stdout=log_file, stderr=subprocess.STDOUT).returncode != 0:
+            return None
+        return time.monotonic() - start
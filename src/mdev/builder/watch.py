@@ -0,0 +1,205 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Source tree watching for incremental rebuilds.
+
+Linux uses inotify through ctypes, other platforms fall back to polling file modification times.
+"""
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
+
+from mdev.builder.target import BUILD_DIR
+
+# Files whose change requires running the cmake configure step again.
+CONFIGURE_FILE_NAMES = ("CMakeLists.txt", "Kconfig")
+CONFIGURE_FILE_SUFFIXES = (".component", ".cmake")
+
+IGNORED_DIR_NAMES = (".git", BUILD_DIR)
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def needs_configure(changes: Iterable[Path]) -> bool:
+    """Check if one of the changed files is an input of the cmake configure step."""
+    return any(p.name in CONFIGURE_FILE_NAMES or p.suffix in CONFIGURE_FILE_SUFFIXES for p in changes)
+
+
+def _is_ignored(name: str) -> bool:
+    """Editor swap and backup files."""
+    return name.startswith(".#") or name.endswith(("~", ".swp", ".swx", ".tmp"))
+
+
+def _walk_dirs(root: Path) -> Iterable[Path]:
+    for dirpath, dirnames, _ in os.walk(str(root)):
+        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIR_NAMES]
+        yield Path(dirpath)
+
+
+class InotifyWatcher:
+    """Watch directory trees with Linux inotify."""
+
+    def __init__(self, roots: Iterable[Path]) -> None:
+        """Add a watch on every directory of the given trees.
+
+        Raises:
+            OSError: inotify is not available or the watch limit is reached.
+        """
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch_func = libc.inotify_add_watch
+        self._add_watch_func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._watches = {}  # type: Dict[int, Path]
+        try:
+            for root in roots:
+                for directory in _walk_dirs(root):
+                    self._add_watch(directory)
+        except BaseException:
+            # Closing the descriptor also removes the watches already added.
+            os.close(self._fd)
+            raise
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self._add_watch_func(self._fd, os.fsencode(str(directory)), _IN_WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached, increase fs.inotify.max_user_watches")
+            # The directory disappeared before we could watch it.
+            return
+        self._watches[wd] = directory
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Wait for changes.
+
+        Args:
+            timeout: Seconds to wait for the first change, wait forever if None.
+
+        Returns:
+            Changed paths, empty if the timeout expired. A CMakeLists.txt is reported if events were lost, so
+            that the build tree is reconfigured.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changes = set()
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                changes.add(Path(CONFIGURE_FILE_NAMES[0]))
+                continue
+            if mask & _IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or _is_ignored(name):
+                continue
+            path = directory / name
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO) and name not in IGNORED_DIR_NAMES:
+                    # Files may have been created before the watch was added, report them as changed.
+                    for new_directory in _walk_dirs(path):
+                        self._add_watch(new_directory)
+                        changes.update(p for p in new_directory.iterdir() if p.is_file() and not _is_ignored(p.name))
+                continue
+            changes.add(path)
+        return changes
+
+    def close(self) -> None:
+        """Release the inotify file descriptor."""
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Watch directory trees by comparing file modification times."""
+
+    def __init__(self, roots: Iterable[Path], interval: float = 1.0) -> None:
+        """Take a first snapshot of the given trees."""
+        self._roots = list(roots)
+        self._interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[Path, float]:
+        snapshot = {}
+        for root in self._roots:
+            for directory in _walk_dirs(root):
+                for entry in os.scandir(str(directory)):
+                    if entry.is_file() and not _is_ignored(entry.name):
+                        try:
+                            snapshot[Path(entry.path)] = entry.stat().st_mtime
+                        except OSError:
+                            continue
+        return snapshot
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Wait for changes, see `InotifyWatcher.wait`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self._interval if deadline is None else max(0, min(self._interval, deadline - time.monotonic())))
+            snapshot = self._scan()
+            changes = {p for p in snapshot.keys() | self._snapshot.keys() if snapshot.get(p) != self._snapshot.get(p)}
+            self._snapshot = snapshot
+            if changes or (deadline is not None and time.monotonic() >= deadline):
+                return changes
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+def create_watcher(roots: List[Path]) -> Union[InotifyWatcher, PollingWatcher]:
+    """Create the most efficient watcher available on this platform."""
+    if sys.platform == "linux":
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots)
+
+
+def watch(roots: List[Path], on_change: Callable[[Set[Path]], None], debounce: float = 0.3) -> None:
+    """Call `on_change` with the changed files each time the trees change, until interrupted.
+
+    Changes are collected until the trees have been quiet for `debounce` seconds, so that saving several files or
+    switching a git branch only triggers one rebuild.
+    """
+    watcher = create_watcher(roots)
+    try:
+        while True:
+            changes = watcher.wait()
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changes |= more
+            if changes:
+                on_change(changes)
+    finally:
+        watcher.close()
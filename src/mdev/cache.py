@@ -0,0 +1,126 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+import re
+import click
+
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+from mdev.compiler_cache import CompilerCache, ContentStore
+from mdev.builder.artifacts import ArtifactCache
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+@click.group()
+def cache() -> None:
+    """Manage the mdev compiler and artifact caches.
+
+    Objects compiled by `mdev build` are stored in ~/.mdev/cache and reused by
+    later builds of any project, module or build directory.
+
+    Images built by `mdev build --artifact-cache` are stored in
+    ~/.mdev/artifacts and restored by later builds with the same inputs.
+    """
+
+
+_artifacts_option = click.option(
+    "--artifacts",
+    is_flag=True,
+    help="Apply to the artifact cache instead of the compiler cache.",
+)
+
+
+def _get_store(artifacts: bool) -> ContentStore:
+    return ArtifactCache() if artifacts else CompilerCache()
+
+
+@cache.command()
+def stats() -> None:
+    """Show compiler and artifact cache statistics.
+
+    Example:
+
+        $ mdev cache stats
+    """
+    console = Console()
+    for title, store in (("Compiler Cache", CompilerCache()), ("Artifact Cache", ArtifactCache())):
+        data = store.stats()
+        lookups = data["hit"] + data["miss"]
+
+        table = Table(title=title, box=box.ROUNDED, style='blue')
+        table.add_column("Item", style="cyan")
+        table.add_column("Value", style="green", justify="right")
+        table.add_row("Location", str(store.root))
+        table.add_row("Hits", str(data["hit"]))
+        table.add_row("Misses", str(data["miss"]))
+        table.add_row("Hit rate", f"{100 * data['hit'] / lookups:.1f}%" if lookups else "-")
+        for stat in store.STATS:
+            if stat not in ("hit", "miss"):
+                table.add_row(stat.capitalize(), str(data[stat]))
+        table.add_row("Entries", str(data["entries"]))
+        table.add_row("Size", f"{format_size(data['size'])} / {format_size(data['max_size'])}")
+        console.print(table, justify="left")
+
+
+@cache.command()
+@_artifacts_option
+def clear(artifacts: bool) -> None:
+    """Remove all entries from a cache and reset its statistics.
+
+    Example:
+
+        $ mdev cache clear
+
+        $ mdev cache clear --artifacts
+    """
+    store = _get_store(artifacts)
+    store.clear()
+    click.echo(f"Cache {store.root} cleared.")
+
+
+@cache.command()
+@click.argument("size", required=False)
+@_artifacts_option
+def limit(size: str, artifacts: bool) -> None:
+    """Show or set the size limit of a cache.
+
+    The least recently used entries are evicted after each build until the
+    cache fits in its size limit.
+
+    Arguments:
+
+        SIZE: New size limit, e.g. 500M or 10G
+
+    Example:
+
+        $ mdev cache limit 10G
+
+        $ mdev cache limit 2G --artifacts
+    """
+    store = _get_store(artifacts)
+    if size:
+        store.max_size = parse_size(size)
+        removed = store.evict()
+        if removed:
+            click.echo(f"Evicted {removed} entries.")
+    click.echo(f"Size limit of {store.root}: {format_size(store.max_size)}")
+
+
+def parse_size(size: str) -> int:
+    """Convert a human readable size like 10G to bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", size, re.IGNORECASE)
+    if not match:
+        raise click.BadParameter(f"Invalid size '{size}', expected a number followed by K, M, G or T.")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def format_size(size: float) -> str:
+    """Convert a size in bytes to a human readable string."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size:.0f} B"
+        size /= 1024
+    return f"{size:.1f} TiB"
@@ -0,0 +1,322 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Content addressed compiler cache.
+
+This module is used by cmake as C/C++ compiler launcher:
+
+    python -m mdev.compiler_cache <compiler> <arguments>
+
+The object file of a compilation is looked up by a hash of the compiler identity, the compiler flags and the
+preprocessed source. On a miss the compiler is run and its outputs are stored, on a hit the stored outputs are copied
+to the requested locations without running the compiler.
+
+It is run for every translation unit, keep it free of imports which are not part of the standard library.
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import subprocess
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+DEFAULT_MAX_SIZE = 5 * 1024 ** 3
+
+# Bump when the layout of the cache or the content of the hash changes.
+CACHE_VERSION = "1"
+
+# Options whose value follows as next argument and which only matter to the preprocessor. Their effect is part of
+# the preprocessed source, so they are not hashed. This lets different build trees share objects.
+_PREPROCESSOR_OPTIONS_WITH_VALUE = ("-I", "-D", "-U", "-include", "-imacros", "-isystem", "-iquote", "-idirafter")
+# Options naming output files, not hashed either.
+_OUTPUT_OPTIONS_WITH_VALUE = ("-o", "-MF", "-MT", "-MQ")
+_DEPENDENCY_FLAGS = ("-MD", "-MMD", "-MP")
+_UNSUPPORTED_FLAGS = ("-E", "-M", "-MM", "-S", "-save-temps", "--coverage", "-fprofile-arcs")
+
+_DEPFILE_TARGET_PLACEHOLDER = "@MDEV_OBJECT@"
+
+
+class ContentStore:
+    """Size bounded store of immutable entries, evicted in least recently used order.
+
+    Attributes:
+        root: Directory holding the store.
+    """
+
+    STATS = ()  # type: Tuple[str, ...]
+    DEFAULT_MAX_SIZE = DEFAULT_MAX_SIZE
+
+    def __init__(self, root: Path) -> None:
+        """Initialise the store paths, nothing is created on disk until something is stored."""
+        self.root = root
+        self.objects_dir = root / "objects"
+        self.stats_dir = root / "stats"
+        self.config_file = root / "config.json"
+
+    @property
+    def max_size(self) -> int:
+        """Size limit of the cache in bytes."""
+        try:
+            return int(json.loads(self.config_file.read_text())["max_size"])
+        except (OSError, ValueError, KeyError):
+            return self.DEFAULT_MAX_SIZE
+
+    @max_size.setter
+    def max_size(self, value: int) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.config_file.write_text(json.dumps({"max_size": value}))
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Return the entry directory of a key, marking it as recently used."""
+        entry = self._entry_dir(key)
+        if not entry.is_dir():
+            return None
+        try:
+            os.utime(str(entry))
+        except OSError:
+            return None
+        return entry
+
+    def store(self, key: str, files: Dict[str, Union[bytes, Path]]) -> None:
+        """Atomically store an entry.
+
+        Args:
+            key: Hash of the entry content.
+            files: Content of the entry by file name, either the data or the path of a file to copy.
+        """
+        entry = self._entry_dir(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=str(entry.parent)))
+        for name, data in files.items():
+            if isinstance(data, Path):
+                shutil.copyfile(str(data), str(tmp / name))
+            else:
+                (tmp / name).write_bytes(data)
+        try:
+            os.rename(str(tmp), str(entry))
+        except OSError:
+            # Another build stored the same entry in the meantime.
+            shutil.rmtree(str(tmp), ignore_errors=True)
+
+    def record(self, stat: str) -> None:
+        """Count one event, safe to call from concurrent compiler processes."""
+        self.stats_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self.stats_dir / stat), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, b".")
+        finally:
+            os.close(fd)
+
+    def stats(self) -> Dict[str, int]:
+        """Event counters, number of entries and total size of the cache."""
+        result = {}
+        for stat in self.STATS:
+            try:
+                result[stat] = (self.stats_dir / stat).stat().st_size
+            except OSError:
+                result[stat] = 0
+        entries = self._entries()
+        result["entries"] = len(entries)
+        result["size"] = sum(size for _, _, size in entries)
+        result["max_size"] = self.max_size
+        return result
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters, the configuration is kept."""
+        shutil.rmtree(str(self.objects_dir), ignore_errors=True)
+        shutil.rmtree(str(self.stats_dir), ignore_errors=True)
+
+    def evict(self, max_size: Optional[int] = None) -> int:
+        """Remove the least recently used entries until the cache fits in its size limit.
+
+        Args:
+            max_size: Size limit in bytes, the configured limit is used if not given.
+
+        Returns:
+            Number of removed entries.
+        """
+        max_size = self.max_size if max_size is None else max_size
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for _, entry, size in entries:
+            if total <= max_size:
+                break
+            shutil.rmtree(str(entry), ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.objects_dir / key[:2] / key[2:]
+
+    def _entries(self) -> List:
+        """List (last use time, path, size) of all entries."""
+        entries = []
+        if not self.objects_dir.is_dir():
+            return entries
+        for bucket in self.objects_dir.iterdir():
+            for entry in bucket.iterdir():
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    size = sum(f.stat().st_size for f in entry.iterdir())
+                    entries.append((entry.stat().st_mtime, entry, size))
+                except OSError:
+                    continue
+        return entries
+
+
+class CompilerCache(ContentStore):
+    """Object store of the compiler cache."""
+
+    STATS = ("hit", "miss", "uncacheable", "error")
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        """Use the per user compiler cache by default."""
+        super().__init__(root or cache_root())
+
+
+def cache_root() -> Path:
+    """Directory of the per user compiler cache, MDEV_CACHE_DIR if set.
+
+    Read on each call, the environment of a command served by the mdev daemon is only set after it started.
+    """
+    return Path(os.environ.get("MDEV_CACHE_DIR", str(Path.home() / ".mdev" / "cache")))
+
+
+def launcher() -> List[str]:
+    """Compiler launcher to pass to cmake through CMAKE_<LANG>_COMPILER_LAUNCHER."""
+    return [sys.executable.replace("\\", "/"), "-m", "mdev.compiler_cache"]
+
+
+class _Compilation:
+    """A compiler command line split in the parts the cache cares about."""
+
+    def __init__(self, args: List[str]) -> None:
+        self.args = args
+        self.compiler = args[0]
+        self.output = None  # type: Optional[str]
+        self.depfile = None  # type: Optional[str]
+        self.dep_targets = []  # type: List[str]
+        self.hashed_args = []  # type: List[str]
+        self.preprocess_args = [args[0]]
+        self.cacheable = "-c" in args
+
+        rest = iter(args[1:])
+        for arg in rest:
+            if arg in _UNSUPPORTED_FLAGS or arg.startswith("@") or arg == "-":
+                self.cacheable = False
+            if arg in _OUTPUT_OPTIONS_WITH_VALUE:
+                value = next(rest, "")
+                if arg == "-o":
+                    self.output = value
+                elif arg == "-MF":
+                    self.depfile = value
+                else:
+                    self.dep_targets.append(value)
+            elif arg in _DEPENDENCY_FLAGS or arg == "-c":
+                self.hashed_args.append(arg)
+            elif arg in _PREPROCESSOR_OPTIONS_WITH_VALUE:
+                self.preprocess_args += [arg, next(rest, "")]
+            elif arg.startswith(_PREPROCESSOR_OPTIONS_WITH_VALUE):
+                self.preprocess_args.append(arg)
+            else:
+                self.hashed_args.append(arg)
+                self.preprocess_args.append(arg)
+
+        if self.output is None or (self.depfile is None and any(a in ("-MD", "-MMD") for a in args)):
+            self.cacheable = False
+        # Precompiled headers are only valid for the compiler run which produced them.
+        if any(a == "-x" and b.endswith("-header") for a, b in zip(args, args[1:])):
+            self.cacheable = False
+        self.preprocess_args.append("-E")
+        # Debug information records the working directory.
+        self.uses_cwd = any(a.startswith("-g") and a != "-g0" for a in self.hashed_args)
+
+    def key(self) -> Optional[str]:
+        """Hash the compilation, None if the source could not be preprocessed."""
+        ret = subprocess.run(self.preprocess_args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        if ret.returncode != 0:
+            return None
+        compiler = os.path.realpath(shutil.which(self.compiler) or self.compiler)
+        stat = os.stat(compiler)
+        digest = hashlib.sha256()
+        for part in (
+            CACHE_VERSION,
+            compiler,
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            "\0".join(self.hashed_args),
+            os.getcwd() if self.uses_cwd else "",
+        ):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        digest.update(ret.stdout)
+        return digest.hexdigest()
+
+    @property
+    def dep_target(self) -> str:
+        return self.dep_targets[0] if self.dep_targets else str(self.output)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run a compiler command line through the cache, return the compiler exit code."""
+    args = list(sys.argv[1:] if argv is None else argv)
+    if not args:
+        sys.stderr.write("usage: python -m mdev.compiler_cache <compiler> [args ...]\n")
+        return 2
+
+    cache = CompilerCache()
+    compilation = _Compilation(args)
+    if not compilation.cacheable:
+        cache.record("uncacheable")
+        return subprocess.run(args).returncode
+
+    try:
+        key = compilation.key()
+    except OSError:
+        key = None
+    if key is None:
+        cache.record("error")
+        return subprocess.run(args).returncode
+
+    entry = cache.lookup(key)
+    if entry is not None:
+        try:
+            shutil.copyfile(str(entry / "object"), str(compilation.output))
+            if compilation.depfile:
+                depfile = (entry / "depfile").read_text()
+                Path(compilation.depfile).write_text(
+                    depfile.replace(_DEPFILE_TARGET_PLACEHOLDER, compilation.dep_target)
+                )
+            sys.stderr.write((entry / "stderr").read_text())
+            cache.record("hit")
+            return 0
+        except OSError:
+            # Entry evicted while reading it, compile instead.
+            pass
+
+    ret = subprocess.run(args, stderr=subprocess.PIPE)
+    sys.stderr.write(ret.stderr.decode(errors="replace"))
+    if ret.returncode != 0:
+        return ret.returncode
+
+    cache.record("miss")
+    try:
+        files = {"object": Path(compilation.output).read_bytes(), "stderr": ret.stderr}
+        if compilation.depfile:
+            depfile = Path(compilation.depfile).read_text()
+            files["depfile"] = depfile.replace(compilation.dep_target, _DEPFILE_TARGET_PLACEHOLDER, 1).encode()
+        cache.store(key, files)
+    except OSError:
+        cache.record("error")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
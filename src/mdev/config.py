@@ -0,0 +1,158 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import click
+import kconfiglib
+
+from mdev.builder import BuildTarget
+from mdev.builder.kconfig import KconfigSetup, open_kconfig, set_values, unapplied, fragment_symbols, run_menu
+
+
+@click.group()
+def config() -> None:
+    """Read and change the Kconfig options of a project.
+
+    The options are stored in the .config file of the build tree of a
+    project/module pair, which must have been configured by `mdev build`
+    once. Changes are picked up by the next build. The parsed Kconfig tree
+    is cached in the build tree until a Kconfig file changes.
+    """
+
+
+@config.command()
+@click.argument("project")
+@click.argument("module")
+@click.argument("names", nargs=-1)
+def get(project: str, module: str, names: Tuple[str, ...]) -> None:
+    """Print the value of Kconfig options.
+
+    Arguments:
+
+        PROJECT: Path to the MXOS project
+
+        MODULE : Module name
+
+        NAMES  : Option names, all options are printed if none is given
+
+    Example:
+
+        $ mdev config get demos/helloworld emc3080 CONFIG_MXOS_DEBUG
+    """
+    with _open(project, module) as (kconf, _):
+        if not names:
+            for sym in kconf.unique_defined_syms:
+                if sym.config_string:
+                    click.echo(sym.config_string, nl=False)
+            return
+        for name in names:
+            sym = kconf.syms.get(name[len(kconf.config_prefix):] if name.startswith(kconf.config_prefix) else name)
+            if sym is None or not sym.nodes:
+                raise click.ClickException(f"Undefined symbol {name}")
+            click.echo(sym.config_string.rstrip() or f"{kconf.config_prefix}{sym.name}={sym.str_value}")
+
+
+@config.command("set")
+@click.argument("project")
+@click.argument("module")
+@click.argument("assignments", nargs=-1, required=True)
+def set_(project: str, module: str, assignments: Tuple[str, ...]) -> None:
+    """Change Kconfig options.
+
+    Nothing is saved if one of the values can't be applied, because it is
+    invalid or its dependencies are not met.
+
+    Arguments:
+
+        PROJECT    : Path to the MXOS project
+
+        MODULE     : Module name
+
+        ASSIGNMENTS: Options formatted as NAME=VALUE
+
+    Example:
+
+        $ mdev config set demos/helloworld emc3080 CONFIG_MXOS_DEBUG=y CONFIG_LOG_LEVEL=3
+    """
+    values = {}
+    for assignment in assignments:
+        name, sep, value = assignment.partition("=")
+        if not sep:
+            raise click.BadParameter(f"Expected NAME=VALUE, got '{assignment}'.", param_hint="ASSIGNMENTS")
+        values[name] = value
+
+    with _open(project, module) as (kconf, setup):
+        errors = set_values(kconf, values)
+        if errors:
+            raise click.ClickException("\n".join(errors))
+        click.echo(kconf.write_config(str(setup.config)))
+
+
+@config.command("apply-fragment")
+@click.argument("project")
+@click.argument("module")
+@click.argument("fragments", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, resolve_path=True))
+def apply_fragment(project: str, module: str, fragments: Tuple[str, ...]) -> None:
+    """Merge configuration fragments into the Kconfig options.
+
+    Arguments:
+
+        PROJECT  : Path to the MXOS project
+
+        MODULE   : Module name
+
+        FRAGMENTS: Files in .config format, applied in order
+
+    Example:
+
+        $ mdev config apply-fragment demos/helloworld emc3080 debug.conf
+    """
+    with _open(project, module) as (kconf, setup):
+        # Overriding the current values is the point of a fragment.
+        kconf.warn_assign_override = False
+        kconf.warn_assign_redun = False
+        names = []
+        for fragment in fragments:
+            kconf.load_config(fragment, replace=False)
+            names += fragment_symbols(kconf, Path(fragment))
+        errors = unapplied(kconf, names)
+        if errors:
+            raise click.ClickException("\n".join(errors))
+        click.echo(kconf.write_config(str(setup.config)))
+
+
+@config.command()
+@click.argument("project")
+@click.argument("module")
+def menu(project: str, module: str) -> None:
+    """Open the terminal configuration menu.
+
+    Arguments:
+
+        PROJECT: Path to the MXOS project
+
+        MODULE : Module name
+
+    Example:
+
+        $ mdev config menu demos/helloworld emc3080
+    """
+    try:
+        run_menu(BuildTarget(project, module))
+    except ImportError:
+        raise click.ClickException("The terminal menu needs curses, install it with `pip install windows-curses`.")
+    except (ValueError, kconfiglib.KconfigError) as err:
+        raise click.ClickException(str(err))
+
+
+@contextmanager
+def _open(project: str, module: str) -> Iterator[Tuple[kconfiglib.Kconfig, KconfigSetup]]:
+    """Open the Kconfig tree of a project/module pair, reporting errors as click exceptions."""
+    try:
+        with open_kconfig(BuildTarget(project, module)) as opened:
+            yield opened
+    except (ValueError, kconfiglib.KconfigError) as err:
+        raise click.ClickException(str(err))
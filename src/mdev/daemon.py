@@ -0,0 +1,251 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+import os
+import io
+import sys
+import json
+import time
+import signal
+import socket
+import threading
+import traceback
+
+from collections import OrderedDict
+from pathlib import Path
+
+import click
+
+from mdev import daemon_client, log
+from mdev.daemon_client import SOCKET_PATH, PID_MARKER, EXIT_MARKER, DAEMON_ROOT
+from mdev.project._internal.libraries import cache_reference_files, uncache_reference_files, find_reference_files
+
+PID_FILE = DAEMON_ROOT / "daemon.pid"
+LOG_FILE = DAEMON_ROOT / "daemon.log"
+
+# Number of program trees whose component files are kept in memory, the least recently served ones are dropped first.
+MAX_CACHED_PROGRAMS = 8
+
+
+@click.group()
+def daemon() -> None:
+    """Manage the mdev daemon.
+
+    The daemon keeps the mdev modules, the resolved environment and the
+    component tree of the programs it served loaded. While it is running,
+    `mdev build` and `mdev status` are sent to it over a local Unix socket
+    and only stream back the output, which removes the start up cost of
+    each invocation. Interactive and long running builds, with --watch,
+    --kconfig, --tune or --flash, still run in the calling process. Set
+    MDEV_NO_DAEMON=1 to bypass it.
+    """
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"):
+        raise click.ClickException("The mdev daemon is not supported on this platform.")
+
+
+@daemon.command()
+@click.option(
+    "--foreground",
+    is_flag=True,
+    help="Don't detach from the terminal.",
+)
+def start(foreground: bool) -> None:
+    """Start the mdev daemon.
+
+    Example:
+
+        $ mdev daemon start
+    """
+    answer = daemon_client.request({"control": "ping"})
+    if answer:
+        click.echo(f"mdev daemon is already running (pid {answer['pid']}).")
+        return
+
+    if not foreground:
+        if os.fork() > 0:
+            # Wait for the daemon to listen, so that the next mdev command uses it.
+            for _ in range(100):
+                if daemon_client.request({"control": "ping"}):
+                    click.echo("mdev daemon started.")
+                    return
+                time.sleep(0.1)
+            raise click.ClickException(f"mdev daemon didn't start, see {LOG_FILE}.")
+        _detach()
+
+    Server().serve_forever()
+
+
+@daemon.command()
+def stop() -> None:
+    """Stop the mdev daemon.
+
+    Example:
+
+        $ mdev daemon stop
+    """
+    if daemon_client.request({"control": "stop"}) is None:
+        click.echo("mdev daemon is not running.")
+    else:
+        click.echo("mdev daemon stopped.")
+
+
+@daemon.command()
+def status() -> None:
+    """Show whether the mdev daemon is running.
+
+    Example:
+
+        $ mdev daemon status
+    """
+    answer = daemon_client.request({"control": "ping"})
+    if answer is None:
+        click.echo("mdev daemon is not running.")
+        return
+    click.echo(f"mdev daemon is running (pid {answer['pid']}, {answer['served']} commands served).")
+    for root in answer["programs"]:
+        click.echo(f"  {root}")
+
+
+def _detach() -> None:
+    """Detach the current process from the terminal, the second half of a double fork."""
+    os.setsid()
+    if os.fork() > 0:
+        os._exit(0)
+    DAEMON_ROOT.mkdir(parents=True, exist_ok=True)
+    log_fd = os.open(str(LOG_FILE), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    null_fd = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null_fd, 0)
+    os.dup2(log_fd, 1)
+    os.dup2(log_fd, 2)
+
+
+class Server:
+    """mdev daemon, serving each command line in a process forked from its warm state."""
+
+    def __init__(self) -> None:
+        """Load everything a command needs, so that forked processes start warm."""
+        from mdev.cli import cli
+        from mdev.env import get_env, get_cmake, get_ninja
+        from mdev.builder.fingerprint import tool_version
+
+        self._cli = cli
+        get_env()
+        tool_version(get_cmake())
+        tool_version(get_ninja())
+        self._programs = OrderedDict()  # type: OrderedDict[Path, None]
+        self._served = 0
+
+    def serve_forever(self) -> None:
+        """Accept connections until a stop request is received."""
+        if SOCKET_PATH.exists():
+            SOCKET_PATH.unlink()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Create the socket accessible to the current user only, a chmod after bind would leave a window open.
+        umask = os.umask(0o077)
+        try:
+            listener.bind(str(SOCKET_PATH))
+        finally:
+            os.umask(umask)
+        listener.listen(16)
+        PID_FILE.write_text(str(os.getpid()))
+        # Forked children are reaped by the kernel.
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        log.inf(f"mdev daemon listening on {SOCKET_PATH} (pid {os.getpid()})")
+
+        try:
+            while True:
+                conn, _ = listener.accept()
+                try:
+                    message = json.loads(conn.makefile("rb").readline().decode() or "{}")
+                except ValueError:
+                    conn.close()
+                    continue
+                if message.get("control") == "stop":
+                    conn.sendall(b"{}\n")
+                    conn.close()
+                    break
+                if message.get("control") == "ping":
+                    answer = {"pid": os.getpid(), "served": self._served, "programs": [str(p) for p in self._programs]}
+                    conn.sendall(json.dumps(answer).encode() + b"\n")
+                    conn.close()
+                    continue
+                if "argv" in message:
+                    self._served += 1
+                    self._refresh_components(Path(message["cwd"]))
+                    if os.fork() == 0:
+                        listener.close()
+                        self._run(conn, message)
+                conn.close()
+        finally:
+            listener.close()
+            for path in (SOCKET_PATH, PID_FILE):
+                if path.exists():
+                    path.unlink()
+
+    def _refresh_components(self, root: Path) -> None:
+        """Keep the list of .component files of a program tree up to date for the forked processes.
+
+        Only the directories whose mtime changed since the previous command are listed again, see
+        `find_reference_files`, so that no resource is held on the directories of the tree.
+        """
+        root = root.resolve()
+        self._programs[root] = None
+        self._programs.move_to_end(root)
+        while len(self._programs) > MAX_CACHED_PROGRAMS:
+            evicted, _ = self._programs.popitem(last=False)
+            uncache_reference_files(evicted)
+        cache_reference_files(root, find_reference_files(root))
+
+    def _run(self, conn: socket.socket, message: dict) -> None:
+        """Run a command line with the output sent to the client, in a forked process. Never returns.
+
+        The process leads a new process group, terminated with the tools it runs when the client goes away.
+        """
+        returncode = 1
+        try:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            os.setsid()
+            conn.sendall(PID_MARKER + f"{os.getpid()}\n".encode())
+            threading.Thread(target=_terminate_on_hangup, args=(conn,), daemon=True).start()
+            os.chdir(message["cwd"])
+            os.environ.clear()
+            os.environ.update(message["env"])
+            os.environ["COLUMNS"] = str(message["columns"])
+            if message["tty"]:
+                os.environ["FORCE_COLOR"] = "1"
+
+            null_fd = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(null_fd, 0)
+            os.dup2(conn.fileno(), 1)
+            os.dup2(conn.fileno(), 2)
+            sys.stdout = io.TextIOWrapper(os.fdopen(1, "wb", closefd=False), line_buffering=True, errors="replace")
+            sys.stderr = io.TextIOWrapper(os.fdopen(2, "wb", closefd=False), line_buffering=True, errors="replace")
+
+            try:
+                self._cli.main(args=message["argv"], prog_name="mdev")
+                returncode = 0
+            except SystemExit as err:
+                returncode = err.code if isinstance(err.code, int) else (0 if err.code is None else 1)
+        except BaseException:
+            try:
+                traceback.print_exc()
+            except Exception:
+                pass
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                conn.sendall(EXIT_MARKER + f"{returncode}\n".encode())
+            finally:
+                os._exit(0)
+
+
+def _terminate_on_hangup(conn: socket.socket) -> None:
+    """Terminate the process group of the calling process when the client closes the connection."""
+    try:
+        # The client sends nothing after its request.
+        while conn.recv(4096):
+            pass
+    except OSError:
+        pass
+    os.killpg(0, signal.SIGTERM)
@@ -0,0 +1,151 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Thin client of the mdev daemon.
+
+It is imported before anything else on every mdev invocation, keep it free of imports which are not part of the
+standard library.
+"""
+import os
+import sys
+import json
+import shutil
+import signal
+import socket
+
+from pathlib import Path
+from typing import List, Optional
+
+DAEMON_ROOT = Path.home() / ".mdev"
+SOCKET_PATH = DAEMON_ROOT / "daemon.sock"
+
+# Commands run by the daemon when it is running, all other commands run in the calling process.
+FORWARDED_COMMANDS = ("build", "status")
+
+# Options of the forwarded commands which keep them in the calling process: the interactive ones, which need the
+# terminal, and the long running ones, which must stop with the calling process.
+LOCAL_OPTIONS = ("--watch", "--kconfig", "--tune", "--flash")
+LOCAL_SHORT_OPTIONS = "wkf"
+# Short options taking a value, the rest of a group of short options is that value.
+_VALUE_SHORT_OPTIONS = "Djpf"
+
+# Sent by the daemon before the command output, followed by the pid of the process running the command, which leads
+# its own process group, and a new line.
+PID_MARKER = b"\0mdev-pid:"
+# Sent by the daemon after the command output, followed by the exit code and a new line.
+EXIT_MARKER = b"\0mdev-exit:"
+
+
+def should_forward(argv: List[str]) -> bool:
+    """Check if a command line should be run by the daemon."""
+    if os.environ.get("MDEV_NO_DAEMON") or not hasattr(socket, "AF_UNIX"):
+        return False
+    command = next((arg for arg in argv if not arg.startswith("-")), None)
+    return command in FORWARDED_COMMANDS and not _has_local_option(argv) and SOCKET_PATH.exists()
+
+
+def _has_local_option(argv: List[str]) -> bool:
+    for arg in argv:
+        if arg == "--":
+            break
+        if arg.startswith("--"):
+            if arg.split("=", 1)[0] in LOCAL_OPTIONS:
+                return True
+        elif arg.startswith("-"):
+            for char in arg[1:]:
+                if char in LOCAL_SHORT_OPTIONS:
+                    return True
+                if char in _VALUE_SHORT_OPTIONS:
+                    break
+    return False
+
+
+def connect() -> Optional[socket.socket]:
+    """Connect to the daemon, None if it isn't running."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(SOCKET_PATH))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(message: dict) -> Optional[dict]:
+    """Send a control message to the daemon and return its answer, None if it isn't running."""
+    sock = connect()
+    if sock is None:
+        return None
+    with sock:
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        data = sock.makefile("rb").readline()
+    return json.loads(data.decode()) if data else None
+
+
+def run(argv: List[str]) -> Optional[int]:
+    """Run a command line in the daemon, streaming its output to stdout.
+
+    The command is terminated when the client is interrupted or goes away.
+
+    Returns:
+        Exit code of the command, None if the daemon isn't running.
+    """
+    sock = connect()
+    if sock is None:
+        return None
+
+    message = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "tty": sys.stdout.isatty(),
+        "columns": shutil.get_terminal_size().columns,
+    }
+    out = sys.stdout.buffer
+    tail = b""
+    pid = None  # type: Optional[int]
+    with sock:
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        try:
+            while True:
+                data = sock.recv(64 * 1024)
+                if not data:
+                    break
+                data = tail + data
+                if pid is None:
+                    end = data.find(b"\n")
+                    if end < 0 and (data.startswith(PID_MARKER) or PID_MARKER.startswith(data)):
+                        tail = data
+                        continue
+                    pid = 0
+                    if data.startswith(PID_MARKER):
+                        pid = int(data[len(PID_MARKER):end])
+                        data = data[end + 1:]
+                # Hold back a possible beginning of the exit marker until more data arrives.
+                marker = data.find(b"\0")
+                while marker >= 0 and not EXIT_MARKER.startswith(data[marker:marker + len(EXIT_MARKER)]):
+                    marker = data.find(b"\0", marker + 1)
+                if marker < 0:
+                    out.write(data)
+                    tail = b""
+                else:
+                    out.write(data[:marker])
+                    tail = data[marker:]
+                out.flush()
+        except KeyboardInterrupt:
+            # Closing the socket makes the daemon terminate the command too, interrupt it first so that it can stop
+            # cleanly.
+            if pid:
+                try:
+                    os.killpg(pid, signal.SIGINT)
+                except OSError:
+                    pass
+            return 130
+
+    if tail.startswith(EXIT_MARKER):
+        try:
+            return int(tail[len(EXIT_MARKER):].strip() or 0)
+        except ValueError:
+            pass
+    out.write(tail)
+    return 1
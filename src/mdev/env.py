@@ -3,14 +3,26 @@
 
 import os
 import sys
+import io
+import re
+import json
 import stat
+import time
 import errno
 import pathlib
 import shutil
+import hashlib
+import tempfile
+import threading
+import urllib3
+import urllib.parse
+import urllib.request
 import requests
 import tarfile
 import zipfile
-from rich.progress import Progress, BarColumn, TimeElapsedColumn, DownloadColumn, TransferSpeedColumn
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+from rich.progress import Progress, BarColumn, TextColumn, TimeElapsedColumn, DownloadColumn, TransferSpeedColumn
 
 from mdev import log
 
@@ -30,20 +42,72 @@ toolchains_afterfix = {
 
 user_home = str(pathlib.Path.home())
 env_root = os.path.abspath(os.path.join(user_home, '.mdev'))
-build_root = os.path.join(env_root, 'build')
+# Toolchain versions are installed side by side in the store, each in a directory named by the SHA-256 of its archive.
+toolchain_root = os.path.join(env_root, 'toolchains')
+store_root = os.path.join(toolchain_root, 'store')
+# Installed versions, {name: {version: sha256}}.
+toolchain_index_file = os.path.join(toolchain_root, 'index.json')
+# Version used when a program doesn't pin one, {name: version}.
+toolchain_current_file = os.path.join(toolchain_root, 'current.json')
+# Mirrors tried before url_common_header, {"mirrors": [url]}. URLs may be file:// URLs or local directories.
+mirrors_file = os.path.join(env_root, 'mirrors.json')
+# Comma separated mirrors, overriding mirrors_file.
+MIRRORS_ENV = 'MDEV_TOOLCHAIN_MIRRORS'
+# Versions pinned by a program or its mxos checkout, {name: version} or
+# {name: {"version": v, "sha256": {platform: h}}}.
+TOOLCHAIN_PIN_FILE_NAME = 'mdev-toolchains.json'
+MXOS_DIR_NAME = 'mxos'
+# The unversioned archives, e.g. cmake-linux.zip.
+DEFAULT_VERSION = 'latest'
+# Toolchains installed by older versions of mdev, adopted as DEFAULT_VERSION. Their archive is unknown.
+legacy_root = os.path.join(env_root, 'build')
+LEGACY_INSTALL = 'legacy'
+# A server may publish the SHA-256 of an archive in `<archive>.sha256`.
+CHECKSUM_SUFFIX = '.sha256'
+
 if sys.platform == 'darwin':
-    cmake_exe = os.path.join(build_root, 'CMake.app', 'Contents', 'bin', 'cmake')
-    ninja_exe = os.path.join(build_root, 'ninja')
+    toolchain_executables = {
+        'cmake': os.path.join('CMake.app', 'Contents', 'bin', 'cmake'),
+        'ninja': 'ninja',
+    }
 elif sys.platform == 'linux':
-    cmake_exe = os.path.join(build_root, 'cmake', 'bin', 'cmake')
-    ninja_exe = os.path.join(build_root, 'ninja')
+    toolchain_executables = {
+        'cmake': os.path.join('cmake', 'bin', 'cmake'),
+        'ninja': 'ninja',
+    }
 elif sys.platform == 'win32':
-    cmake_exe = os.path.join(build_root, 'cmake', 'bin', 'cmake.exe')
-    ninja_exe = os.path.join(build_root, 'ninja.exe')
+    toolchain_executables = {
+        'cmake': os.path.join('cmake', 'bin', 'cmake.exe'),
+        'ninja': 'ninja.exe',
+    }
 else:
     log.err(f'{sys.platform} is not support')
     exit(1)
 
+# An interrupted download is kept in `<archive>.part` and resumed with an HTTP Range request.
+PARTIAL_SUFFIX = '.part'
+DOWNLOAD_RETRIES = 5
+# Seconds to wait before the first retry, doubled after each failed attempt.
+DOWNLOAD_BACKOFF = 1.0
+# Retries of a mirror before falling back to the next source.
+MIRROR_RETRIES = 1
+DOWNLOAD_TIMEOUT = 30
+# Data is read in chunks of this size into a reusable buffer.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Progress displays are advanced at most once per interval, in seconds, rather than once per chunk.
+PROGRESS_INTERVAL = 0.1
+
+TAR_MODES = {'.tar.gz': 'gz', '.tgz': 'gz', '.tar.xz': 'xz', '.tar.bz2': 'bz2'}
+# The data filter of recent Python versions also drops special permissions, members are checked by mdev either way.
+TAR_FILTER = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+# Zip archives need random access, they are spooled in memory up to this size, then to a temporary file.
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+STAGING_PREFIX = '.staging-'
+# Zip members are extracted by a thread pool, zlib releases the GIL while inflating.
+EXTRACT_WORKERS = min(32, os.cpu_count() or 1)
+EXTRACT_BLOCK_SIZE = 1024 * 1024
+
+_index_lock = threading.Lock()
 
 
 def mkdir_p(path):  # type: (str) -> None
@@ -57,81 +121,711 @@ def add_execute_permission(exe):
     st = os.stat(exe)
     os.chmod(exe, st.st_mode | stat.S_IEXEC)
 
-def check_and_download(exe, zip, name):
-    exe_zip = os.path.join(build_root, zip)
-    if not os.path.exists(exe):
-        log.inf(f'{name} was not found.')
-        if not os.path.exists(exe_zip):
-            download(f'{url_common_header}{zip}', exe_zip)
-        extract(exe_zip)
-        os.remove(exe_zip)
-        add_execute_permission(exe)
-
-def get_env():  # type: () -> None
-    # Create env directory
-    if not os.path.exists(env_root):
-        log.inf(f'Directory {env_root} was not found.')
-        log.inf(f'Creating {env_root} ...')
-        mkdir_p(env_root)
-        
-    # Create build tools directory
-    if not os.path.exists(build_root):
-        log.inf(f'Directory {build_root} was not found.')
-        log.inf(f'Creating {build_root} ...')
-        os.makedirs(build_root)
-    
-    check_and_download(cmake_exe, f'cmake{toolchains_afterfix[sys.platform]}', 'CMake')
-    check_and_download(ninja_exe, f'ninja{toolchains_afterfix[sys.platform]}', 'Ninja')
-
-    return env_root.replace("\\", "/")
+def archive_name(name, version, platform=sys.platform):  # type: (str, str, str) -> str
+    suffix = toolchains_afterfix[platform]
+    return f'{name}{suffix}' if version == DEFAULT_VERSION else f'{name}-{version}{suffix}'
+
+def read_pins(root='.'):  # type: (str) -> dict
+    """Return the toolchain versions pinned by a program, as {name: (version, sha256 or None)}.
+
+    Pins of the program take precedence over those of its mxos checkout.
+    """
+    pins = {}
+    for directory in (os.path.join(root, MXOS_DIR_NAME), root):
+        for name, pin in _read_json(os.path.join(directory, TOOLCHAIN_PIN_FILE_NAME)).items():
+            if isinstance(pin, dict):
+                # Each platform has its own archive.
+                sha256 = pin.get('sha256') or {}
+                pins[name] = (str(pin.get('version', DEFAULT_VERSION)), sha256.get(sys.platform))
+            else:
+                pins[name] = (str(pin), None)
+    return pins
+
+def resolve_toolchain(name, root='.'):  # type: (str, str) -> tuple
+    """Return the version of a toolchain to use and the SHA-256 of its archive, None if unknown.
+
+    A version pinned by the program takes precedence over the one selected by `use_toolchain()`.
+    """
+    version, sha256 = read_pins(root).get(name, (None, None))
+    if version is None:
+        version = _read_json(toolchain_current_file).get(name, DEFAULT_VERSION)
+    return version, sha256 or installed_toolchains().get(name, {}).get(version)
+
+def installed_toolchains():  # type: () -> dict
+    """Return the installed versions, as {name: {version: sha256}}."""
+    return _read_json(toolchain_index_file)
+
+def toolchain_path(name, root='.'):  # type: (str, str) -> str
+    """Return the executable of the toolchain to use, None if it isn't installed."""
+    _, sha256 = resolve_toolchain(name, root)
+    if sha256 is None:
+        return None
+    path = os.path.join(store_root, sha256, toolchain_executables[name])
+    return path if os.path.exists(path) else None
+
+def use_toolchain(name, version):  # type: (str, str) -> None
+    """Select the version of a toolchain used by programs which don't pin one.
+
+    Raises:
+        ValueError: The version is not installed.
+    """
+    if version not in installed_toolchains().get(name, {}):
+        raise ValueError(f'{name} {version} is not installed.')
+    current = _read_json(toolchain_current_file)
+    current[name] = version
+    _write_json(toolchain_current_file, current)
+
+def pin_toolchain(name, version, root='.'):  # type: (str, str, str) -> None
+    """Pin a toolchain version and its SHA-256 in the pin file of a program.
+
+    Raises:
+        ValueError: The version is not installed.
+    """
+    sha256 = installed_toolchains().get(name, {}).get(version)
+    if sha256 is None:
+        raise ValueError(f'{name} {version} is not installed.')
+    path = os.path.join(root, TOOLCHAIN_PIN_FILE_NAME)
+    pins = _read_json(path)
+    pin = pins.get(name) if isinstance(pins.get(name), dict) and pins[name].get('version') == version else {}
+    checksums = dict(pin.get('sha256') or {})
+    if sha256 != LEGACY_INSTALL:
+        checksums[sys.platform] = sha256
+    pins[name] = {'version': version, 'sha256': checksums} if checksums else version
+    _write_json(path, pins)
+
+def check_and_download(names):  # type: (list) -> None
+    """Install the toolchains to use which are missing from the store, concurrently."""
+    missing = []
+    for name in names:
+        if toolchain_path(name) is None and not _adopt_legacy_install(name):
+            version, sha256 = resolve_toolchain(name)
+            log.inf(f'{name} {version} was not found.')
+            missing.append((name, version, sha256))
+    if missing:
+        install_toolchains(missing)
+
+_env_path = None
+
+def get_env():  # type: () -> str
+    # Creating the directories only needs to be checked once per process.
+    global _env_path
+    if _env_path is None:
+        # Create env directory
+        if not os.path.exists(env_root):
+            log.inf(f'Directory {env_root} was not found.')
+            log.inf(f'Creating {env_root} ...')
+            mkdir_p(env_root)
+
+        # Create toolchain store directory
+        if not os.path.exists(store_root):
+            log.inf(f'Directory {store_root} was not found.')
+            log.inf(f'Creating {store_root} ...')
+            os.makedirs(store_root)
+        _env_path = env_root.replace("\\", "/")
+
+    # The toolchains to use depend on the pins of the program in the working directory.
+    check_and_download(list(toolchain_executables))
+    return _env_path
 
 def get_cmake():
-    return cmake_exe.replace("\\", "/")
+    return _get_tool('cmake')
 
 def get_ninja():
-    return ninja_exe.replace("\\", "/")
+    return _get_tool('ninja')
 
-def download(url, destination): # type: (str, str) -> None
-    log.inf(f'Downloading {url} to {os.path.dirname(destination)} ...')
-    try:
-        with requests.get(url, stream=True) as response:
-            block_size = 1024 #1 Kibibyte
-            with open(destination, 'wb') as file:
-                with Progress(BarColumn(bar_width=None), 
-                TimeElapsedColumn(), 
-                DownloadColumn(), 
-                TransferSpeedColumn()) as progress:
-                    task = progress.add_task("", total=int(response.headers.get('content-length', 0)))
-                    for data in response.iter_content(block_size):
-                        progress.update(task, advance=block_size)
-                        file.write(data)
-    except:
-        if os.path.exists(destination):
-            os.remove(destination)
-            log.err('Error in downloading, exit.')
-            exit(1)
-
-def extract(filename, destination=None):  # type: (str, str) -> None
-    if destination == None:
-        destination = os.path.dirname(filename)
-    log.inf(f'Extracting {filename} to {destination} ...')
-    if filename.endswith(('.tar.gz', '.tgz')):
-        archive_obj = tarfile.open(filename, 'r:gz')
-    elif filename.endswith(('.tar.xz')):
-        archive_obj = tarfile.open(filename, 'r:xz')
-    elif filename.endswith(('.tar.bz2')):
-        archive_obj = tarfile.open(filename, 'r:bz2')    
-    elif filename.endswith('zip'):
-        archive_obj = zipfile.ZipFile(filename)
-    else:
+def _get_tool(name):  # type: (str) -> str
+    path = toolchain_path(name)
+    if path is None:
+        get_env()
+        path = toolchain_path(name)
+    return path.replace("\\", "/")
+
+def install_toolchains(toolchains):  # type: (list) -> None
+    """Install toolchains concurrently, exit on failure.
+
+    Args:
+        toolchains: (name, version, expected SHA-256 or None) of each toolchain.
+    """
+    with _progress() as progress:
+        with ThreadPoolExecutor(max_workers=len(toolchains)) as executor:
+            futures = [executor.submit(install_toolchain, name, version, sha256, progress)
+                       for name, version, sha256 in toolchains]
+            errors = [future.exception() for future in futures]
+    for (name, version, _), error in zip(toolchains, errors):
+        if error is not None:
+            log.err(f'Error in installing {name} {version}: {error}')
+    if any(errors):
+        log.err('Error in installing, exit.')
+        exit(1)
+
+def install_toolchain(name, version, sha256=None, progress=None):  # type: (str, str, str, Progress) -> str
+    """Install a toolchain version in the store.
+
+    Nothing is downloaded if an archive with the expected SHA-256 is already installed, under any version.
+
+    Args:
+        name: Toolchain name, e.g. cmake.
+        version: Toolchain version, DEFAULT_VERSION for the unversioned archive.
+        sha256: Expected SHA-256 of the archive, read from `<archive>.sha256` on the source if not given.
+        progress: Progress display of the download.
+
+    Returns:
+        The SHA-256 of the archive.
+
+    Raises:
+        requests.RequestException: The download failed.
+        ValueError: The archive doesn't match the expected SHA-256.
+    """
+    if sha256 is None or not os.path.isdir(os.path.join(store_root, sha256)):
+        os.makedirs(store_root, exist_ok=True)
+        pending = os.path.join(store_root, f'{STAGING_PREFIX}{name}-{os.getpid()}-{threading.get_ident()}')
+        expected = sha256
+        try:
+            sha256 = _from_sources(archive_name(name, version), lambda url, retries: install(
+                url, pending, progress, expected or _published_checksum(url), retries))
+            directory = os.path.join(store_root, sha256)
+            # Another version may be the same archive.
+            if not os.path.isdir(directory):
+                os.replace(pending, directory)
+        finally:
+            shutil.rmtree(pending, ignore_errors=True)
+        executable = os.path.join(directory, toolchain_executables[name])
+        # Archives made on Windows carry no permissions.
+        if not os.access(executable, os.X_OK):
+            add_execute_permission(executable)
+    _record_toolchain(name, version, sha256)
+    return sha256
+
+def _adopt_legacy_install(name):  # type: (str) -> bool
+    """Move the toolchains installed in legacy_root to the store, if the unversioned one is to be used."""
+    if resolve_toolchain(name) != (DEFAULT_VERSION, None):
+        return False
+    directory = os.path.join(store_root, LEGACY_INSTALL)
+    executable = toolchain_executables[name]
+    if not os.path.exists(os.path.join(directory, executable)):
+        if os.path.isdir(directory) or not os.path.exists(os.path.join(legacy_root, executable)):
+            return False
+        os.makedirs(store_root, exist_ok=True)
+        os.replace(legacy_root, directory)
+    _record_toolchain(name, DEFAULT_VERSION, LEGACY_INSTALL)
+    return True
+
+def _record_toolchain(name, version, sha256):  # type: (str, str, str) -> None
+    with _index_lock:
+        index = installed_toolchains()
+        index.setdefault(name, {})[version] = sha256
+        _write_json(toolchain_index_file, index)
+
+def install(url, destination, progress=None, sha256=None, retries=DOWNLOAD_RETRIES):
+    # type: (str, str, Progress, str, int) -> str
+    """Extract an archive to a directory while downloading it.
+
+    Tar archives are decompressed straight from the response, their members are checked before being extracted and
+    the archive is verified once complete. Zip archives are verified once complete, then extracted. The entries are
+    extracted to a staging directory which replaces `destination` once the archive is verified, so that a failed
+    install leaves nothing behind.
+
+    The data received is also kept next to `destination` in `<archive>` + PARTIAL_SUFFIX, so that an install
+    interrupted by a network failure or Ctrl+C resumes from it: the kept data is replayed through the extraction,
+    then the rest is requested with an HTTP Range request. The file is removed once the install succeeded or if the
+    archive is invalid. Archives of file:// URLs are read in place.
+
+    Args:
+        url: URL of the archive.
+        destination: Directory receiving the content of the archive.
+        progress: Progress display of the download.
+        sha256: Expected SHA-256 of the archive.
+        retries: Number of times a failed transfer is retried.
+
+    Returns:
+        The SHA-256 of the archive, computed while downloading it.
+
+    Raises:
+        requests.RequestException: The download failed after `retries` retries.
+        OSError: A file:// archive can't be read.
+        ValueError: The archive doesn't match the expected SHA-256, or one of its members would be extracted outside
+            `destination`.
+        NotImplementedError: Unsupported archive type.
+    """
+    name = url.rsplit('/', 1)[-1]
+    mode = next((mode for suffix, mode in TAR_MODES.items() if name.endswith(suffix)), None)
+    if mode is None and not name.endswith('.zip'):
         raise NotImplementedError('Unsupported archive type')
-    if sys.version_info.major == 2:
-        # This is a workaround for the issue that unicode destination is not handled:
-        # https://bugs.python.org/issue17153
-        destination = str(destination)
+    if progress is None:
+        with _progress() as progress:
+            return install(url, destination, progress, sha256, retries)
+    task = progress.add_task(name, total=None)
+    parent = os.path.dirname(os.path.abspath(destination))
+    partial = None if _local_path(url) else os.path.join(parent, name + PARTIAL_SUFFIX)
+    offset = os.path.getsize(partial) if partial and os.path.exists(partial) else 0
+    staging = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=parent)
     try:
-        archive_obj.extractall(destination)
-    except:
-        shutil.rmtree(destination, ignore_errors=True)
-        log.err('Error in extracting, exit.')
-        exit(1)
+        with _ResumableStream(url, offset, lambda count: progress.update(task, advance=count), retries) as stream:
+            stream.connect()
+            progress.update(task, total=stream.size, completed=stream.position)
+            with (_PartialStream(stream, partial) if partial else stream) as source:
+                if mode is not None:
+                    # tarfile reads records of 10 KiB, the network is read in chunks.
+                    buffered = io.BufferedReader(source, DOWNLOAD_CHUNK_SIZE)
+                    with tarfile.open(fileobj=buffered, mode=f'r|{mode}') as archive:
+                        archive.extractall(staging, _tar_members(archive, staging), **TAR_FILTER)
+                    # The end of the compressed stream is hashed too.
+                    _copy_stream(source, None)
+                    _check_sha256(name, stream.sha256.hexdigest(), sha256)
+                elif partial:
+                    _copy_stream(source, None)
+                    source.close()
+                    _check_sha256(name, stream.sha256.hexdigest(), sha256)
+                    with open(partial, 'rb') as file:
+                        extract_zip(file, staging)
+                else:
+                    with tempfile.SpooledTemporaryFile(SPOOL_MAX_SIZE, dir=parent) as spool:
+                        _copy_stream(source, spool)
+                        _check_sha256(name, stream.sha256.hexdigest(), sha256)
+                        extract_zip(spool, staging)
+            digest = stream.sha256.hexdigest()
+        if os.path.isdir(destination):
+            shutil.rmtree(destination)
+        os.replace(staging, destination)
+    except BaseException as err:
+        progress.remove_task(task)
+        # Only an interrupted transfer is worth resuming, the data of an invalid archive is dropped.
+        if partial and not isinstance(err, (requests.RequestException, KeyboardInterrupt)):
+            _remove(partial)
+        raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    if partial:
+        _remove(partial)
+    return digest
+
+def download(url, destination, progress=None, retries=DOWNLOAD_RETRIES):  # type: (str, str, Progress, int) -> str
+    """Download a file, resuming an interrupted transfer.
+
+    The data is written to `destination` + PARTIAL_SUFFIX, which is renamed once complete, so that the next
+    download of the file resumes from the data already received.
+
+    Returns:
+        The SHA-256 of the file.
+
+    Raises:
+        requests.RequestException: The download failed after `retries` retries.
+        OSError: A file:// file can't be read.
+    """
+    if progress is None:
+        with _progress() as progress:
+            return download(url, destination, progress, retries)
+    partial = destination + PARTIAL_SUFFIX
+    offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+    task = progress.add_task(os.path.basename(destination), total=None)
+    try:
+        with _ResumableStream(url, offset, lambda count: progress.update(task, advance=count), retries) as stream:
+            stream.connect()
+            progress.update(task, total=stream.size, completed=stream.position)
+            if stream.position:
+                with open(partial, 'rb') as file:
+                    for data in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b''):
+                        stream.sha256.update(data)
+            with open(partial, 'ab' if stream.position else 'wb') as file:
+                _copy_stream(stream, file)
+            digest = stream.sha256.hexdigest()
+    except BaseException:
+        progress.remove_task(task)
+        raise
+    os.replace(partial, destination)
+    return digest
+
+def toolchain_sources():  # type: () -> list
+    """Return the base URLs toolchain archives are fetched from, mirrors first."""
+    value = os.environ.get(MIRRORS_ENV)
+    mirrors = value.split(',') if value is not None else _read_json(mirrors_file).get('mirrors', [])
+    return [_base_url(mirror) for mirror in mirrors if mirror.strip()] + [url_common_header]
+
+def set_mirrors(mirrors):  # type: (list) -> None
+    """Store the mirrors tried before url_common_header, local directories are saved as file:// URLs."""
+    _write_json(mirrors_file, {'mirrors': [_base_url(mirror) for mirror in mirrors]})
+
+def prefetch(destination, toolchains, platforms):  # type: (str, list, list) -> list
+    """Download toolchain archives to a directory which can serve as a mirror, concurrently.
+
+    The SHA-256 of each archive is written next to it in `<archive>.sha256`. Archives already present with their
+    checksum are skipped.
+
+    Args:
+        destination: The mirror directory.
+        toolchains: (name, version) of each toolchain.
+        platforms: The platforms to download the archives of, values of sys.platform.
+
+    Returns:
+        The archives downloaded.
+
+    Raises:
+        requests.RequestException: A download failed.
+        ValueError: An archive doesn't match the SHA-256 published by its source.
+    """
+    os.makedirs(destination, exist_ok=True)
+    archives = sorted({archive_name(name, version, platform) for name, version in toolchains for platform in platforms})
+    archives = [a for a in archives if not os.path.exists(os.path.join(destination, a + CHECKSUM_SUFFIX))]
+
+    def fetch(archive, progress):  # type: (str, Progress) -> None
+        path = os.path.join(destination, archive)
+
+        def attempt(url, retries):  # type: (str, int) -> str
+            digest = download(url, path, progress, retries)
+            expected = _published_checksum(url)
+            if expected and digest != expected:
+                os.remove(path)
+                raise ValueError(f'SHA-256 of {archive} is {digest}, expected {expected}.')
+            return digest
+
+        digest = _from_sources(archive, attempt, exclude=_base_url(destination))
+        with open(path + CHECKSUM_SUFFIX, 'w') as file:
+            file.write(f'{digest}  {archive}\n')
+
+    if archives:
+        with _progress() as progress:
+            with ThreadPoolExecutor(max_workers=len(archives)) as executor:
+                for future in [executor.submit(fetch, archive, progress) for archive in archives]:
+                    future.result()
+    return archives
+
+def _from_sources(archive, function, exclude=None):  # type: (str, callable, str) -> str
+    """Call `function(url, retries)` with the URL of an archive on each source in turn, until one succeeds."""
+    sources = [source for source in toolchain_sources() if source != exclude]
+    for index, source in enumerate(sources):
+        url = f'{source}{archive}'
+        last = index == len(sources) - 1
+        try:
+            return function(url, DOWNLOAD_RETRIES if last else MIRROR_RETRIES)
+        except (requests.RequestException, OSError, ValueError) as err:
+            if last:
+                raise
+            log.wrn(f'{url} is not available ({err}), trying the next source.')
+
+def _base_url(mirror):  # type: (str) -> str
+    mirror = mirror.strip()
+    if '://' not in mirror:
+        mirror = pathlib.Path(mirror).expanduser().resolve().as_uri()
+    return mirror if mirror.endswith('/') else mirror + '/'
+
+def _local_path(url):  # type: (str) -> str
+    """Return the path of a file:// URL, None for other URLs."""
+    parsed = urllib.parse.urlparse(url)
+    return urllib.request.url2pathname(parsed.path) if parsed.scheme == 'file' else None
+
+def _published_checksum(url):  # type: (str) -> str
+    """Return the SHA-256 published next to an archive, None if there is none."""
+    path = _local_path(url)
+    try:
+        if path is not None:
+            with open(path + CHECKSUM_SUFFIX) as file:
+                fields = file.read().split()
+        else:
+            response = requests.get(url + CHECKSUM_SUFFIX, timeout=DOWNLOAD_TIMEOUT)
+            fields = response.text.split() if response.status_code == 200 else []
+    except (OSError, requests.RequestException):
+        return None
+    if fields and re.fullmatch(r'[0-9a-fA-F]{64}', fields[0]):
+        return fields[0].lower()
+    return None
+
+def _read_json(path):  # type: (str) -> dict
+    try:
+        with open(path) as file:
+            data = json.load(file)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _write_json(path, data):  # type: (str, dict) -> None
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp = f'{path}.{os.getpid()}'
+    with open(temp, 'w') as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+    os.replace(temp, path)
+
+def _copy_stream(stream, file):  # type: (_ResumableStream, object) -> None
+    """Copy the rest of a stream to a file, or discard it if `file` is None, through one preallocated buffer."""
+    buffer = bytearray(DOWNLOAD_CHUNK_SIZE)
+    view = memoryview(buffer)
+    while True:
+        count = stream.readinto(buffer)
+        if not count:
+            break
+        if file is not None:
+            file.write(view[:count])
+
+def _check_sha256(name, digest, sha256):  # type: (str, str, str) -> None
+    if sha256 and digest != sha256.lower():
+        raise ValueError(f'SHA-256 of {name} is {digest}, expected {sha256}.')
+
+def _tar_members(archive, destination):  # type: (tarfile.TarFile, str) -> Iterator[tarfile.TarInfo]
+    """Yield the members of a tar archive read as a stream, raise ValueError on one escaping `destination`.
+
+    Regular files, directories and links pointing inside `destination` are accepted.
+    """
+    for member in archive:
+        _checked_path(destination, member.name)
+        if member.issym():
+            _checked_path(destination, os.path.join(os.path.dirname(member.name), member.linkname), member.name)
+        elif member.islnk():
+            _checked_path(destination, member.linkname, member.name)
+        elif not (member.isfile() or member.isdir()):
+            raise ValueError(f'{member.name} is not a regular file, a directory or a link.')
+        yield member
+
+def _checked_path(destination, name, member=None):  # type: (str, str, str) -> str
+    """Return the path of a name relative to `destination`, raise ValueError if it is absolute or outside."""
+    path = os.path.normpath(os.path.join(destination, name))
+    if os.path.isabs(name) or os.path.commonpath([destination, path]) != destination:
+        raise ValueError(f'{member or name} points outside of the archive.')
+    return path
+
+def _remove(path):  # type: (str) -> None
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _progress():  # type: () -> Progress
+    return Progress(TextColumn('{task.description}'),
+                    BarColumn(bar_width=None),
+                    TimeElapsedColumn(),
+                    DownloadColumn(),
+                    TransferSpeedColumn())
+
+class _ResumableStream(io.RawIOBase):
+    """Read-only stream of a remote file, reconnecting with an HTTP Range request when the transfer fails.
+
+    The SHA-256 of the data read is computed in `sha256`. file:// URLs are read from the local file. `on_read` is
+    called with the number of bytes read at most every PROGRESS_INTERVAL seconds, and at the end of the stream.
+
+    Failures are retried up to `retries` times in a row with an exponential backoff, the count restarts when data
+    arrives. If the server can't resume, the transfer restarts from the first byte, unless data was already read from
+    the stream.
+    """
+
+    def __init__(self, url, position=0, on_read=None, retries=DOWNLOAD_RETRIES):
+        # type: (str, int, callable, int) -> None
+        super().__init__()
+        self.url = url
+        self.retries = retries
+        self.position = position
+        self.size = None
+        self.sha256 = hashlib.sha256()
+        self._on_read = on_read
+        self._unreported = 0
+        self._reported_at = 0.0
+        self._response = None
+        self._reader = None
+        self._received = 0
+        self._failures = 0
+
+    def readable(self):  # type: () -> bool
+        return True
+
+    def connect(self):  # type: () -> None
+        """Send the request, `position` is reset to 0 if the server can't resume."""
+        while self._response is None and self.size is None:
+            try:
+                self._open()
+            except requests.RequestException as err:
+                self._retry(err)
+
+    def readinto(self, buffer):  # type: (bytearray) -> int
+        while True:
+            if self.size is not None and self.position >= self.size:
+                self._report()
+                return 0
+            try:
+                if self._response is None:
+                    self._open()
+                    continue
+                count = self._reader.readinto(buffer)
+                if not count:
+                    if self.size is None:
+                        self._report()
+                        return 0
+                    raise requests.ConnectionError(f'Connection closed after {self.position} of {self.size} bytes.')
+            except (requests.RequestException, urllib3.exceptions.HTTPError) as err:
+                self._close_response()
+                self._retry(err)
+                continue
+            self.sha256.update(memoryview(buffer)[:count])
+            self.position += count
+            self._received += count
+            # Only consecutive failures count, a transfer making progress may be interrupted any number of times.
+            self._failures = 0
+            self._unreported += count
+            if time.monotonic() - self._reported_at >= PROGRESS_INTERVAL:
+                self._report()
+            return count
+
+    def close(self):  # type: () -> None
+        self._report()
+        self._close_response()
+        super().close()
+
+    def _report(self):  # type: () -> None
+        if self._unreported and self._on_read:
+            self._on_read(self._unreported)
+        self._unreported = 0
+        self._reported_at = time.monotonic()
+
+    def _open(self):  # type: () -> None
+        path = _local_path(self.url)
+        if path is not None:
+            self._response = self._reader = open(path, 'rb')
+            self.size = os.fstat(self._reader.fileno()).st_size
+            if self.position > self.size and not self._received:
+                # The file is smaller than the data already received, it changed.
+                self.position = 0
+            self._reader.seek(self.position)
+            return
+        headers = {'Range': f'bytes={self.position}-'} if self.position else {}
+        response = requests.get(self.url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT)
+        if response.status_code == 416:
+            response.close()
+            if response.headers.get('Content-Range') == f'bytes */{self.position}':
+                # Nothing left to read.
+                self.size = self.position
+                return
+            if not self._received:
+                # The remote file is smaller than the data already received, it changed.
+                self.position = 0
+                return self._open()
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+        if self.position and response.status_code != 206:
+            if self._received:
+                response.close()
+                raise OSError(f"{self.url} can't be resumed from byte {self.position}.")
+            # The server ignored the range and sends the whole file.
+            self.position = 0
+        length = int(response.headers.get('content-length', 0))
+        self.size = self.position + length if length else None
+        self._response = response
+        self._reader = response.raw
+
+    def _retry(self, err):  # type: (Exception) -> None
+        response = getattr(err, 'response', None)
+        if self._failures >= self.retries or response is not None and 400 <= response.status_code < 500:
+            if isinstance(err, requests.RequestException):
+                raise err
+            raise requests.ConnectionError(str(err)) from err
+        delay = DOWNLOAD_BACKOFF * 2 ** self._failures
+        self._failures += 1
+        log.wrn(f'Downloading {self.url} failed ({err}), retrying in {delay:.0f}s ...')
+        time.sleep(delay)
+
+    def _close_response(self):  # type: () -> None
+        if self._response is not None:
+            self._response.close()
+            self._response = self._reader = None
+
+class _PartialStream(io.RawIOBase):
+    """Stream of a connected `_ResumableStream` which keeps the data received in a partial file.
+
+    When the stream resumes from the end of the partial file, its data is read first, so that the whole file is read
+    and hashed. Otherwise the partial file is started over.
+    """
+
+    def __init__(self, stream, partial):  # type: (_ResumableStream, str) -> None
+        super().__init__()
+        self._stream = stream
+        self._replay = open(partial, 'rb') if stream.position else None
+        self._remaining = stream.position
+        self._file = open(partial, 'ab' if stream.position else 'wb')
+
+    def readable(self):  # type: () -> bool
+        return True
+
+    def readinto(self, buffer):  # type: (bytearray) -> int
+        if self._remaining:
+            view = memoryview(buffer)[:self._remaining]
+            count = self._replay.readinto(view)
+            if not count:
+                raise OSError(f'{self._replay.name} was truncated while being resumed.')
+            self._remaining -= count
+            self._stream.sha256.update(view[:count])
+            return count
+        count = self._stream.readinto(buffer)
+        self._file.write(memoryview(buffer)[:count])
+        return count
+
+    def close(self):  # type: () -> None
+        if not self.closed:
+            if self._replay is not None:
+                self._replay.close()
+            self._file.close()
+        super().close()
+
+def extract_zip(file, destination):  # type: (object, str) -> None
+    """Extract a zip archive with a thread pool.
+
+    Directories are created first, then the members are extracted largest first. The permissions and symbolic
+    links of archives made on Unix are kept, a link pointing outside `destination` raises ValueError.
+
+    Args:
+        file: Path or file object of the archive.
+        destination: Directory receiving the content of the archive.
+    """
+    with zipfile.ZipFile(file) as archive:
+        directories = {destination: None}
+        members = []
+        for info in archive.infolist():
+            path = _member_path(destination, info.filename)
+            if path is None:
+                continue
+            if info.is_dir():
+                directories[path] = info
+            else:
+                directories.setdefault(os.path.dirname(path), None)
+                members.append((info, path))
+        for directory in sorted(directories):
+            os.makedirs(directory, exist_ok=True)
+        members.sort(key=lambda member: member[0].file_size, reverse=True)
+        if EXTRACT_WORKERS > 1:
+            with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as executor:
+                list(executor.map(lambda member: _extract_member(archive, *member, destination), members))
+        else:
+            for info, path in members:
+                _extract_member(archive, info, path, destination)
+        # Applied last, a directory may be read-only.
+        for directory, info in sorted(directories.items(), reverse=True):
+            mode = _unix_mode(info) if info is not None else 0
+            if mode & 0o777:
+                os.chmod(directory, mode & 0o7777)
+
+def _extract_member(archive, info, path, destination):  # type: (zipfile.ZipFile, zipfile.ZipInfo, str, str) -> None
+    mode = _unix_mode(info)
+    if stat.S_ISLNK(mode):
+        link = archive.read(info).decode()
+        relpath = os.path.relpath(path, destination)
+        _checked_path(destination, os.path.join(os.path.dirname(relpath), link), info.filename)
+        try:
+            os.symlink(link, path)
+            return
+        except OSError:
+            # Creating symbolic links needs a privilege on Windows, the link is extracted as a file like extractall.
+            pass
+    with archive.open(info) as source, open(path, 'wb') as target:
+        shutil.copyfileobj(source, target, EXTRACT_BLOCK_SIZE)
+    if mode & 0o777:
+        os.chmod(path, mode & 0o7777)
+
+def _unix_mode(info):  # type: (zipfile.ZipInfo) -> int
+    return info.external_attr >> 16 if info.create_system == 3 else 0
+
+def _member_path(destination, name):  # type: (str, str) -> str
+    """Return where a member is extracted, None if its name is empty once sanitized like zipfile does."""
+    name = name.replace('/', os.path.sep)
+    if os.path.altsep:
+        name = name.replace(os.path.altsep, os.path.sep)
+    parts = [part for part in os.path.splitdrive(name)[1].split(os.path.sep)
+             if part not in ('', os.path.curdir, os.path.pardir)]
+    return os.path.join(destination, *parts) if parts else None
+
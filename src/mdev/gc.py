@@ -0,0 +1,104 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+import time
+import click
+
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+from mdev.builder.gc import collect, find_build_trees, is_locked, load_policy, save_policy
+from mdev.builder.target import BUILD_DIR
+from mdev.cache import parse_size, format_size
+
+
+@click.command()
+@click.option(
+    "--budget",
+    "-b",
+    help="Disk budget of the build directory, e.g. 20G [default: the budget set with --auto]",
+)
+@click.option(
+    "--strip",
+    "-s",
+    is_flag=True,
+    help="Keep the final images and map files of the collected build trees.",
+)
+@click.option(
+    "--dry-run",
+    "-n",
+    is_flag=True,
+    help="Only list the build trees which would be collected.",
+)
+@click.option(
+    "--auto/--no-auto",
+    default=None,
+    help="Enable or disable collecting build trees with these settings after each build.",
+)
+def gc(budget: str, strip: bool, dry_run: bool, auto: bool) -> None:
+    """
+    Free disk space used by the build trees of the current program.
+
+    The least recently built project/module trees are removed, or stripped
+    down to their final images with --strip, until the build directory fits
+    in the disk budget. Trees with a build in progress are never collected.
+    Without any option, the build trees are listed.
+
+    Example:
+
+        $ mdev gc --budget 20G
+
+        $ mdev gc --budget 20G --strip --auto
+
+        $ mdev gc --no-auto
+    """
+    if auto is False:
+        save_policy(None)
+        click.echo("Automatic garbage collection disabled.")
+    elif auto:
+        if not budget:
+            raise click.UsageError("--auto requires a --budget.")
+        save_policy(parse_size(budget), strip)
+        click.echo(f"Build trees are collected after each build to stay within {budget}.")
+
+    if not budget:
+        if auto is None:
+            _list_build_trees()
+        return
+
+    collected = collect(parse_size(budget), strip, dry_run)
+    if not collected:
+        click.echo(f"{BUILD_DIR} fits in {budget}, nothing to collect.")
+        return
+    action = "Would collect" if dry_run else ("Stripped" if strip else "Removed")
+    for tree in collected:
+        click.echo(f"{action} {tree.path} ({format_size(tree.size)})")
+
+
+def _list_build_trees() -> None:
+    """Print the build trees with their size and last build time."""
+    trees = find_build_trees(Path(BUILD_DIR))
+    table = Table(title="Build Trees", box=box.ROUNDED, style='blue')
+    table.add_column("Build Tree", style="cyan")
+    table.add_column("Size", justify="right", style="green")
+    table.add_column("Last Built")
+    table.add_column("State")
+    for tree in reversed(trees):
+        table.add_row(
+            str(tree.path).replace('\\', '/'),
+            format_size(tree.size),
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(tree.last_used)),
+            "[yellow]building" if is_locked(tree.path) else "",
+        )
+    console = Console()
+    console.print(table, justify="left")
+    policy = load_policy()
+    total = format_size(sum(tree.size for tree in trees))
+    if policy:
+        mode = "stripped" if policy.get("strip") else "removed"
+        console.print(f"Total {total}, trees are {mode} after each build above {format_size(policy['budget'])}.")
+    else:
+        console.print(f"Total {total}, automatic garbage collection is disabled.")
@@ -2,52 +2,22 @@
 # Date  : 2022/03/21
 
 """mdev entry point."""
+import sys
 
-from typing import Union, Any
+from mdev import daemon_client
 
-import click
 
-from mdev.build import build
-from mdev.project_management import new, import_, deploy, sync, status
-from mdev import log
+def main() -> None:
+    """Run mdev, forwarding the command to the mdev daemon when it is running and serves it."""
+    argv = sys.argv[1:]
+    if daemon_client.should_forward(argv):
+        returncode = daemon_client.run(argv)
+        if returncode is not None:
+            sys.exit(returncode)
 
-CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
+    from mdev.cli import cli
+    cli(prog_name="mdev")
 
-def get_version():
-    from pkg_resources import get_distribution
-    return get_distribution("mdev").version
 
-def print_version(context: click.Context, param: Union[click.Option, click.Parameter], value: bool) -> Any:
-    """Print the version of mbed-tools."""
-    if not value or context.resilient_parsing:
-        return
-    click.echo(get_version())
-    context.exit()
-
-@click.group(context_settings=CONTEXT_SETTINGS)
-@click.option(
-    "--version",
-    is_flag=True,
-    callback=print_version,
-    expose_value=False,
-    is_eager=True,
-    help="Display versions of all Mbed Tools packages.",
-)
-@click.option(
-    "-v",
-    "--verbose",
-    default=0,
-    count=True,
-    help="Set the verbosity level, enter multiple times to increase verbosity.",
-)
-def cli(verbose: int) -> None:
-    """The MXOS meta-tool."""
-    log.set_verbosity(verbose)
-
-cli.add_command(new, "new")
-cli.add_command(import_, "import")
-cli.add_command(deploy, "deploy")
-cli.add_command(sync, "sync")
-cli.add_command(build, "build")
-cli.add_command(status, "status")
-cli()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
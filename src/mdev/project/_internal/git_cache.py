@@ -0,0 +1,146 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+"""Per user cache of bare repositories shared by the clones of every program.
+
+Each remote is mirrored once in a bare repository below `cache_root()` and brought up to date by an incremental fetch
+before it is cloned again. Clones borrow the objects of the cache through git alternates, so that only the objects
+missing from the cache are downloaded and a repository checked out by several programs is stored once.
+
+The cache repositories are never garbage collected, a clone borrowing an object dropped by the cache would be corrupt.
+A clone is made standalone with `git repack -a -d` followed by removing its .git/objects/info/alternates file.
+"""
+import os
+import re
+import sys
+import shutil
+import hashlib
+import logging
+import threading
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import git
+
+logger = logging.getLogger(__name__)
+
+# Branches and tags are mirrored, refs of code review systems and pull requests are left out.
+_FETCH_REFSPECS = ("+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+
+_locks = {}  # type: Dict[Path, threading.Lock]
+_locks_lock = threading.Lock()
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock(fd: int) -> None:
+        # LK_LOCK gives up after 10 seconds, wait as long as flock does while another process updates the cache.
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock(fd: int) -> None:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def cache_root() -> Optional[Path]:
+    """Directory of the cache, MDEV_GIT_CACHE_DIR if set. None if the variable is set to an empty string.
+
+    Read on each call, the environment of a command served by the mdev daemon is only set after it started.
+    """
+    root = os.environ.get("MDEV_GIT_CACHE_DIR", str(Path.home() / ".mdev" / "git-cache"))
+    return Path(root) if root else None
+
+
+def cache_path(url: str, root: Path) -> Path:
+    """Return the path of the cache repository of a remote in a cache directory."""
+    url = url.rstrip("/")
+    name = re.sub(r"[^\w.-]", "_", re.split(r"[/\\:]", url)[-1])
+    if name.endswith(".git"):
+        name = name[:-len(".git")]
+    return root / f"{name}-{hashlib.sha1(url.encode()).hexdigest()[:16]}.git"
+
+
+def update(url: str) -> Optional[Path]:
+    """Mirror a remote in the cache, or fetch what changed since it was last mirrored.
+
+    Args:
+        url: URL of the remote.
+
+    Returns:
+        The path of the cache repository, None if the cache is disabled or the remote couldn't be mirrored. Clone
+        without the cache in that case. If the fetch of an existing cache repository fails, it is still returned, the
+        clone fetches what it misses from the remote.
+    """
+    root = cache_root()
+    if root is None:
+        return None
+    path = cache_path(url, root)
+    try:
+        with _cache_lock(path):
+            if (path / "HEAD").is_file():
+                logger.info(f"Updating the git cache of {url}.")
+                with git.Repo(str(path)) as repo:
+                    repo.git.fetch("--prune", "--quiet", "origin")
+            else:
+                logger.info(f"Mirroring {url} in the git cache.")
+                _create(url, path)
+    except (git.exc.GitError, OSError) as err:
+        if (path / "HEAD").is_file():
+            logger.warning(
+                f"Can't update the git cache of {url}, cloning with the objects already cached. Error from VCS: {err}"
+            )
+            return path
+        logger.warning(f"Can't update the git cache of {url}, cloning without it. Error from VCS: {err}")
+        return None
+    return path
+
+
+def _create(url: str, path: Path) -> None:
+    """Mirror a remote in a new cache repository, nothing is left behind on failure."""
+    staging = path.with_name(f"{path.name}.{os.getpid()}")
+    shutil.rmtree(str(staging), ignore_errors=True)
+    try:
+        with git.Repo.init(str(staging), bare=True) as repo:
+            with repo.config_writer() as config:
+                config.set_value('remote "origin"', "url", url)
+                config.set_value("gc", "auto", 0)
+                config.set_value("gc", "pruneExpire", "never")
+            for refspec in _FETCH_REFSPECS:
+                repo.git.config("--add", "remote.origin.fetch", refspec)
+            repo.git.fetch("--quiet", "origin")
+        os.replace(str(staging), str(path))
+    finally:
+        shutil.rmtree(str(staging), ignore_errors=True)
+
+
+@contextmanager
+def _cache_lock(path: Path) -> Iterator[None]:
+    """Serialise the updates of a cache repository, between threads and between processes."""
+    with _locks_lock:
+        lock = _locks.setdefault(path, threading.Lock())
+    with lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(path.with_suffix(".lock")), os.O_RDWR | os.O_CREAT)
+        try:
+            _lock(fd)
+            try:
+                yield
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
@@ -2,18 +2,47 @@
 # Date  : 2022/03/28
 
 """Wrappers for git operations."""
+import os
+
 from dataclasses import dataclass
 from pathlib import Path
 
 import git
+import shutil
 import logging
 
+from rich.progress import Progress
+
 from mdev.project.exceptions import VersionControlError
-from mdev.project._internal.progress import ProgressReporter
-from typing import Optional
+from mdev.project._internal import git_cache
+from mdev.project._internal.progress import ProgressReporter, git_progress
+from typing import Any, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+# How components are cloned. A full clone has the whole history, borrowed from the git cache. A shallow clone only
+# fetches the pinned revision, a blobless clone fetches the history without file contents, downloaded on checkout.
+# The git cache mirrors whole histories, so it's only used by full clones.
+CLONE_FULL = "full"
+CLONE_SHALLOW = "shallow"
+CLONE_BLOBLESS = "blobless"
+CLONE_STRATEGIES = (CLONE_FULL, CLONE_SHALLOW, CLONE_BLOBLESS)
+CLONE_STRATEGY_ENV = "MDEV_CLONE_STRATEGY"
+
+
+def default_clone_strategy() -> str:
+    """Return the clone strategy set by MDEV_CLONE_STRATEGY, CLONE_FULL if it isn't set.
+
+    Read on each call, the environment of a command served by the mdev daemon is only set after it started.
+
+    Raises:
+        ValueError: MDEV_CLONE_STRATEGY isn't one of CLONE_STRATEGIES.
+    """
+    strategy = os.environ.get(CLONE_STRATEGY_ENV) or CLONE_FULL
+    if strategy not in CLONE_STRATEGIES:
+        raise ValueError(f"{CLONE_STRATEGY_ENV} is '{strategy}', expected one of {', '.join(CLONE_STRATEGIES)}.")
+    return strategy
+
 
 @dataclass
 class GitReference:
@@ -28,34 +57,85 @@ class GitReference:
     ref: str
 
 
-def clone(url: str, dst_dir: Path, ref: Optional[str] = None, depth: int = 1) -> git.Repo:
+def clone(
+    url: str,
+    dst_dir: Path,
+    ref: Optional[str] = None,
+    depth: int = 1,
+    strategy: str = CLONE_FULL,
+    progress: Optional[Progress] = None,
+) -> git.Repo:
     """Clone a library repository.
 
+    The objects already in the git cache are borrowed from it instead of being downloaded again, see `git_cache`.
+
     Args:
         url: URL of the remote to clone.
         dst_dir: Destination directory for the cloned repo.
-        ref: An optional git commit hash, branch or tag reference to checkout
-        depth: Truncate history to the specified number of commits. Defaults to
-               1, to make a shallow clone.
+        ref: An optional git branch or tag reference to checkout
+        depth: Truncate history to the specified number of commits in a shallow clone. Defaults to 1.
+        strategy: One of CLONE_STRATEGIES.
+        progress: Progress display shared by concurrent clones, the clone shows its own if not given.
 
     Raises:
         VersionControlError: Cloning the repository failed.
     """
-    # Gitpython doesn't propagate the git error message when a repo is already
-    # cloned, so we cannot depend on git to handle the "already cloned" error.
-    # We must handle this ourselves instead.
-    if dst_dir.exists() and list(dst_dir.glob("*")):
-        raise VersionControlError(f"{dst_dir} exists and is not an empty directory.")
-
-    # clone_from_kwargs = {"url": url, "to_path": str(dst_dir), "progress": ProgressReporter(name=url), "depth": depth}
-    clone_from_kwargs = {"url": url, "to_path": str(dst_dir), "progress": ProgressReporter(name=url)}
+    if progress is None:
+        with git_progress() as progress:
+            return clone(url, dst_dir, ref, depth, strategy, progress)
+    _check_empty(dst_dir)
+    reporter = ProgressReporter(progress, name=_repo_name(url))
+    clone_from_kwargs = {"url": url, "to_path": str(dst_dir), "progress": reporter}
+    clone_from_kwargs.update(_strategy_options(strategy, depth))
     if ref:
         clone_from_kwargs["branch"] = ref
+    if strategy == CLONE_FULL:
+        reference = git_cache.update(url)
+        if reference:
+            clone_from_kwargs["reference_if_able"] = str(reference)
 
     try:
         return git.Repo.clone_from(**clone_from_kwargs)
     except git.exc.GitCommandError as err:
         raise VersionControlError(f"Cloning git repository from url '{url}' failed. Error from VCS: {err}")
+    finally:
+        reporter.close()
+
+
+def clone_revision(
+    url: str, dst_dir: Path, ref: str, strategy: str, depth: int = 1, progress: Optional[Progress] = None
+) -> git.Repo:
+    """Clone only the history of one revision of a repository, checked out on a detached HEAD.
+
+    Args:
+        url: URL of the remote to clone.
+        dst_dir: Destination directory for the cloned repo.
+        ref: Git commit hash, branch or tag reference to fetch.
+        depth: Truncate history to the specified number of commits in a shallow clone. Defaults to 1.
+        strategy: CLONE_SHALLOW or CLONE_BLOBLESS.
+        progress: Progress display shared by concurrent clones, the clone shows its own if not given.
+
+    Raises:
+        VersionControlError: Fetching the revision failed, servers may refuse to serve unadvertised commits. Nothing
+                             is left in `dst_dir` then.
+    """
+    if progress is None:
+        with git_progress() as progress:
+            return clone_revision(url, dst_dir, ref, strategy, depth, progress)
+    _check_empty(dst_dir)
+    # The size of a single revision isn't reported, the task only shows the fetch is running.
+    task = progress.add_task(f"{_repo_name(url)} fetching {ref}", total=None)
+    try:
+        repo = git.Repo.init(str(dst_dir))
+        repo.create_remote("origin", url)
+        repo.git.fetch("origin", ref, **_strategy_options(strategy, depth))
+        repo.git.checkout("FETCH_HEAD")
+        return repo
+    except git.exc.GitCommandError as err:
+        shutil.rmtree(str(dst_dir), ignore_errors=True)
+        raise VersionControlError(f"Fetching revision '{ref}' from url '{url}' failed. Error from VCS: {err}")
+    finally:
+        progress.remove_task(task)
 
 
 def checkout(repo: git.Repo, ref: str, force: bool = False) -> None:
@@ -75,6 +155,15 @@ def checkout(repo: git.Repo, ref: str, force: bool = False) -> None:
         raise VersionControlError(f"Failed to check out revision '{ref}'. Error from VCS: {err}")
 
 
+def has_commit(repo: git.Repo, ref: str) -> bool:
+    """Tell whether a commit is in a repository, without fetching it."""
+    try:
+        repo.git.cat_file("-e", f"{ref}^{{commit}}")
+        return True
+    except git.exc.GitCommandError:
+        return False
+
+
 def fetch(repo: git.Repo, ref: str) -> None:
     """Fetch from the repo's origin.
 
@@ -86,7 +175,11 @@ def fetch(repo: git.Repo, ref: str) -> None:
         VersionControlError: Fetch failed.
     """
     try:
-        repo.git.fetch("origin", ref)
+        # Shallow clones stay shallow, blobless ones keep the filter of their remote.
+        if Path(repo.git_dir, "shallow").is_file():
+            repo.git.fetch("origin", ref, depth=1)
+        else:
+            repo.git.fetch("origin", ref)
     except git.exc.GitCommandError as err:
         raise VersionControlError(f"Failed to fetch. Error from VCS: {err}")
 
@@ -145,3 +238,25 @@ def get_default_branch(repo: git.Repo) -> str:
         return str(repo.git.symbolic_ref("refs/remotes/origin/HEAD").rsplit("/", maxsplit=1)[-1])
     except git.exc.GitCommandError as err:
         raise VersionControlError(f"Could not resolve default repository branch name. Error from VCS: {err}")
+
+
+def _check_empty(dst_dir: Path) -> None:
+    # Gitpython doesn't propagate the git error message when a repo is already
+    # cloned, so we cannot depend on git to handle the "already cloned" error.
+    # We must handle this ourselves instead.
+    if dst_dir.exists() and list(dst_dir.glob("*")):
+        raise VersionControlError(f"{dst_dir} exists and is not an empty directory.")
+
+
+def _strategy_options(strategy: str, depth: int) -> Dict[str, Any]:
+    """Return the options of `git clone` and `git fetch` implementing a clone strategy."""
+    if strategy == CLONE_SHALLOW:
+        return {"depth": depth}
+    if strategy == CLONE_BLOBLESS:
+        return {"filter": "blob:none"}
+    return {}
+
+
+def _repo_name(url: str) -> str:
+    """Return the name of a repository shown in the progress display, the last component of its URL."""
+    return url.rstrip("/").rsplit("/", maxsplit=1)[-1]
@@ -3,17 +3,84 @@
 
 """Objects for library reference handling."""
 import os
+import re
+import json
+import time
 import logging
 
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Generator, List
+from typing import Dict, Generator, Iterable, List, Optional
+
+from rich.progress import Progress
 
 from mdev.project._internal import git_utils
+from mdev.project._internal.progress import git_progress
+from mdev.project._internal.project_data import BUILD_DIR
 from mdev.project.exceptions import VersionControlError
 
 logger = logging.getLogger(__name__)
 
+# .component files of program trees known to be up to date, relative to the tree root. Filled by long running
+# processes like the mdev daemon which track changes to the tree, the component index is used for the other trees.
+_reference_file_cache = {}  # type: Dict[Path, List[Path]]
+
+# Number of components cloned at the same time by default.
+DEFAULT_FETCH_JOBS = 4
+
+# Index of the directories of program trees which may hold .component files, stored in the .git directory of the
+# program. Each directory is listed with its mtime, its .component files and its subdirectories.
+COMPONENT_INDEX_FILE_NAME = "mdev-components.json"
+_COMPONENT_INDEX_VERSION = 1
+# Directories never holding .component files, the build directory is only skipped at the root of the program.
+_PRUNED_DIR_NAMES = (".git",)
+# A directory changed in the same mtime tick as the scan which listed it would look unchanged, directories modified
+# this recently are listed again by the next scan.
+_RACY_SECONDS = 2
+_component_index_cache = {}  # type: Dict[Path, Dict[str, list]]
+
+_FULL_SHA_RE = re.compile(r"^(?:[0-9a-fA-F]{40}|[0-9a-fA-F]{64})$")
+
+
+def cache_reference_files(root: Path, reference_files: Iterable[Path]) -> None:
+    """Remember the .component files found in a program tree, instead of scanning it again.
+
+    Args:
+        root: Root of the program tree.
+        reference_files: Paths of the .component files, relative to `root`.
+    """
+    _reference_file_cache[root.resolve()] = list(reference_files)
+
+
+def uncache_reference_files(root: Path) -> None:
+    """Forget the .component files of a program tree, the next iteration scans it again."""
+    _reference_file_cache.pop(root.resolve(), None)
+
+
+def find_reference_files(root: Path) -> List[Path]:
+    """Find the .component files of a program tree.
+
+    The tree is walked once, skipping .git directories and the build directory. The index of the directories walked
+    is kept in memory and in the .git directory of the program, later calls only list the directories whose mtime
+    changed, and the new directories below them.
+
+    Args:
+        root: Root of the program tree.
+
+    Returns:
+        Paths of the .component files, relative to `root`, sorted.
+    """
+    root = root.resolve()
+    index = _component_index_cache.get(root)
+    if index is None:
+        index = _load_component_index(root)
+    updated = _scan_directories(root, index)
+    _component_index_cache[root] = updated
+    if updated != index:
+        _save_component_index(root, updated)
+    return sorted(Path(rel, name) for rel, (_, names, _) in updated.items() for name in names)
+
 
 @dataclass(frozen=True, order=True)
 class MxosLibReference:
@@ -57,34 +124,88 @@ class LibraryReferences:
     root: Path
     ignore_paths: List[str]
 
-    def fetch(self) -> None:
-        """Recursively clone all dependencies defined in .component files."""
-        for lib in self.iter_unresolved():
-            git_ref = lib.get_git_reference()
-            logger.info(f"Resolving library reference {git_ref.repo_url}.")
-            _clone_at_ref(git_ref.repo_url, lib.source_code_path, git_ref.ref)
+    def fetch(self, jobs: int = DEFAULT_FETCH_JOBS, strategy: Optional[str] = None) -> None:
+        """Recursively clone all dependencies defined in .component files.
+
+        Components are cloned by a pool of workers. The references found in a component are queued as soon as its
+        clone finishes, instead of after all the clones of its depth. Every component which can be cloned is, even
+        if another one fails, and the clones are registered in sorted order, so that the result doesn't depend on
+        the order the clones finish in.
+
+        Args:
+            jobs: Number of components cloned at the same time.
+            strategy: How components are cloned, one of `git_utils.CLONE_STRATEGIES`. Defaults to
+                `git_utils.default_clone_strategy()`.
+
+        Raises:
+            VersionControlError: Cloning a component failed, the error of the first one in path order is raised.
+            ValueError: No strategy is given and MDEV_CLONE_STRATEGY is invalid.
+        """
+        if strategy is None:
+            strategy = git_utils.default_clone_strategy()
+        cloned = []  # type: List[MxosLibReference]
+        errors = {}  # type: Dict[MxosLibReference, VersionControlError]
+        # The clones running at the same time share one display, each one shows its progress in its own task.
+        with git_progress() as progress, ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            pending = {
+                executor.submit(_clone_lib, lib, strategy, progress): lib for lib in sorted(self.iter_unresolved())
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=pending.__getitem__):
+                    lib = pending.pop(future)
+                    try:
+                        future.result()
+                    except VersionControlError as err:
+                        errors[lib] = err
+                        continue
+                    cloned.append(lib)
+                    # Only the new checkout can hold references which were not seen yet.
+                    for child in sorted(self._iter_unresolved_in(lib.source_code_path)):
+                        pending[executor.submit(_clone_lib, child, strategy, progress)] = child
+
+        for lib in sorted(cloned):
             self._ignore_component(lib.source_code_path)
+        if cloned:
+            uncache_reference_files(self.root)
+        if errors:
+            raise errors[min(errors)]
 
-        # Check if we find any new references after cloning dependencies.
-        if list(self.iter_unresolved()):
-            self.fetch()
+    def checkout(self, force: bool, jobs: int = DEFAULT_FETCH_JOBS) -> None:
+        """Check out all resolved libs to revision specified in .component files.
 
-    def checkout(self, force: bool) -> None:
-        """Check out all resolved libs to revision specified in .component files."""
-        for lib in self.iter_resolved():
-            repo = git_utils.get_repo(lib.source_code_path)
-            git_ref = lib.get_git_reference()
+        Components pinned to the commit they are at are left alone, apart from the submodules of mxos, and pinned
+        commits already in the repository are checked out without fetching. The others are fetched by a pool of
+        workers. A component nested in another one is checked out after its parent, which may change its pin.
 
-            if not git_ref.ref:
-                git_ref.ref = git_utils.get_default_branch(repo)
+        Args:
+            force: Overwrite the local changes of the components.
+            jobs: Number of components fetched at the same time.
 
-            git_utils.fetch(repo, git_ref.ref)
-            git_utils.checkout(repo, "FETCH_HEAD", force=force)
-        
-            if lib.reference_file.name == 'mxos.component':
-                for submodule in repo.submodules:
-                    if submodule.module_exists():
-                        submodule.update(init=True)
+        Raises:
+            VersionControlError: Checking out a component failed, the error of the first one in path order is raised.
+                                 The components nested in it are not checked out.
+        """
+        libs = sorted(self.iter_resolved())
+        paths = {lib.source_code_path: lib for lib in libs}
+        parents = {lib: next((paths[p] for p in lib.reference_file.parents if p in paths), None) for lib in libs}
+        errors = {}  # type: Dict[MxosLibReference, VersionControlError]
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            pending = {executor.submit(_checkout_lib, lib, force): lib for lib in libs if parents[lib] is None}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=pending.__getitem__):
+                    lib = pending.pop(future)
+                    try:
+                        future.result()
+                    except VersionControlError as err:
+                        errors[lib] = err
+                        continue
+                    for child in libs:
+                        if parents[child] == lib:
+                            pending[executor.submit(_checkout_lib, child, force)] = child
+        if errors:
+            raise errors[min(errors)]
 
     def iter_all(self) -> Generator[MxosLibReference, None, None]:
         """Iterate all library references in the tree.
@@ -92,7 +213,9 @@ class LibraryReferences:
         Yields:
             Iterator to library reference.
         """
-        for lib in self.root.rglob("*.component"):
+        cached = _reference_file_cache.get(self.root.resolve())
+        reference_files = cached if cached is not None else find_reference_files(self.root)
+        for lib in (self.root / p for p in reference_files):
             if not self._in_ignore_path(lib):
                 yield MxosLibReference(lib, lib.with_suffix(""))
 
@@ -116,6 +239,16 @@ class LibraryReferences:
             if lib.is_resolved():
                 yield lib
 
+    def _iter_unresolved_in(self, path: Path) -> Generator[MxosLibReference, None, None]:
+        """Iterate the unresolved library references below a directory of the tree."""
+        for dirpath, dirnames, filenames in os.walk(str(path)):
+            dirnames[:] = [name for name in dirnames if name not in _PRUNED_DIR_NAMES]
+            for lib in (Path(dirpath, name) for name in filenames if name.endswith(".component")):
+                if not self._in_ignore_path(lib):
+                    reference = MxosLibReference(lib, lib.with_suffix(""))
+                    if not reference.is_resolved():
+                        yield reference
+
     def _in_ignore_path(self, lib_reference_path: Path) -> bool:
         """Check if a library reference is in a path we want to ignore."""
         return any(p in lib_reference_path.parts for p in self.ignore_paths)
@@ -133,19 +266,130 @@ class LibraryReferences:
                 break
 
 
-def _clone_at_ref(url: str, path: Path, ref: str) -> None:
+def _scan_directories(root: Path, index: Dict[str, list]) -> Dict[str, list]:
+    """Walk a program tree, listing only the directories which are new or changed since they were indexed.
+
+    Returns:
+        The index of the tree, [mtime, .component file names, subdirectory names] by directory relative to `root`.
+    """
+    racy = int((time.time() - _RACY_SECONDS) * 1e9)
+    scanned = {}  # type: Dict[str, list]
+    pending = ["."]
+    while pending:
+        rel = pending.pop()
+        path = root / rel
+        try:
+            mtime = os.stat(str(path)).st_mtime_ns
+        except OSError:
+            continue
+        entry = index.get(rel)
+        if entry is None or entry[0] != mtime:
+            components, subdirs = [], []
+            try:
+                with os.scandir(str(path)) as entries:
+                    for item in entries:
+                        if item.is_dir(follow_symlinks=False):
+                            if item.name not in _PRUNED_DIR_NAMES and not (rel == "." and item.name == BUILD_DIR):
+                                subdirs.append(item.name)
+                        elif item.name.endswith(".component"):
+                            components.append(item.name)
+            except OSError:
+                continue
+            # Recently modified directories are indexed without mtime, so that the next scan lists them again.
+            entry = [mtime if mtime < racy else 0, sorted(components), sorted(subdirs)]
+        scanned[rel] = entry
+        pending.extend(name if rel == "." else f"{rel}/{name}" for name in reversed(entry[2]))
+    return scanned
+
+
+def _component_index_path(root: Path) -> Path:
+    return root / ".git" / COMPONENT_INDEX_FILE_NAME
+
+
+def _load_component_index(root: Path) -> Dict[str, list]:
+    try:
+        data = json.loads(_component_index_path(root).read_text())
+        return data["dirs"] if data.get("version") == _COMPONENT_INDEX_VERSION else {}
+    except (OSError, ValueError, KeyError, AttributeError):
+        return {}
+
+
+def _save_component_index(root: Path, index: Dict[str, list]) -> None:
+    """Store the index in the .git directory of the program, it's only kept in memory for other trees."""
+    path = _component_index_path(root)
+    if not path.parent.is_dir():
+        return
+    temp = path.with_name(f"{path.name}.{os.getpid()}")
+    try:
+        temp.write_text(json.dumps({"version": _COMPONENT_INDEX_VERSION, "dirs": index}))
+        os.replace(str(temp), str(path))
+    except OSError as err:
+        logger.debug(f"Can't save the component index of {root}: {err}")
+
+
+def _checkout_lib(lib: MxosLibReference, force: bool) -> None:
+    # Checking out its parent may have removed the component.
+    if not lib.reference_file.is_file() or not lib.is_resolved():
+        return
+    repo = git_utils.get_repo(lib.source_code_path)
+    git_ref = lib.get_git_reference()
+
+    if not git_ref.ref:
+        git_ref.ref = git_utils.get_default_branch(repo)
+
+    # Branches and tags may have moved on the remote, commits can't.
+    if _FULL_SHA_RE.match(git_ref.ref):
+        if repo.head.is_valid() and repo.head.commit.hexsha == git_ref.ref.lower():
+            # Already at its pin. The submodules of mxos are still updated below, they may lag behind.
+            if force and repo.is_dirty():
+                git_utils.checkout(repo, git_ref.ref, force=force)
+        elif git_utils.has_commit(repo, git_ref.ref):
+            git_utils.checkout(repo, git_ref.ref, force=force)
+        else:
+            git_utils.fetch(repo, git_ref.ref)
+            git_utils.checkout(repo, "FETCH_HEAD", force=force)
+    else:
+        git_utils.fetch(repo, git_ref.ref)
+        git_utils.checkout(repo, "FETCH_HEAD", force=force)
+
+    if lib.reference_file.name == 'mxos.component':
+        for submodule in repo.submodules:
+            if submodule.module_exists():
+                submodule.update(init=True)
+
+
+def _clone_lib(
+    lib: MxosLibReference, strategy: str = git_utils.CLONE_FULL, progress: Optional[Progress] = None
+) -> None:
+    git_ref = lib.get_git_reference()
+    logger.info(f"Resolving library reference {git_ref.repo_url}.")
+    _clone_at_ref(git_ref.repo_url, lib.source_code_path, git_ref.ref, strategy, progress)
+
+
+def _clone_at_ref(
+    url: str, path: Path, ref: str, strategy: str = git_utils.CLONE_FULL, progress: Optional[Progress] = None
+) -> None:
+    if ref and strategy != git_utils.CLONE_FULL:
+        logger.info(f"Fetching revision {ref} for library {url}.")
+        try:
+            git_utils.clone_revision(url, path, ref, strategy, progress=progress)
+            return
+        except VersionControlError as err:
+            # The server may refuse to serve a commit which is not the tip of a branch or a tag.
+            logger.warning(f"{err} Falling back to a full clone.")
+        strategy = git_utils.CLONE_FULL
     if ref:
         logger.info(f"Checking out revision {ref} for library {url}.")
         try:
-            git_utils.clone(url, path, ref)
+            git_utils.clone(url, path, ref, strategy=strategy, progress=progress)
         except VersionControlError:
             # We weren't able to clone. Try again without the ref.
             # We couldn't clone the ref and had to fall back to cloning
             # just the default branch. Fetch the ref before checkout, so
             # that we have it available locally.
             logger.warning(f"Fetching {path} ...")
-            repo = git_utils.clone(url, path)
+            repo = git_utils.clone(url, path, strategy=strategy, progress=progress)
             git_utils.fetch(repo, ref)
             git_utils.checkout(repo, "FETCH_HEAD")
     else:
-        git_utils.clone(url, path)
+        git_utils.clone(url, path, strategy=strategy, progress=progress)
@@ -1,44 +1,47 @@
 # Author: Snow Yang
 # Date  : 2022/03/28
 
-"""Progress bar for git operations."""
-import sys
-
+"""Progress display for git operations."""
 from typing import Optional, Any
 
 from git import RemoteProgress
-from tqdm import tqdm
-
-
-class ProgressBar(tqdm):
-    """tqdm progress bar that can be used in a callback context."""
+from rich.progress import Progress, BarColumn, TextColumn
 
-    total: Any
 
-    def update_progress(self, block_num: float = 1, block_size: float = 1, total_size: float = None) -> None:
-        """Update the progress bar.
-
-        Args:
-            block_num: Number of the current block.
-            block_size: Size of the current block.
-            total_size: Total size of all expected blocks.
-        """
-        if total_size is not None and self.total != total_size:
-            self.total = total_size
-        self.update(block_num * block_size - self.n)
+def git_progress() -> Progress:
+    """Return a progress display for git operations, concurrent ones each add their own task to it."""
+    return Progress(
+        TextColumn("{task.description}", markup=False),
+        BarColumn(bar_width=None),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+        transient=True,
+    )
 
 
 class ProgressReporter(RemoteProgress):
-    """GitPython RemoteProgress subclass that displays a progress bar for git fetch and push operations."""
+    """GitPython RemoteProgress subclass that shows the progress of a git operation as a task of a progress display."""
+
+    _STAGES = {
+        RemoteProgress.COUNTING: "counting objects",
+        RemoteProgress.COMPRESSING: "compressing objects",
+        RemoteProgress.WRITING: "writing objects",
+        RemoteProgress.RECEIVING: "receiving objects",
+        RemoteProgress.RESOLVING: "resolving deltas",
+        RemoteProgress.FINDING_SOURCES: "finding sources",
+        RemoteProgress.CHECKING_OUT: "checking out files",
+    }
 
-    def __init__(self, *args: Any, name: str = "", **kwargs: Any) -> None:
-        """Initialiser.
+    def __init__(self, progress: Progress, name: str = "", *args: Any, **kwargs: Any) -> None:
+        """Initialiser, the task is added to the display until `close()` is called.
 
         Args:
+            progress: The progress display the task is added to.
             name: The name of the git repository to report progress on.
         """
-        self.name = name
         super().__init__(*args, **kwargs)
+        self.name = name
+        self.progress = progress
+        self.task = progress.add_task(name, total=None)
 
     def update(self, op_code: int, cur_count: float, max_count: Optional[float] = None, message: str = "") -> None:
         """Called whenever the progress changes.
@@ -49,11 +52,10 @@ class ProgressReporter(RemoteProgress):
             max_count: Maximum number of items expected.
             message: Message string describing the number of bytes transferred in the WRITING operation.
         """
-        if self.BEGIN & op_code:
-            self.bar = ProgressBar(total=max_count, leave=False, bar_format='{bar} [{percentage:3.0f}%] {desc}')
-
-        self.bar.desc = f"{message}"
-        self.bar.update_progress(block_num=cur_count, total_size=max_count)
+        stage = self._STAGES.get(op_code & self.OP_MASK, "")
+        description = " ".join(part for part in (self.name, stage, message.strip(" ,")) if part)
+        self.progress.update(self.task, completed=cur_count, total=max_count or None, description=description)
 
-        if self.END & op_code:
-            self.bar.close()
+    def close(self) -> None:
+        """Remove the task from the display."""
+        self.progress.remove_task(self.task)
@@ -7,22 +7,32 @@ import logging
 
 import click
 
-from typing import List, Any
+from typing import List, Any, Optional
 
 from mdev.project.mxos_program import MxosProgram, parse_url
-from mdev.project._internal.libraries import LibraryReferences
+from mdev.project._internal.libraries import LibraryReferences, DEFAULT_FETCH_JOBS
 from mdev.project._internal import git_utils
 
 logger = logging.getLogger(__name__)
 
 
-def import_project(url: str, dst_path: Any = None, ref: str = '', recursive: bool = False) -> pathlib.Path:
+def import_project(
+    url: str,
+    dst_path: Any = None,
+    ref: str = '',
+    recursive: bool = False,
+    jobs: int = DEFAULT_FETCH_JOBS,
+    strategy: Optional[str] = None,
+) -> pathlib.Path:
     """Clones an Mxos project from a remote repository.
 
     Args:
         url: URL of the repository to clone.
         dst_path: Destination path for the repository.
         recursive: Recursively clone all project dependencies.
+        jobs: Number of dependencies cloned at the same time.
+        strategy: How dependencies are cloned, one of `git_utils.CLONE_STRATEGIES`. Defaults to
+            `git_utils.default_clone_strategy()`.
 
     Returns:
         The path the project was cloned to.
@@ -43,25 +53,38 @@ def import_project(url: str, dst_path: Any = None, ref: str = '', recursive: boo
 
     if recursive:
         libs = LibraryReferences(root=dst_path, ignore_paths=[])
-        libs.fetch()
+        libs.fetch(jobs, strategy)
 
     return dst_path
 
 
-def initialise_project(path: pathlib.Path, create_only: bool) -> None:
+def initialise_project(
+    path: pathlib.Path,
+    create_only: bool,
+    jobs: int = DEFAULT_FETCH_JOBS,
+    strategy: Optional[str] = None,
+) -> None:
     """Create a new Mxos project, optionally fetching and adding mxos.
 
     Args:
         path: Path to the project folder. Created if it doesn't exist.
         create_only: Flag which suppreses fetching mxos. If the value is `False`, fetch mxos from the remote.
+        jobs: Number of dependencies cloned at the same time.
+        strategy: How dependencies are cloned, one of `git_utils.CLONE_STRATEGIES`. Defaults to
+            `git_utils.default_clone_strategy()`.
     """
     program = MxosProgram.from_new(path)
     if not create_only:
         libs = LibraryReferences(root=program.root, ignore_paths=[])
-        libs.fetch()
+        libs.fetch(jobs, strategy)
 
 
-def deploy_project(path: pathlib.Path, force: bool = False) -> None:
+def deploy_project(
+    path: pathlib.Path,
+    force: bool = False,
+    jobs: int = DEFAULT_FETCH_JOBS,
+    strategy: Optional[str] = None,
+) -> None:
     """Deploy a specific revision of the current Mxos project.
 
     This function also resolves and syncs all library dependencies to the revision specified in the library reference
@@ -71,12 +94,15 @@ def deploy_project(path: pathlib.Path, force: bool = False) -> None:
         path: Path to the Mxos project.
         force: Force overwrite uncommitted changes. If False, the deploy will fail if there are uncommitted local
                changes.
+        jobs: Number of dependencies cloned or fetched at the same time.
+        strategy: How dependencies are cloned, one of `git_utils.CLONE_STRATEGIES`. Defaults to
+            `git_utils.default_clone_strategy()`.
     """
     libs = LibraryReferences(path, ignore_paths=[])
-    libs.checkout(force=force)
+    libs.checkout(force=force, jobs=jobs)
     if list(libs.iter_unresolved()):
         logger.info("Unresolved libraries detected, downloading library source code.")
-        libs.fetch()
+        libs.fetch(jobs, strategy)
 
 def sync_project(path: pathlib.Path) -> None:
     """Sync a specific revision of the current Mxos project.
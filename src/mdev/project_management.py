@@ -1,8 +1,7 @@
 # Author: Snow Yang
 # Date  : 2022/03/21
 
-import os
-from typing import List, Any
+from typing import List, Any, Optional
 
 import pathlib
 
@@ -14,6 +13,37 @@ from rich import box
 
 from mdev.project import initialise_project, import_project, get_known_libs, deploy_project, sync_project
 from mdev.project._internal import git_utils
+from mdev.project._internal.libraries import DEFAULT_FETCH_JOBS
+
+_jobs_option = click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=DEFAULT_FETCH_JOBS,
+    show_default=True,
+    help="Number of components cloned or fetched at the same time.",
+)
+
+
+def _default_clone_strategy(ctx: click.Context, param: click.Parameter, value: Optional[str]) -> str:
+    """Resolve the default of --clone-strategy when the command runs, from MDEV_CLONE_STRATEGY."""
+    if value is not None:
+        return value
+    try:
+        return git_utils.default_clone_strategy()
+    except ValueError as err:
+        raise click.BadParameter(str(err), ctx=ctx, param=param)
+
+
+_clone_strategy_option = click.option(
+    "--clone-strategy",
+    "strategy",
+    type=click.Choice(git_utils.CLONE_STRATEGIES),
+    callback=_default_clone_strategy,
+    help="How components are cloned: with their whole history, with the pinned revision only (shallow) or with "
+    "their history but only the file contents of the checkout (blobless). Defaults to MDEV_CLONE_STRATEGY if set, "
+    f"else {git_utils.CLONE_FULL}.",
+)
 
 @click.command()
 @click.option(
@@ -23,8 +53,10 @@ from mdev.project._internal import git_utils
     show_default=True, 
     help="Create a program without fetching mxos."
 )
+@_jobs_option
+@_clone_strategy_option
 @click.argument("path", type=click.Path(resolve_path=True))
-def new(path: str, create_only: bool) -> None:
+def new(path: str, create_only: bool, jobs: int, strategy: str) -> None:
     """Creates a new MXOS project at the specified path.
 
     Arguments:
@@ -34,13 +66,15 @@ def new(path: str, create_only: bool) -> None:
     Example:
 
         $ mdev new helloworld
+
+        $ mdev new helloworld --clone-strategy shallow
     """
     click.echo(f"Creating a new MXOS program at path '{path}'.")
     if not create_only:
         click.echo("Downloading mxos and adding it to the project.")
         click.echo("This may take a long time, please be patient, you can have a cup fo tea")
 
-    initialise_project(pathlib.Path(path), create_only)
+    initialise_project(pathlib.Path(path), create_only, jobs, strategy)
     
 @click.command()
 @click.argument("url")
@@ -58,7 +92,9 @@ def new(path: str, create_only: bool) -> None:
     show_default=True,
     help="Skip resolving program component dependencies after cloning.",
 )
-def import_(url: str, path: Any, checkout: str, skip_resolve_libs: bool) -> None:
+@_jobs_option
+@_clone_strategy_option
+def import_(url: str, path: Any, checkout: str, skip_resolve_libs: bool, jobs: int, strategy: str) -> None:
     """Clone an MXOS project and component dependencies.
 
     Arguments:
@@ -80,13 +116,13 @@ def import_(url: str, path: Any, checkout: str, skip_resolve_libs: bool) -> None
         click.echo(f"Destination path is '{path}'")
         path = pathlib.Path(path)
 
-    dst_path = import_project(url, path, checkout, not skip_resolve_libs)
+    dst_path = import_project(url, path, checkout, not skip_resolve_libs, jobs, strategy)
     if not skip_resolve_libs:
         libs = get_known_libs(dst_path)
         _print_dependency_table(libs, dst_path)
 
 @click.command()
-@click.argument("path", type=click.Path(), default=os.getcwd())
+@click.argument("path", type=click.Path(resolve_path=True), default=".")
 @click.option(
     "--force",
     "-f",
@@ -94,7 +130,9 @@ def import_(url: str, path: Any, checkout: str, skip_resolve_libs: bool) -> None
     show_default=True,
     help="Forces checkout of all component repositories at specified commit in the .component file, overwrites local changes.",
 )
-def deploy(path: str, force: bool) -> None:
+@_jobs_option
+@_clone_strategy_option
+def deploy(path: str, force: bool, jobs: int, strategy: str) -> None:
     """Checks out MXOS program component dependencies at the revision specified in the ".component" files.
 
     Ensures all dependencies are resolved and the versions are synchronised to the version specified in the component
@@ -111,12 +149,12 @@ def deploy(path: str, force: bool) -> None:
     click.echo("Checking out all componets to revisions specified in .component files. Resolving any unresolved componets.")
     click.echo("This may take a long time, please be patient, you can have a cup fo tea")
     root_path = pathlib.Path(path)
-    deploy_project(root_path, force)
+    deploy_project(root_path, force, jobs, strategy)
     libs = get_known_libs(root_path)
     _print_dependency_table(libs, root_path)
 
 @click.command()
-@click.argument("path", type=click.Path(), default=os.getcwd())
+@click.argument("path", type=click.Path(resolve_path=True), default=".")
 def sync(path: str) -> None:
     """Synchronize component references
 
@@ -139,7 +177,7 @@ def sync(path: str) -> None:
     _print_dependency_table(libs, root_path)
 
 @click.command()
-@click.argument("path", type=click.Path(), default=os.getcwd())
+@click.argument("path", type=click.Path(resolve_path=True), default=".")
 def status(path: str) -> None:
     """Show component status
 
@@ -0,0 +1,199 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+import sys
+
+from typing import Tuple
+
+import click
+import requests
+
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+from mdev import env
+
+
+@click.group("env")
+def toolchains() -> None:
+    """Manage the CMake and Ninja versions used by mdev.
+
+    Versions are installed side by side in ~/.mdev/toolchains, each one
+    verified by the SHA-256 of its archive. A program pins versions in its
+    mdev-toolchains.json file, or in the one of its mxos checkout. Programs
+    without pins use the version selected by `mdev env use`.
+    """
+
+
+@toolchains.command("list")
+def list_() -> None:
+    """List the installed toolchain versions.
+
+    Example:
+
+        $ mdev env list
+    """
+    pins = env.read_pins()
+    table = Table(title="Toolchains", box=box.ROUNDED, style='blue')
+    table.add_column("Toolchain", style="cyan")
+    table.add_column("Version", style="green")
+    table.add_column("SHA-256")
+    table.add_column("Used", style="yellow")
+    for name, versions in sorted(env.installed_toolchains().items()):
+        used, _ = env.resolve_toolchain(name)
+        for version, sha256 in sorted(versions.items()):
+            mark = ""
+            if version == used:
+                mark = "pinned" if name in pins else "current"
+            table.add_row(name, version, sha256[:16] if sha256 != env.LEGACY_INSTALL else "-", mark)
+    Console().print(table, justify="left")
+
+
+@toolchains.command()
+@click.argument("name", type=click.Choice(sorted(env.toolchain_executables)))
+@click.argument("version", default=env.DEFAULT_VERSION)
+@click.option("--sha256", help="Expected SHA-256 of the archive.")
+def install(name: str, version: str, sha256: str) -> None:
+    """Install a toolchain version.
+
+    Arguments:
+
+        NAME   : Toolchain name
+
+        VERSION: Toolchain version, the unversioned archive by default
+
+    Example:
+
+        $ mdev env install cmake 3.21.0
+    """
+    env.install_toolchains([(name, version, sha256)])
+    click.echo(f"{name} {version} installed.")
+
+
+@toolchains.command()
+@click.argument("name", type=click.Choice(sorted(env.toolchain_executables)))
+@click.argument("version")
+def use(name: str, version: str) -> None:
+    """Select the toolchain version used by programs which don't pin one.
+
+    The version is installed first if needed, switching between installed
+    versions downloads nothing.
+
+    Arguments:
+
+        NAME   : Toolchain name
+
+        VERSION: Toolchain version
+
+    Example:
+
+        $ mdev env use cmake 3.21.0
+    """
+    if version not in env.installed_toolchains().get(name, {}):
+        env.install_toolchains([(name, version, None)])
+    env.use_toolchain(name, version)
+    click.echo(f"Using {name} {version}.")
+
+
+@toolchains.command()
+@click.argument("name", type=click.Choice(sorted(env.toolchain_executables)))
+@click.argument("version")
+def pin(name: str, version: str) -> None:
+    """Pin a toolchain version and its SHA-256 in the current program.
+
+    The pin is written to mdev-toolchains.json, commit it so that every
+    checkout of the program builds with the same toolchain.
+
+    Arguments:
+
+        NAME   : Toolchain name
+
+        VERSION: Toolchain version
+
+    Example:
+
+        $ mdev env pin cmake 3.21.0
+    """
+    if version not in env.installed_toolchains().get(name, {}):
+        env.install_toolchains([(name, version, None)])
+    env.pin_toolchain(name, version)
+    click.echo(f"Pinned {name} {version} in {env.TOOLCHAIN_PIN_FILE_NAME}.")
+
+
+@toolchains.command()
+@click.argument("specs", nargs=-1)
+@click.option(
+    "--to",
+    "destination",
+    required=True,
+    type=click.Path(file_okay=False),
+    help="Mirror directory receiving the archives.",
+)
+@click.option(
+    "--platform",
+    "platforms",
+    multiple=True,
+    type=click.Choice(sorted(env.toolchains_afterfix)),
+    help="Platform to download the archives of, repeat for several. Defaults to the current platform.",
+)
+def prefetch(specs: Tuple[str, ...], destination: str, platforms: Tuple[str, ...]) -> None:
+    """Download toolchain archives to a mirror directory.
+
+    The directory can then be used as a mirror by `mdev env mirrors`, shared
+    on a LAN or served over HTTP. Each archive is stored with its SHA-256.
+
+    Arguments:
+
+        SPECS: Toolchains formatted as NAME@VERSION or NAME, the versions
+               used by the current program by default
+
+    Example:
+
+        $ mdev env prefetch --to /srv/mdev-mirror --platform linux --platform win32
+
+        $ mdev env prefetch cmake@3.21.0 --to /srv/mdev-mirror
+    """
+    if specs:
+        toolchains = []
+        for spec in specs:
+            name, _, version = spec.partition("@")
+            if name not in env.toolchain_executables:
+                raise click.BadParameter(f"Unknown toolchain '{name}'.", param_hint="SPECS")
+            toolchains.append((name, version or env.DEFAULT_VERSION))
+    else:
+        toolchains = [(name, env.resolve_toolchain(name)[0]) for name in sorted(env.toolchain_executables)]
+    try:
+        archives = env.prefetch(destination, toolchains, list(platforms) or [sys.platform])
+    except (requests.RequestException, OSError, ValueError) as err:
+        raise click.ClickException(str(err))
+    for archive in archives:
+        click.echo(f"Downloaded {archive}")
+    click.echo(f"Mirror {destination} is up to date.")
+
+
+@toolchains.command()
+@click.argument("urls", nargs=-1)
+@click.option("--clear", is_flag=True, help="Remove all mirrors.")
+def mirrors(urls: Tuple[str, ...], clear: bool) -> None:
+    """Show or set the mirrors toolchains are installed from.
+
+    Mirrors are tried in order before the mdev server. They may be HTTP
+    URLs, file:// URLs or local directories filled by `mdev env prefetch`.
+    The MDEV_TOOLCHAIN_MIRRORS environment variable, a comma separated
+    list, takes precedence.
+
+    Arguments:
+
+        URLS: Mirror URLs, replacing the current ones
+
+    Example:
+
+        $ mdev env mirrors http://cache.lan/mdev/ /mnt/shared/mdev-mirror
+    """
+    if urls and clear:
+        raise click.UsageError("--clear can't be used with URLS, the URLs given replace the current mirrors.")
+    if urls or clear:
+        env.set_mirrors(list(urls))
+    for source in env.toolchain_sources():
+        click.echo(source)
@@ -0,0 +1,95 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+import shutil
+import subprocess
+import sys
+
+from pathlib import Path
+
+import pytest
+
+from mdev.builder import matrix
+from mdev.builder.artifacts import input_hash
+from mdev.builder.target import BuildTarget
+
+# Configure writes the .config file, as the mxos build system does, and the build writes an image.
+FAKE_CMAKE = """\
+import sys
+from pathlib import Path
+
+args = sys.argv[1:]
+if args == ["--version"]:
+    print("cmake version 3.99.0")
+elif args[0] == "--build":
+    Path(args[1], "app.bin").write_bytes(b"image")
+    with open({builds!r}, "a") as log:
+        log.write(args[1] + "\\n")
+else:
+    build_dir = Path(args[args.index("-B") + 1])
+    build_dir.mkdir(parents=True, exist_ok=True)
+    (build_dir / ".config").write_text("CONFIG_GENERATED=y\\n")
+    (build_dir / "build.ninja").write_text("")
+"""
+
+
+def _git(*args: str) -> None:
+    subprocess.run(["git", "-c", "user.name=mdev", "-c", "user.email=mdev@example.com", *args], check=True)
+
+
+@pytest.fixture
+def program(tmp_path, monkeypatch):
+    """A committed program with one app, built with a fake cmake, the number of builds is logged in `builds`."""
+    builds = tmp_path / "builds"
+    script = tmp_path / "cmake.py"
+    script.write_text(FAKE_CMAKE.format(builds=str(builds)))
+    cmake = tmp_path / "cmake"
+    cmake.write_text(f"#!/bin/sh\nexec {sys.executable} {script} \"$@\"\n")
+    cmake.chmod(0o755)
+    for module in ("mdev.builder.target", "mdev.builder.fingerprint", "mdev.builder.artifacts"):
+        monkeypatch.setattr(f"{module}.get_cmake", lambda: str(cmake))
+        monkeypatch.setattr(f"{module}.get_ninja", lambda: str(cmake))
+    monkeypatch.setenv("MDEV_ARTIFACT_CACHE_DIR", str(tmp_path / "artifacts"))
+
+    root = tmp_path / "program"
+    (root / "app").mkdir(parents=True)
+    (root / "app" / "main.c").write_text("int main(void) { return 0; }\n")
+    (root / "CMakeLists.txt").write_text("project(program)\n")
+    (root / "common.cmake").write_text("set(X 1)\n")
+    (root / ".gitignore").write_text("build\n")
+    monkeypatch.chdir(root)
+    _git("init", "-q", ".")
+    _git("add", ".")
+    _git("commit", "-q", "-m", "program")
+    return builds
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the fake cmake is a shell script")
+def test_fresh_build_tree_restores_the_images_of_the_previous_build(program):
+    target = BuildTarget("app", "m", compiler_cache=False)
+
+    first = matrix._build_target(target, "env", 1, False, True)
+    assert first.ok and first.step == "build"
+    shutil.rmtree("build")
+    second = matrix._build_target(target, "env", 1, False, True)
+
+    assert second.ok and second.step == "cache"
+    assert Path(target.build_directory, "app.bin").read_bytes() == b"image"
+    assert program.read_text().splitlines() == [target.build_directory]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the fake cmake is a shell script")
+def test_local_changes_outside_the_project_change_the_key(program):
+    target = BuildTarget("app", "m", compiler_cache=False)
+    keys = {input_hash(target)}
+
+    Path("common.cmake").write_text("set(X 2)\n")
+    keys.add(input_hash(target))
+    Path("common.cmake").write_text("set(X 3)\n")
+    keys.add(input_hash(target))
+    Path("shared.h").write_text("#define Y 1\n")
+    keys.add(input_hash(target))
+    Path("shared.h").write_text("#define Y 2\n")
+    keys.add(input_hash(target))
+
+    assert None not in keys and len(keys) == 5
@@ -0,0 +1,21 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+from mdev.builder import tune
+from mdev.builder.target import BuildTarget
+
+
+def test_unity_defines_of_the_target_are_dropped_while_tuning(tmp_path, monkeypatch):
+    target = BuildTarget("app", "m", defines=("CMAKE_UNITY_BUILD:BOOL=ON", "FOO=1"))
+    monkeypatch.chdir(tmp_path)
+    tried = []
+    monkeypatch.setattr(tune, "_benchmark", lambda target, env_path, jobs: tried.append(target.defines) or 1.0)
+    monkeypatch.setattr(tune, "clear_fingerprint", lambda target: None)
+
+    tune.tune(target, "env")
+
+    assert tune.pinned_variables(target) == ["CMAKE_UNITY_BUILD"]
+    unity = [defines for defines in tried if "CMAKE_UNITY_BUILD=ON" in defines]
+    assert len(tried) > len(unity) > 1
+    assert all("FOO=1" in defines and "CMAKE_UNITY_BUILD:BOOL=ON" not in defines for defines in tried)
+    assert tune.apply_profile(target, tune.BuildProfile(1, True, 8)).defines == target.defines
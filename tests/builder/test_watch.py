@@ -0,0 +1,29 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+import os
+import errno
+import sys
+
+import pytest
+
+from mdev.builder import watch
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is only available on Linux")
+def test_inotify_descriptor_is_closed_when_the_watch_limit_is_reached(tmp_path, monkeypatch):
+    descriptors = []
+
+    def add_watch(self, directory):
+        descriptors.append(self._fd)
+        raise OSError(errno.ENOSPC, "inotify watch limit reached")
+
+    monkeypatch.setattr(watch.InotifyWatcher, "_add_watch", add_watch)
+
+    with pytest.raises(OSError) as raised:
+        watch.InotifyWatcher([tmp_path])
+
+    assert raised.value.errno == errno.ENOSPC
+    with pytest.raises(OSError) as closed:
+        os.fstat(descriptors[0])
+    assert closed.value.errno == errno.EBADF
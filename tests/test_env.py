@@ -0,0 +1,75 @@
+# Author: Snow Yang
+# Date  : 2026/10/17
+
+import io
+import os
+import hashlib
+import tarfile
+import zipfile
+
+import pytest
+
+from mdev import env
+
+
+def _tar(path, members):
+    with tarfile.open(str(path), "w:gz") as archive:
+        for info, data in members:
+            archive.addfile(info, io.BytesIO(data) if data is not None else None)
+    return path.as_uri()
+
+
+def _file(name, data=b"data"):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    return info, data
+
+
+def _link(name, target, kind=tarfile.SYMTYPE):
+    info = tarfile.TarInfo(name)
+    info.type = kind
+    info.linkname = target
+    return info, None
+
+
+def test_install_extracts_a_tar_archive(tmp_path):
+    url = _tar(tmp_path / "tool.tar.gz", [_file("tool/bin/tool"), _link("tool/current", "bin")])
+
+    env.install(url, str(tmp_path / "installed"))
+
+    assert (tmp_path / "installed" / "tool" / "bin" / "tool").read_bytes() == b"data"
+    assert os.readlink(str(tmp_path / "installed" / "tool" / "current")) == "bin"
+
+
+@pytest.mark.parametrize("member", [
+    _file("../escaped"),
+    _file("/tmp/escaped"),
+    _link("tool/link", "../../escaped"),
+    _link("tool/link", "/etc"),
+    _link("tool/link", "../../escaped", tarfile.LNKTYPE),
+])
+def test_install_rejects_tar_members_outside_the_destination(tmp_path, member):
+    url = _tar(tmp_path / "tool.tar.gz", [_file("tool/ok"), member])
+    (tmp_path / "store").mkdir()
+
+    with pytest.raises((ValueError, tarfile.TarError)):
+        env.install(url, str(tmp_path / "store" / "installed"))
+
+    assert not (tmp_path / "escaped").exists()
+    assert os.listdir(str(tmp_path / "store")) == []
+
+
+def test_install_verifies_a_zip_archive_before_extracting_it(tmp_path, monkeypatch):
+    path = tmp_path / "tool.zip"
+    with zipfile.ZipFile(str(path), "w") as archive:
+        archive.writestr("tool/bin/tool", b"data")
+    extracted = []
+    monkeypatch.setattr(env, "extract_zip", lambda file, destination: extracted.append(destination))
+
+    with pytest.raises(ValueError):
+        env.install(path.as_uri(), str(tmp_path / "installed"), sha256="0" * 64)
+
+    assert extracted == []
+    assert not (tmp_path / "installed").exists()
+    env.install(path.as_uri(), str(tmp_path / "installed"), sha256=hashlib.sha256(path.read_bytes()).hexdigest())
+    assert len(extracted) == 1